@@ -240,7 +240,7 @@ EMAIL_PORT = os.getenv("EMAIL_PORT")
 EMAIL_USE_TLS = True
 EMAIL_HOST_USER = os.getenv("EMAIL_USER")
 EMAIL_HOST_PASSWORD = os.getenv("EMAIL_PASSWORD")
-DEFAULT_FROM_EMAIL = 'os.getenv("EMAIL_DEFAULT")
+DEFAULT_FROM_EMAIL = os.getenv("EMAIL_DEFAULT")
 
 AUTH_USER_MODEL = "accounts.User"
 ACCOUNT_AUTHENTICATION_METHOD = "email"
@@ -277,3 +277,52 @@ CACHES = {
 }
 
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        # Request-path timings such as paper_persist_ms
+        'questions.metrics': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
+# Unclaimed mock papers kept ready per stream by `manage.py refill_mock_reservoir`
+MOCK_RESERVOIR_DEPTH = int(os.getenv("MOCK_RESERVOIR_DEPTH", 50))
+
+# Questions from papers a user submitted within this many days are avoided when sampling new tests (0 disables)
+SEEN_QUESTIONS_WINDOW_DAYS = int(os.getenv("SEEN_QUESTIONS_WINDOW_DAYS", 30))
+
+# 'sync' writes TestHistory during the submit request; 'queued' answers with the score
+# and leaves the writes to `manage.py flush_submissions`
+SUBMISSION_INGEST_MODE = os.getenv("SUBMISSION_INGEST_MODE", "sync")
+SUBMISSION_FLUSH_BATCH_SIZE = int(os.getenv("SUBMISSION_FLUSH_BATCH_SIZE", 500))
+
+# How long a submit response is kept for replay to retried requests (seconds)
+SUBMISSION_IDEMPOTENCY_TTL = int(os.getenv("SUBMISSION_IDEMPOTENCY_TTL", 60 * 60 * 24))
+
+# Where QuestionVectorizer keeps its FAISS index between processes (see `manage.py build_question_index`)
+QUESTION_INDEX_DIR = os.getenv("QUESTION_INDEX_DIR", str(BASE_DIR / 'var' / 'question_index'))
+
+# Seconds between a worker's checks for question changes to apply to its index
+QUESTION_INDEX_SYNC_INTERVAL = float(os.getenv("QUESTION_INDEX_SYNC_INTERVAL", 5))
+
+# Hold the similarity reranker's in-memory question texts zlib-compressed
+QUESTION_INDEX_COMPRESS_TEXTS = os.getenv("QUESTION_INDEX_COMPRESS_TEXTS", "false").lower() == "true"
+
+# Unix socket of `manage.py run_embedding_server`; when set, workers send embedding and
+# reranking work there instead of loading the models themselves
+EMBEDDING_SERVER_SOCKET = os.getenv("EMBEDDING_SERVER_SOCKET") or None
+EMBEDDING_SERVER_TIMEOUT = float(os.getenv("EMBEDDING_SERVER_TIMEOUT", 30))
+
+# Similarity queries arriving within this many milliseconds of each other (up to the
+# batch size) share one encode, FAISS search and rerank call; 0 disables batching
+QUESTION_SIMILARITY_BATCH_SIZE = int(os.getenv("QUESTION_SIMILARITY_BATCH_SIZE", 16))
+QUESTION_SIMILARITY_BATCH_WAIT_MS = float(os.getenv("QUESTION_SIMILARITY_BATCH_WAIT_MS", 5))
+
+# How long (seconds) a text's embedding is kept in the cache, keyed by a hash of the
+# normalized text and model; 0 re-embeds every time
+EMBEDDING_CACHE_TIMEOUT = int(os.getenv("EMBEDDING_CACHE_TIMEOUT", 60 * 60 * 24 * 30))
@@ -6,6 +6,7 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 django.setup()
 
 from questions.models import *
+from questions.blueprints import IOE_SYLLABUS, seed_blueprint
 
 def create_mock_data():
     # Create IOE Stream
@@ -104,6 +105,9 @@ def create_mock_data():
                     marks=2
                 )
 
+    # The mock test blueprint needs the stream and chapters created above
+    seed_blueprint('IOE', IOE_SYLLABUS)
+
     print("Mock data created successfully!")
 
 if __name__ == '__main__':
@@ -7,6 +7,7 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 django.setup()
 
 from questions.models import * # Assuming your models are Streams, Subjects, Chapters, Topics, Questions, HeroQuestions
+from questions.blueprints import IOE_SYLLABUS, seed_blueprint
 
 # --- REALISTIC QUESTION BANK ---
 # Structure:
@@ -450,6 +451,9 @@ def create_mock_data_v2():
                  print(f"    Warning: Requested {num_mark2_to_create} 2-mark questions for {chapter_name}, but only {actual_mark2_to_create} were available in bank.")
 
 
+    # The mock test blueprint needs the stream and chapters created above
+    seed_blueprint('IOE', IOE_SYLLABUS)
+
     print(f"\nMock data creation process finished. Total questions processed/created: {question_counter}")
 
 if __name__ == '__main__':
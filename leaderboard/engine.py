@@ -0,0 +1,250 @@
+import datetime
+
+from django.core.cache import cache
+from django.db.models import Sum
+from django.utils import timezone
+
+from accounts.models import User
+from questions.models import ResultQuestionLink, TestHistory
+
+# One Redis sorted set per scope and period: member = user id, score = marks
+# obtained in the period. Scope is '' (everything), 'stream:{id}:' or
+# 'subject:{id}:' (marks from that subject's questions only).
+DAILY_KEY = 'lb:{scope}daily:{day}'     # day: 2025-06-01
+WEEKLY_KEY = 'lb:{scope}weekly:{week}'  # week: 2025-W22 (ISO, Monday based)
+ALL_TIME_KEY = 'lb:{scope}all'
+DAILY_TTL = 60 * 60 * 24 * 8
+WEEKLY_TTL = 60 * 60 * 24 * 7 * 5
+
+# Final competition ranks of a closed board (hash user id -> rank), frozen at the
+# period boundary by `manage.py snapshot_leaderboards`; rank_change reads these.
+SNAPSHOT_KEY = 'lb:snapshot:{board}'    # board: daily:2025-06-01 / stream:3:weekly:2025-W22
+SNAPSHOT_TTL = 60 * 60 * 24 * 7 * 2
+SNAPSHOT_DONE = '_' # Marker field, so an empty board still has a snapshot
+SNAPSHOT_CHUNK = 5000
+
+
+def _redis(write=False):
+    return cache.client.get_client(write=write)
+
+
+def board_scope(stream_id=None, subject_id=None):
+    if stream_id is not None:
+        return f'stream:{stream_id}:'
+    if subject_id is not None:
+        return f'subject:{subject_id}:'
+    return ''
+
+
+def daily_key(day=None, scope=''):
+    day = day or timezone.localdate()
+    return DAILY_KEY.format(scope=scope, day=day.isoformat())
+
+
+def weekly_key(day=None, scope=''):
+    year, week, _ = (day or timezone.localdate()).isocalendar()
+    return WEEKLY_KEY.format(scope=scope, week=f'{year}-W{week:02d}')
+
+
+def all_time_key(day=None, scope=''):
+    return ALL_TIME_KEY.format(scope=scope)
+
+
+def record_scores(histories, subject_marks=None):
+    """
+    ZINCRBY each history's marks into the daily, weekly and all-time boards of the
+    day it was taken: the global and stream boards get obtained_marks, each subject
+    board the marks from `subject_marks` ({history.pk: {subject_id: marks}}).
+    One pipelined round trip for the whole batch.
+    """
+    subject_marks = subject_marks or {}
+    pipe = _redis(write=True).pipeline(transaction=False)
+    for history in histories:
+        day = timezone.localdate(history.created_at)
+        scores = [('', history.obtained_marks)]
+        if history.stream_id is not None:
+            scores.append((board_scope(stream_id=history.stream_id), history.obtained_marks))
+        for subject_id, marks in subject_marks.get(history.pk, {}).items():
+            scores.append((board_scope(subject_id=subject_id), marks))
+        for scope, marks in scores:
+            for key, ttl in ((daily_key(day, scope), DAILY_TTL), (weekly_key(day, scope), WEEKLY_TTL)):
+                pipe.zincrby(key, marks, history.user_id)
+                pipe.expire(key, ttl)
+            pipe.zincrby(all_time_key(scope=scope), marks, history.user_id)
+    pipe.execute()
+
+
+def rebuild_board(key, ttl=None, start=None, end=None, stream_id=None, subject_id=None):
+    """
+    Recompute one board from history taken in [start, end) (all time when not
+    given), optionally scoped like the key; returns the number of users.
+    """
+    if subject_id is not None:
+        rows = ResultQuestionLink.objects.filter(question_id__topic__chapter__sub_id=subject_id)
+        prefix, marks = 'result_id__', 'marks_obtained'
+    else:
+        rows = TestHistory.objects.all() if stream_id is None else TestHistory.objects.filter(stream_id=stream_id)
+        prefix, marks = '', 'obtained_marks'
+    if start is not None:
+        rows = rows.filter(**{f'{prefix}created_at__gte': start, f'{prefix}created_at__lt': end})
+    totals = dict(
+        rows.values(f'{prefix}user_id').annotate(total=Sum(marks)).values_list(f'{prefix}user_id', 'total')
+    )
+    pipe = _redis(write=True).pipeline(transaction=True)
+    pipe.delete(key)
+    if totals:
+        pipe.zadd(key, totals)
+        if ttl:
+            pipe.expire(key, ttl)
+    pipe.execute()
+    return len(totals)
+
+
+def period_boards(key_for, day):
+    """Every existing board, across scopes, for the period of `key_for` containing `day`."""
+    keys = {key_for(day)}
+    for key in _redis().scan_iter(match=key_for(day, scope='*'), count=1000):
+        key = key.decode()
+        if not key.startswith(SNAPSHOT_KEY.format(board='')):
+            keys.add(key)
+    return sorted(keys)
+
+
+def snapshot_key(key):
+    return SNAPSHOT_KEY.format(board=key.split(':', 1)[1])
+
+
+def snapshot_board(key, force=False):
+    """
+    Freeze a closed board's ranks (ties share a rank) into its snapshot hash.
+    Returns the number of ranked users, or None if a snapshot already existed.
+    """
+    redis = _redis(write=True)
+    target = snapshot_key(key)
+    if not force and redis.exists(target):
+        return None
+
+    ranks, rank, position, previous_score = {SNAPSHOT_DONE: 0}, 0, 0, None
+    for start in range(0, redis.zcard(key), SNAPSHOT_CHUNK):
+        for member, score in redis.zrevrange(key, start, start + SNAPSHOT_CHUNK - 1, withscores=True):
+            position += 1
+            if score != previous_score:
+                rank, previous_score = position, score
+            ranks[member] = rank
+
+    pipe = redis.pipeline(transaction=True)
+    pipe.delete(target)
+    items = list(ranks.items())
+    for start in range(0, len(items), SNAPSHOT_CHUNK):
+        pipe.hset(target, mapping=dict(items[start:start + SNAPSHOT_CHUNK]))
+    pipe.expire(target, SNAPSHOT_TTL)
+    pipe.execute()
+    return len(ranks) - 1
+
+
+def day_bounds(day):
+    start = timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+    return start, start + datetime.timedelta(days=1)
+
+
+def week_bounds(day):
+    start, _ = day_bounds(day - datetime.timedelta(days=day.weekday()))
+    return start, start + datetime.timedelta(weeks=1)
+
+
+class RankedBoard:
+    """
+    Read-only sequence over one board, ordered by score descending, in the shape
+    Django's Paginator expects: count() is a ZCARD and a slice is one ZREVRANGE
+    plus one batched user lookup. Items are User instances annotated with
+    total_obtained_marks, rank (ties share a rank, as with SQL RANK()) and
+    previous_rank, the user's final rank on `previous_key`, read from its snapshot
+    (None until `manage.py snapshot_leaderboards` has frozen that board).
+    """
+    def __init__(self, key, previous_key=None):
+        self.key = key
+        self.previous_key = previous_key
+
+    def count(self):
+        return _redis().zcard(self.key)
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice) or index.step not in (None, 1):
+            raise TypeError("RankedBoard only supports contiguous slices")
+        start = index.start or 0
+        if index.stop is not None and index.stop <= start:
+            return []
+        stop = -1 if index.stop is None else index.stop - 1
+        return self.hydrate(_redis().zrevrange(self.key, start, stop, withscores=True), start)
+
+    def position_after(self, score, user_id):
+        """
+        0-based position just past the entry (score, user_id): one ZSCORE and
+        ZREVRANK while the user still holds that score, otherwise the entries
+        above `score` plus the ties Redis orders before the user (members with
+        equal scores are served in reverse byte order).
+        """
+        pipe = _redis().pipeline(transaction=True)
+        pipe.zscore(self.key, user_id)
+        pipe.zrevrank(self.key, user_id)
+        current, position = pipe.execute()
+        if current == score:
+            return position + 1
+        # The user has scored again (or been removed) since the cursor was issued
+        above = _redis().zcount(self.key, f'({score}', '+inf')
+        member = str(user_id).encode()
+        return above + sum(1 for tie in _redis().zrevrangebyscore(self.key, score, score) if tie > member)
+
+    def page_after(self, cursor, size):
+        """
+        Up to `size` ranked Users following `cursor`, the (score, user id) of the
+        last row already served (None for the top of the board), and the cursor
+        for the next page, or None when nothing follows. No count, no offset scan.
+        """
+        start = 0 if cursor is None else self.position_after(*cursor)
+        entries = _redis().zrevrange(self.key, start, start + size, withscores=True)
+        next_cursor = None
+        if len(entries) > size:
+            entries = entries[:size]
+            member, score = entries[-1]
+            next_cursor = (score, int(member))
+        return self.hydrate(entries, start), next_cursor
+
+    def around(self, user_id, neighbours):
+        """
+        The user plus up to `neighbours` entries above and below them, as ranked
+        Users: one ZREVRANK (O(log n)) and one ZREVRANGE. Empty if the user hasn't
+        scored in this period.
+        """
+        position = _redis().zrevrank(self.key, user_id)
+        if position is None:
+            return []
+        start = max(position - neighbours, 0)
+        return self[start:position + neighbours + 1]
+
+    def hydrate(self, entries, start):
+        """Turn (member, score) pairs beginning at 0-based position `start` into ranked Users."""
+        if not entries:
+            return []
+        # Everyone above the first entry's score outranks it; later ranks follow from position
+        first_rank = _redis().zcount(self.key, f'({entries[0][1]}', '+inf') + 1
+        users = User.objects.only('id', 'username', 'email').in_bulk([int(member) for member, _ in entries])
+        previous_ranks = [None] * len(entries)
+        if self.previous_key:
+            previous_ranks = _redis().hmget(snapshot_key(self.previous_key), [member for member, _ in entries])
+
+        ranked, rank, previous_score = [], first_rank, entries[0][1]
+        for position, ((member, score), previous) in enumerate(zip(entries, previous_ranks), start=start):
+            if score != previous_score:
+                rank, previous_score = position + 1, score
+            user = users.get(int(member))
+            if user is None:
+                continue # Deleted since scoring
+            user.total_obtained_marks = int(score)
+            user.rank = rank
+            user.previous_rank = None if previous is None else int(previous)
+            ranked.append(user)
+        return ranked
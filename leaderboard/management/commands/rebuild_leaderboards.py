@@ -0,0 +1,41 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from leaderboard.engine import (
+    DAILY_TTL, WEEKLY_TTL, board_scope, daily_key, weekly_key, all_time_key, day_bounds, week_bounds, rebuild_board
+)
+from questions.models import Streams, Subjects
+
+
+class Command(BaseCommand):
+    help = "Recompute the Redis daily/weekly/all-time leaderboards from TestHistory (e.g. after a Redis flush)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=2,
+                            help="Daily boards to rebuild, counting back from today (default: 2).")
+        parser.add_argument('--weeks', type=int, default=2,
+                            help="Weekly boards to rebuild, counting back from this week (default: 2).")
+        parser.add_argument('--scoped', action='store_true',
+                            help="Also rebuild every stream and subject board.")
+
+    def handle(self, *args, **options):
+        scopes = [{}]
+        if options['scoped']:
+            scopes += [{'stream_id': pk} for pk in Streams.objects.values_list('id', flat=True)]
+            scopes += [{'subject_id': pk} for pk in Subjects.objects.values_list('id', flat=True)]
+
+        today = timezone.localdate()
+        for scope in scopes:
+            prefix = board_scope(**scope)
+            boards = [(all_time_key(scope=prefix), None, None, None)]
+            for n in range(options['days']):
+                day = today - datetime.timedelta(days=n)
+                boards.append((daily_key(day, prefix), DAILY_TTL, *day_bounds(day)))
+            for n in range(options['weeks']):
+                day = today - datetime.timedelta(weeks=n)
+                boards.append((weekly_key(day, prefix), WEEKLY_TTL, *week_bounds(day)))
+            for key, ttl, start, end in boards:
+                users = rebuild_board(key, ttl, start, end, **scope)
+                self.stdout.write(f"{key}: {users} users")
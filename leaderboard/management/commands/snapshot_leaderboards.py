@@ -0,0 +1,25 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from leaderboard.engine import daily_key, weekly_key, period_boards, snapshot_board
+
+
+class Command(BaseCommand):
+    help = "Freeze the final ranks of the just-closed daily and weekly leaderboards (run just after midnight)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true',
+                            help="Rebuild snapshots that already exist.")
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        keys = period_boards(daily_key, today - datetime.timedelta(days=1)) + \
+            period_boards(weekly_key, today - datetime.timedelta(weeks=1))
+        for key in keys:
+            ranked = snapshot_board(key, force=options['force'])
+            if ranked is None:
+                self.stdout.write(f"{key}: snapshot already exists")
+            else:
+                self.stdout.write(f"{key}: froze ranks for {ranked} users")
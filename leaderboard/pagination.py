@@ -1,6 +1,9 @@
-from rest_framework.pagination import PageNumberPagination
+from base64 import b64decode, b64encode
+from rest_framework.pagination import BasePagination, PageNumberPagination
 from collections import OrderedDict
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
 
 class LeaderboardPagination(PageNumberPagination):
@@ -17,4 +20,58 @@ class LeaderboardPagination(PageNumberPagination):
             ('total_pages', self.page.paginator.num_pages),
             ('results', data)
         ]))
-    
\ No newline at end of file
+
+
+class LeaderboardCursorPagination(BasePagination):
+    """
+    Keyset pagination over a RankedBoard. The cursor is the (score, user id) of
+    the last row served, so each page costs a ZSCORE/ZREVRANK and one ZREVRANGE
+    whatever its depth, and there is no count. `include_total=1` adds `total`,
+    the board's ZCARD at request time (it drifts as users score while paging).
+    """
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    total_query_param = 'include_total'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, board, request, view=None):
+        self.request = request
+        self.board = board
+        rows, self.next_cursor = board.page_after(self.decode_cursor(request), self.get_page_size(request))
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(size, self.max_page_size) if size > 0 else self.page_size
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            score, user_id = b64decode(encoded.encode('ascii'), altchars=b'-_').decode('ascii').split(':')
+            return float(score), int(user_id)
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, cursor):
+        score, user_id = cursor
+        return b64encode(f'{score!r}:{user_id}'.encode('ascii'), altchars=b'-_').decode('ascii')
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_cursor))
+
+    def get_paginated_response(self, data):
+        response = OrderedDict([('next', self.get_next_link())])
+        if self.request.query_params.get(self.total_query_param) in ('1', 'true'):
+            response['total'] = self.board.count()
+        response['results'] = data
+        return Response(response)
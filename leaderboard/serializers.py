@@ -12,11 +12,19 @@ class LeaderboardSerializer(serializers.ModelSerializer):
 class LeaderboardUserSerializer(serializers.ModelSerializer):
     total_obtained_marks = serializers.IntegerField(read_only=True)
     rank = serializers.IntegerField(read_only=True)
-    previous_daily_rank = serializers.IntegerField(read_only=True)
-    previous_weekly_rank = serializers.IntegerField(read_only=True)
+    previous_daily_rank = serializers.SerializerMethodField()
+    previous_weekly_rank = serializers.SerializerMethodField()
     rank_change = serializers.SerializerMethodField()
 
+    def get_previous_daily_rank(self, obj):
+        return obj.previous_rank if self.context.get('period') == 'daily' else None
+
+    def get_previous_weekly_rank(self, obj):
+        return obj.previous_rank if self.context.get('period') == 'weekly' else None
+
     def get_rank_change(self, obj):
+        if self.context.get('period') == 'all_time':
+            return None
         if not obj.previous_rank:
             return 'new'
         if obj.rank < obj.previous_rank:
@@ -0,0 +1,10 @@
+from django.dispatch import receiver
+
+from questions.models import TestHistory
+from questions.signals import submissions_saved
+from .engine import record_scores
+
+
+@receiver(submissions_saved, sender=TestHistory)
+def score_submissions(sender, histories, subject_marks=None, **kwargs):
+    record_scores(histories, subject_marks)
@@ -1,3 +1,307 @@
+import datetime
+from io import StringIO
+from unittest import mock, skipUnless
+from urllib.parse import parse_qs, urlparse
+
+from django.core.management import call_command
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from accounts.models import User
+from questions.models import Subjects, Streams, Chapters, Topics, Questions, ResultQuestionLink, TestHistory
+from leaderboard.engine import (
+    SNAPSHOT_DONE, RankedBoard, all_time_key, board_scope, daily_key, day_bounds, rebuild_board, record_scores,
+    snapshot_board, snapshot_key, weekly_key
+)
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+
+@skipUnless(fakeredis, "fakeredis is not installed")
+class LeaderboardTestMixin:
+    """Boards live in a throwaway fakeredis server; everything else uses the configured cache."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.stream = Streams.objects.create(stream_name="IOE")
+        cls.questions = {}
+        for name in ("Physics", "Maths"):
+            subject = Subjects.objects.create(subject_name=name)
+            topic = Topics.objects.create(chapter=Chapters.objects.create(sub_id=subject, chapter_name=name), topic_name=name)
+            cls.questions[subject] = Questions.objects.create(topic=topic, question=name, options=["a"], answer="a")
+        cls.physics, cls.maths = cls.questions
+        cls.users = [
+            User.objects.create_user(email=f'{name}@example.com', password='password123', username=name)
+            for name in ('ana', 'bo', 'cy', 'di', 'ed', 'flo')
+        ]
+
+    def setUp(self):
+        self.redis = fakeredis.FakeRedis()
+        patcher = mock.patch('leaderboard.engine._redis', return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def submit(self, user, marks, subject=None, days_ago=0):
+        """Score a submission the way flush/save do: history, its result link, then the boards."""
+        subject = subject or self.physics
+        history = TestHistory.objects.create(user=user, total_marks=100, obtained_marks=marks, stream=self.stream)
+        if days_ago:
+            history.created_at = timezone.now() - datetime.timedelta(days=days_ago)
+            TestHistory.objects.filter(pk=history.pk).update(created_at=history.created_at)
+        ResultQuestionLink.objects.create(
+            result_id=history, question_id=self.questions[subject], user_answer="a",
+            is_correct=True, total_marks=marks, marks_obtained=marks
+        )
+        record_scores([history], {history.pk: {subject.id: marks}})
+        return history
+
+    def ranks(self, rows):
+        return [(user.username, user.rank) for user in rows]
+
+
+class RankedBoardTests(LeaderboardTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        ana, bo, cy, di = self.users[:4]
+        for user, marks in ((ana, 30), (bo, 20), (cy, 20), (di, 10)):
+            self.submit(user, marks)
+        self.board = RankedBoard(daily_key())
+
+    def test_tied_scores_share_a_rank_and_the_next_rank_skips(self):
+        rows = self.board[0:10]
+        self.assertEqual([user.rank for user in rows], [1, 2, 2, 4])
+        self.assertEqual([user.total_obtained_marks for user in rows], [30, 20, 20, 10])
+        self.assertEqual(rows[0].username, 'ana')
+        self.assertEqual(self.board.count(), 4)
+
+    def test_page_starting_inside_a_tie_keeps_the_shared_rank(self):
+        first_page, second_page = self.board[0:2], self.board[2:4]
+        self.assertEqual([user.rank for user in second_page], [2, 4])
+        self.assertEqual({first_page[1].username, second_page[0].username}, {'bo', 'cy'})
+
+    def test_users_deleted_since_scoring_are_skipped(self):
+        self.users[1].delete() # bo
+        self.assertEqual(self.ranks(self.board[0:10]), [('ana', 1), ('cy', 2), ('di', 4)])
+
+    def test_rebuild_matches_the_incremental_boards(self):
+        self.submit(self.users[0], 7, subject=self.maths)
+        self.submit(self.users[4], 12, days_ago=3)
+        start, end = day_bounds(timezone.localdate())
+        boards = [
+            (all_time_key(), {}),
+            (daily_key(), {'start': start, 'end': end}),
+            (all_time_key(scope=board_scope(stream_id=self.stream.id)), {'stream_id': self.stream.id}),
+            (all_time_key(scope=board_scope(subject_id=self.physics.id)), {'subject_id': self.physics.id}),
+            (all_time_key(scope=board_scope(subject_id=self.maths.id)), {'subject_id': self.maths.id}),
+        ]
+        for key, scope in boards:
+            incremental = self.redis.zrange(key, 0, -1, withscores=True)
+            self.assertEqual(rebuild_board(key, **scope), len(incremental))
+            self.assertEqual(self.redis.zrange(key, 0, -1, withscores=True), incremental, key)
+
+
+class KeysetPaginationTests(LeaderboardTestMixin, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.users[0])
+
+    def get_page(self, cursor='', **params):
+        return self.client.get(reverse('daily-leaderboard'), {'cursor': cursor, 'page_size': 2, **params})
+
+    def walk(self):
+        """Every page from the top, following `next`; returns the rows served."""
+        rows, cursor = [], ''
+        while cursor is not None:
+            response = self.get_page(cursor)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            rows += response.data['results']
+            cursor = response.data['next'] and parse_qs(urlparse(response.data['next']).query)['cursor'][0]
+        return rows
+
+    def test_pages_through_a_block_of_tied_scores(self):
+        self.submit(self.users[0], 20)
+        for user in self.users[1:]:
+            self.submit(user, 10)
+        rows = self.walk()
+        self.assertEqual(sorted(row['id'] for row in rows), sorted(user.id for user in self.users))
+        self.assertEqual([row['rank'] for row in rows], [1, 2, 2, 2, 2, 2])
+
+    def test_cursor_user_scoring_between_pages_skips_nobody(self):
+        for user, marks in zip(self.users[:5], (50, 40, 30, 20, 10)):
+            self.submit(user, marks)
+        first = self.get_page()
+        self.assertEqual([row['username'] for row in first.data['results']], ['ana', 'bo'])
+
+        self.submit(self.users[1], 5) # bo, whose row the cursor points at, moves up
+        cursor = parse_qs(urlparse(first.data['next']).query)['cursor'][0]
+        second = self.get_page(cursor)
+        self.assertEqual([row['username'] for row in second.data['results']], ['cy', 'di'])
+
+    def test_invalid_cursor_is_not_found(self):
+        self.submit(self.users[0], 10)
+        self.assertEqual(self.get_page('Zm9v').status_code, status.HTTP_404_NOT_FOUND) # "foo"
+        self.assertEqual(self.get_page('%%%').status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_total_only_when_asked_for(self):
+        for user in self.users[:3]:
+            self.submit(user, 10)
+        plain = self.client.get(reverse('daily-leaderboard'), {'pagination': 'cursor'})
+        self.assertNotIn('total', plain.data)
+        self.assertNotIn('count', plain.data)
+        with_total = self.client.get(reverse('daily-leaderboard'), {'pagination': 'cursor', 'include_total': 1})
+        self.assertEqual(with_total.data['total'], 3)
+        self.assertEqual(len(with_total.data['results']), 3)
+
+
+class SnapshotTests(LeaderboardTestMixin, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.yesterday = daily_key(timezone.localdate() - datetime.timedelta(days=1))
+
+    def frozen(self, key):
+        return {field.decode(): int(rank) for field, rank in self.redis.hgetall(snapshot_key(key)).items()}
+
+    def test_ranks_are_frozen_with_ties_sharing_a_rank(self):
+        ana, bo, cy, di = self.users[:4]
+        for user, marks in ((ana, 30), (bo, 20), (cy, 20), (di, 10)):
+            self.submit(user, marks, days_ago=1)
+        self.assertEqual(snapshot_board(self.yesterday), 4)
+        self.assertEqual(self.frozen(self.yesterday), {
+            SNAPSHOT_DONE: 0, str(ana.id): 1, str(bo.id): 2, str(cy.id): 2, str(di.id): 4
+        })
+        self.assertIsNone(snapshot_board(self.yesterday)) # Already frozen
+
+    def test_an_empty_board_gets_the_marker(self):
+        self.assertEqual(snapshot_board(self.yesterday), 0)
+        self.assertEqual(self.frozen(self.yesterday), {SNAPSHOT_DONE: 0})
+        self.assertIsNone(snapshot_board(self.yesterday))
+
+    def test_command_rebuilds_existing_snapshots_only_with_force(self):
+        ana, bo = self.users[:2]
+        self.submit(ana, 10, days_ago=1)
+        call_command('snapshot_leaderboards', stdout=StringIO())
+        self.assertEqual(self.frozen(self.yesterday), {SNAPSHOT_DONE: 0, str(ana.id): 1})
+        last_week = weekly_key(timezone.localdate() - datetime.timedelta(weeks=1))
+        self.assertEqual(self.frozen(last_week), {SNAPSHOT_DONE: 0})
+
+        self.submit(bo, 20, days_ago=1) # Late arrival for the closed day
+        out = StringIO()
+        call_command('snapshot_leaderboards', stdout=out)
+        self.assertIn(f"{self.yesterday}: snapshot already exists", out.getvalue())
+        self.assertEqual(self.frozen(self.yesterday), {SNAPSHOT_DONE: 0, str(ana.id): 1})
+
+        call_command('snapshot_leaderboards', '--force', stdout=StringIO())
+        self.assertEqual(self.frozen(self.yesterday), {SNAPSHOT_DONE: 0, str(bo.id): 1, str(ana.id): 2})
+
+    def test_rows_carry_previous_rank_and_rank_change(self):
+        ana, bo, cy = self.users[:3]
+        self.submit(ana, 30, days_ago=1)
+        self.submit(bo, 20, days_ago=1)
+        self.submit(bo, 50)
+        self.submit(ana, 40)
+        self.submit(cy, 40)
+        snapshot_board(self.yesterday)
+
+        rows = RankedBoard(daily_key(), previous_key=self.yesterday)[0:10]
+        self.assertEqual((rows[0].username, rows[0].rank, rows[0].previous_rank), ('bo', 1, 2))
+        self.assertEqual({(user.username, user.rank, user.previous_rank) for user in rows[1:]},
+                         {('ana', 2, 1), ('cy', 2, None)})
+
+        self.client.force_authenticate(ana)
+        response = self.client.get(reverse('daily-leaderboard'))
+        self.assertEqual(
+            {row['username']: (row['previous_daily_rank'], row['rank_change']) for row in response.data['results']},
+            {'bo': (2, 'up'), 'ana': (1, 'down'), 'cy': (None, 'new')}
+        )
+
+    def test_reads_never_build_a_missing_snapshot(self):
+        ana = self.users[0]
+        self.submit(ana, 30, days_ago=1)
+        self.submit(ana, 40)
+
+        rows = RankedBoard(daily_key(), previous_key=self.yesterday)[0:10]
+        self.assertEqual([(user.rank, user.previous_rank) for user in rows], [(1, None)])
+        self.assertFalse(self.redis.exists(snapshot_key(self.yesterday)))
+
+
+class AroundMeTests(LeaderboardTestMixin, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        for user, marks in zip(self.users[:5], (50, 40, 30, 20, 10)):
+            self.submit(user, marks)
+
+    def around(self, user, neighbours=2):
+        self.client.force_authenticate(user)
+        return self.client.get(reverse('daily-leaderboard-me'), {'neighbours': neighbours})
+
+    def test_window_is_cut_at_the_top_and_bottom_of_the_board(self):
+        top = self.around(self.users[0]).data
+        self.assertEqual([row['username'] for row in top['results']], ['ana', 'bo', 'cy'])
+        self.assertEqual((top['me']['username'], top['me']['rank']), ('ana', 1))
+
+        bottom = self.around(self.users[4]).data
+        self.assertEqual([row['username'] for row in bottom['results']], ['cy', 'di', 'ed'])
+        self.assertEqual((bottom['me']['username'], bottom['me']['rank']), ('ed', 5))
+
+        middle = self.around(self.users[2], neighbours=1).data
+        self.assertEqual([row['rank'] for row in middle['results']], [2, 3, 4])
+
+    def test_me_is_null_before_scoring(self):
+        response = self.around(self.users[5])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'me': None, 'results': []})
+
+
+class ScopedBoardTests(LeaderboardTestMixin, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.users[0])
+
+    def board(self, **params):
+        response = self.client.get(reverse('all-time-leaderboard'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [(row['username'], row['total_obtained_marks']) for row in response.data['results']]
+
+    def test_subject_boards_count_only_that_subjects_marks(self):
+        ana, bo = self.users[:2]
+        self.submit(ana, 30, subject=self.physics)
+        self.submit(ana, 5, subject=self.maths)
+        self.submit(bo, 20, subject=self.maths)
+
+        self.assertEqual(self.board(subject=self.physics.id), [('ana', 30)])
+        self.assertEqual(self.board(subject=self.maths.id), [('bo', 20), ('ana', 5)])
+        self.assertEqual(self.board(stream=self.stream.id), [('ana', 35), ('bo', 20)])
+        self.assertEqual(self.board(), [('ana', 35), ('bo', 20)])
+
+    def test_all_time_board_keeps_older_scores(self):
+        for user, marks in zip(self.users[:3], (30, 20, 10)):
+            self.submit(user, marks, days_ago=10)
+        self.assertEqual(self.board(), [('ana', 30), ('bo', 20), ('cy', 10)])
+
+        first = self.client.get(reverse('all-time-leaderboard'), {'cursor': '', 'page_size': 2}).data
+        self.assertEqual([row['username'] for row in first['results']], ['ana', 'bo'])
+        cursor = parse_qs(urlparse(first['next']).query)['cursor'][0]
+        second = self.client.get(reverse('all-time-leaderboard'), {'cursor': cursor, 'page_size': 2}).data
+        self.assertEqual([row['username'] for row in second['results']], ['cy'])
+
+        me = self.client.get(reverse('all-time-leaderboard-me'), {'neighbours': 1}).data
+        self.assertEqual((me['me']['username'], me['me']['rank']), ('ana', 1))
+        self.assertEqual(self.client.get(reverse('daily-leaderboard-me')).data['me'], None)
 
-# Create your tests here.
+    def test_stream_and_subject_together_are_rejected(self):
+        response = self.client.get(reverse('all-time-leaderboard'), {'stream': self.stream.id, 'subject': self.physics.id})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(reverse('daily-leaderboard-me'), {'stream': self.stream.id, 'subject': self.physics.id})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(reverse('all-time-leaderboard'), {'subject': 'x'}).status_code,
+                         status.HTTP_400_BAD_REQUEST)
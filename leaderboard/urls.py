@@ -1,7 +1,14 @@
 from django.urls import path
-from .views import DailyLeaderboardView, WeeklyLeaderboardView
+from .views import (
+    DailyLeaderboardView, WeeklyLeaderboardView, AllTimeLeaderboardView,
+    DailyAroundMeView, WeeklyAroundMeView, AllTimeAroundMeView
+)
 
 urlpatterns = [
     path('daily/', DailyLeaderboardView.as_view(), name='daily-leaderboard'),
     path('weekly/', WeeklyLeaderboardView.as_view(), name='weekly-leaderboard'),
+    path('all-time/', AllTimeLeaderboardView.as_view(), name='all-time-leaderboard'),
+    path('daily/me/', DailyAroundMeView.as_view(), name='daily-leaderboard-me'),
+    path('weekly/me/', WeeklyAroundMeView.as_view(), name='weekly-leaderboard-me'),
+    path('all-time/me/', AllTimeAroundMeView.as_view(), name='all-time-leaderboard-me'),
 ]
\ No newline at end of file
@@ -2,67 +2,102 @@ from django.shortcuts import render
 
 # Create your views here.
 from django.utils import timezone
-from datetime import timedelta, datetime
-from django.db.models import Sum, Q
+from datetime import timedelta
 from rest_framework import generics, permissions
-from accounts.models import User
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
 from .serializers import LeaderboardSerializer, LeaderboardUserSerializer
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
-from django.db.models import Subquery, OuterRef, F, Window
-from django.db.models.functions import Rank, Coalesce
-from .pagination import LeaderboardPagination
+from .engine import RankedBoard, all_time_key, board_scope, daily_key, weekly_key
+from .pagination import LeaderboardCursorPagination, LeaderboardPagination
 
 
 class BaseLeaderboardView(generics.ListAPIView):
     serializer_class = LeaderboardUserSerializer
     permission_classes = [permissions.IsAuthenticated]
     pagination_class = LeaderboardPagination 
+    filter_backends = [] # The "queryset" is a Redis sorted set, not a QuerySet
     
     def get_queryset(self):
-        start_date = self.get_start_date()
-        period_type = 'daily' if isinstance(self, DailyLeaderboardView) else 'weekly'
-        
-        return User.objects.annotate(
-            total_obtained_marks=Coalesce(
-                Sum(
-                    'testhistory__obtained_marks',
-                    filter=Q(testhistory__created_at__gte=start_date)
-                ),
-                0
-            )
-        ).annotate(
-            rank=Window(
-                expression=Rank(),
-                order_by=F('total_obtained_marks').desc()
-            )
-        ).annotate(
-            previous_rank=Subquery(
-                User.objects.filter(
-                    id=OuterRef('id')
-                ).annotate(
-                    prev_marks=Sum(
-                        'testhistory__obtained_marks',
-                        filter=Q(testhistory__created_at__range=[
-                            self.get_previous_period_start(),
-                            start_date
-                        ])
-                    )
-                ).annotate(
-                    prev_rank=Window(
-                        expression=Rank(),
-                        order_by=F('prev_marks').desc()
-                    )
-                ).values('prev_rank')[:1]
-            )
-        ).order_by('-total_obtained_marks')
-
-    def get_previous_period_start(self):
-        if isinstance(self, DailyLeaderboardView):
-            return self.get_start_date() - timedelta(days=1)
-        return self.get_start_date() - timedelta(weeks=1)
-    
+        # Maintained incrementally on submission (leaderboard.signals); the paginator
+        # pages it with ZREVRANGE and resolves the page's users in one query
+        today = timezone.localdate()
+        scope = board_scope(**self.get_scope())
+        return RankedBoard(
+            self.get_board_key(today, scope),
+            previous_key=self.get_board_key(today - self.period_length, scope) if self.period_length else None
+        )
+
+    def get_scope(self):
+        """?stream=<id> or ?subject=<id> narrows the board; neither means every submission."""
+        scope = {}
+        for param in ('stream', 'subject'):
+            value = self.request.query_params.get(param)
+            if value:
+                try:
+                    scope[f'{param}_id'] = int(value)
+                except ValueError:
+                    raise ValidationError({param: 'A valid integer is required.'})
+        if len(scope) > 1:
+            raise ValidationError({'detail': 'Filter by stream or by subject, not both.'})
+        return scope
+
+    def get_serializer_context(self):
+        return {**super().get_serializer_context(), 'period': self.period}
+
+    @property
+    def paginator(self):
+        # ?cursor= (empty for the first page) or ?pagination=cursor switches to keyset paging
+        if not hasattr(self, '_paginator'):
+            params = self.request.query_params
+            if self.pagination_class is None:
+                self._paginator = None
+            elif 'cursor' in params or params.get('pagination') == 'cursor':
+                self._paginator = LeaderboardCursorPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
+
+SCOPE_PARAMETERS = [
+    openapi.Parameter(
+        name='stream',
+        in_=openapi.IN_QUERY,
+        type=openapi.TYPE_INTEGER,
+        description='Rank only tests taken in this stream'
+    ),
+    openapi.Parameter(
+        name='subject',
+        in_=openapi.IN_QUERY,
+        type=openapi.TYPE_INTEGER,
+        description="Rank by marks from this subject's questions only (cannot be combined with stream)"
+    ),
+]
+
+CURSOR_PARAMETERS = [
+    openapi.Parameter(
+        name='cursor',
+        in_=openapi.IN_QUERY,
+        type=openapi.TYPE_STRING,
+        description='Keyset paging: send it empty (or pagination=cursor) for the first page, then follow `next`. The response has no count or page numbers'
+    ),
+    openapi.Parameter(
+        name='include_total',
+        in_=openapi.IN_QUERY,
+        type=openapi.TYPE_BOOLEAN,
+        description='With cursor paging, also return `total`, the current number of ranked users'
+    ),
+]
+
+
 class DailyLeaderboardView(BaseLeaderboardView):
+    period = 'daily'
+    period_length = timedelta(days=1)
+
+    def get_board_key(self, day, scope=''):
+        return daily_key(day, scope)
+
     @swagger_auto_schema(
         operation_id='leaderboard_daily',
         operation_summary='Get daily leaderboard',
@@ -94,15 +129,21 @@ class DailyLeaderboardView(BaseLeaderboardView):
             in_=openapi.IN_QUERY,
             type=openapi.TYPE_INTEGER,
             description='Number of results per page (max 100)'
-        )
+        ),
+        *SCOPE_PARAMETERS,
+        *CURSOR_PARAMETERS
         ]
     )
-    def get_start_date(self):
-        return timezone.now().replace(
-            hour=0, minute=0, second=0, microsecond=0
-        )
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
 
 class WeeklyLeaderboardView(BaseLeaderboardView):
+    period = 'weekly'
+    period_length = timedelta(weeks=1)
+
+    def get_board_key(self, day, scope=''):
+        return weekly_key(day, scope)
+
     @swagger_auto_schema(
         operation_id='leaderboard_weekly',
         operation_summary='Get weekly leaderboard',
@@ -123,13 +164,111 @@ class WeeklyLeaderboardView(BaseLeaderboardView):
                 type=openapi.TYPE_STRING,
                 description='Bearer token',
                 required=True
-            )
+            ),
+            *SCOPE_PARAMETERS,
+            *CURSOR_PARAMETERS
         ]
     )
-    def get_start_date(self):
-        today = timezone.now().date()
-        # For Monday-based week (0=Monday)
-        start_of_week = today - timedelta(days=today.weekday())
-        return timezone.make_aware(
-            datetime.combine(start_of_week, datetime.min.time())
-        )
\ No newline at end of file
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+
+class AllTimeLeaderboardView(BaseLeaderboardView):
+    period = 'all_time'
+    period_length = None # Never closes, so there is no previous board to compare with
+
+    def get_board_key(self, day, scope=''):
+        return all_time_key(scope=scope)
+
+    @swagger_auto_schema(
+        operation_id='leaderboard_all_time',
+        operation_summary='Get all-time leaderboard',
+        operation_description='Get top users based on total marks obtained across all their tests. `rank_change` is always null.',
+        responses={
+            200: LeaderboardSerializer(many=True),
+            401: 'Unauthorized',
+        },
+        security=[{'Bearer': []}],
+        tags=['Leaderboard'],
+        manual_parameters=[
+            openapi.Parameter(
+                name='Authorization',
+                in_=openapi.IN_HEADER,
+                type=openapi.TYPE_STRING,
+                description='Bearer token',
+                required=True
+            ),
+            *SCOPE_PARAMETERS,
+            *CURSOR_PARAMETERS
+        ]
+    )
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+
+class AroundMeMixin:
+    """ The caller's own row plus their neighbours on the same board. """
+    pagination_class = None
+    default_neighbours = 5
+    max_neighbours = 50
+
+    def get(self, request, *args, **kwargs):
+        try:
+            neighbours = min(max(int(request.query_params.get('neighbours', self.default_neighbours)), 0), self.max_neighbours)
+        except ValueError:
+            neighbours = self.default_neighbours
+        rows = self.get_serializer(self.get_queryset().around(request.user.id, neighbours), many=True).data
+        return Response({
+            'me': next((row for row in rows if row['id'] == request.user.id), None),
+            'results': rows,
+        })
+
+
+AROUND_ME_PARAMETERS = [
+    openapi.Parameter(
+        name='neighbours',
+        in_=openapi.IN_QUERY,
+        type=openapi.TYPE_INTEGER,
+        description='Users to include above and below you (default 5, max 50)'
+    ),
+    *SCOPE_PARAMETERS
+]
+
+
+class DailyAroundMeView(AroundMeMixin, DailyLeaderboardView):
+    @swagger_auto_schema(
+        operation_id='leaderboard_daily_me',
+        operation_summary="Get your position on today's leaderboard",
+        operation_description="Your rank today plus your neighbours above and below. `me` is null if you haven't scored today.",
+        responses={401: 'Unauthorized'},
+        tags=['Leaderboard'],
+        manual_parameters=AROUND_ME_PARAMETERS
+    )
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+
+class WeeklyAroundMeView(AroundMeMixin, WeeklyLeaderboardView):
+    @swagger_auto_schema(
+        operation_id='leaderboard_weekly_me',
+        operation_summary="Get your position on this week's leaderboard",
+        operation_description="Your rank this week plus your neighbours above and below. `me` is null if you haven't scored this week.",
+        responses={401: 'Unauthorized'},
+        tags=['Leaderboard'],
+        manual_parameters=AROUND_ME_PARAMETERS
+    )
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+
+class AllTimeAroundMeView(AroundMeMixin, AllTimeLeaderboardView):
+    @swagger_auto_schema(
+        operation_id='leaderboard_all_time_me',
+        operation_summary="Get your position on the all-time leaderboard",
+        operation_description="Your all-time rank plus your neighbours above and below. `me` is null if you have never scored.",
+        responses={401: 'Unauthorized'},
+        tags=['Leaderboard'],
+        manual_parameters=AROUND_ME_PARAMETERS
+    )
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
@@ -1,8 +1,19 @@
 from django.contrib import admin
 
 # Register your models here.
-from .models import Subjects, Streams, Chapters
+from .models import Subjects, Streams, Chapters, ExamBlueprint, BlueprintChapter
 
 admin.site.register(Subjects)
 admin.site.register(Streams)
-admin.site.register(Chapters)
\ No newline at end of file
+admin.site.register(Chapters)
+
+
+class BlueprintChapterInline(admin.TabularInline):
+    model = BlueprintChapter
+    extra = 0
+
+
+@admin.register(ExamBlueprint)
+class ExamBlueprintAdmin(admin.ModelAdmin):
+    list_display = ('stream', 'updated_at')
+    inlines = [BlueprintChapterInline]
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class QuestionsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'questions'
+
+    def ready(self):
+        import questions.signals  # noqa: F401
+        import questions.faiss_engine.signals  # noqa: F401
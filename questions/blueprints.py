@@ -0,0 +1,167 @@
+from collections import namedtuple
+
+from django.core.cache import cache
+
+from .counters import bump_counter, read_counter
+
+# Bumped whenever a blueprint (or a chapter it points at) changes; compiled plans
+# are cached under the version they were built from, so a bump invalidates them all.
+BLUEPRINT_VERSION_KEY = 'blueprint:version'
+BLUEPRINT_PLAN_KEY = 'blueprint:plan:{stream_name}:v{version}'
+BLUEPRINT_PLAN_TIMEOUT = 60 * 60 * 24
+
+# The IOE syllabus that used to be hardcoded in views.generate_mock_test.
+IOE_SYLLABUS = {
+    "English": {
+        "Reading Passage": {"mark1": 0, "mark2": 4},
+        "Grammar": {"mark1": 10, "mark2": 0},
+        "Vocabulary": {"mark1": 2, "mark2": 0},
+        "Phonemes and Stress": {"mark1": 2, "mark2": 0},
+    },
+    "Maths": {
+        "Set and Function": {"mark1": 1, "mark2": 1},
+        "Algebra": {"mark1": 2, "mark2": 4},
+        "Trigonometry": {"mark1": 1, "mark2": 2},
+        "Coordinate Geometry": {"mark1": 2, "mark2": 4},
+        "Calculus": {"mark1": 3, "mark2": 4},
+        "Vectors": {"mark1": 1, "mark2": 1},
+    },
+    "Physics": {
+        "Mechanics": {"mark1": 2, "mark2": 4},
+        "Heat and Thermodynamics": {"mark1": 2, "mark2": 1},
+        "Wave and Optics": {"mark1": 2, "mark2": 3},
+        "Electricity and Magnetism": {"mark1": 2, "mark2": 4},
+        "Modern Physics and Electronics": {"mark1": 2, "mark2": 3},
+    },
+    "Chemistry": {
+        "Physical Chemistry": {"mark1": 6, "mark2": 3},
+        "Inorganic Chemistry": {"mark1": 3, "mark2": 1},
+        "Organic Chemistry": {"mark1": 3, "mark2": 0},
+    },
+}
+DEFAULT_SYLLABI = {'IOE': IOE_SYLLABUS}
+
+BlueprintEntry = namedtuple('BlueprintEntry', [
+    'subject_id', 'subject_name', 'chapter_id', 'chapter_name', 'marks', 'num_questions'
+])
+
+
+class CompiledBlueprint:
+    """Id-resolved exam plan for one stream; cheap to pickle into the cache."""
+    def __init__(self, stream_id, stream_name, version, entries):
+        self.stream_id = stream_id
+        self.stream_name = stream_name
+        self.version = version
+        self.entries = tuple(entries) # Ordered as configured: subject, chapter, marks
+
+    @property
+    def total_questions(self):
+        return sum(entry.num_questions for entry in self.entries)
+
+    @property
+    def total_marks(self):
+        return sum(entry.marks * entry.num_questions for entry in self.entries)
+
+    def as_syllabus(self):
+        """The blueprint in the SYLLABUS shape used by the study-plan agents."""
+        syllabus = {}
+        for entry in self.entries:
+            subject = syllabus.setdefault(entry.subject_name, {
+                "Subject": entry.subject_name, "Total_marks": 0, "Number_of_questions": 0, "Chapters": {}
+            })
+            marks = subject["Chapters"].setdefault(entry.chapter_name, {"mark1": 0, "mark2": 0})
+            marks[f"mark{entry.marks}"] = entry.num_questions
+            subject["Total_marks"] += entry.marks * entry.num_questions
+            subject["Number_of_questions"] += entry.num_questions
+        return list(syllabus.values())
+
+
+_local_plans = {}
+
+
+def current_version():
+    return read_counter(BLUEPRINT_VERSION_KEY)
+
+
+def invalidate_blueprints():
+    """Invalidate every compiled plan (called from the blueprint/chapter signals)."""
+    bump_counter(BLUEPRINT_VERSION_KEY)
+    _local_plans.clear()
+
+
+def compile_blueprint(stream_name, version):
+    """
+    Resolve a stream's blueprint into ids with two queries.
+    Raises Streams.DoesNotExist if the stream is unknown. A stream without a
+    blueprint compiles to an empty plan (custom tests only need the stream id).
+    """
+    from questions.models import Streams, BlueprintChapter
+    stream = Streams.objects.get(stream_name=stream_name)
+    rows = BlueprintChapter.objects.filter(
+        blueprint__stream=stream, num_questions__gt=0
+    ).select_related('chapter__sub_id').order_by('id')
+    entries = [
+        BlueprintEntry(
+            subject_id=row.chapter.sub_id_id,
+            subject_name=row.chapter.sub_id.subject_name,
+            chapter_id=row.chapter_id,
+            chapter_name=row.chapter.chapter_name,
+            marks=row.marks,
+            num_questions=row.num_questions,
+        )
+        for row in rows
+    ]
+    return CompiledBlueprint(stream.id, stream.stream_name, version, entries)
+
+
+def get_compiled_blueprint(stream_name='IOE'):
+    """
+    Return the compiled plan for a stream, building it at most once per version.
+    Raises Streams.DoesNotExist if the stream is unknown.
+    """
+    version = current_version()
+    plan = _local_plans.get(stream_name)
+    if plan is not None and plan.version == version:
+        return plan
+
+    key = BLUEPRINT_PLAN_KEY.format(stream_name=stream_name, version=version)
+    plan = cache.get(key)
+    if plan is None:
+        plan = compile_blueprint(stream_name, version)
+        cache.set(key, plan, BLUEPRINT_PLAN_TIMEOUT)
+    _local_plans[stream_name] = plan
+    return plan
+
+
+def seed_blueprint(stream_name, syllabus):
+    """
+    Create or update a stream's blueprint from a {subject: {chapter: {'mark1': n,
+    'mark2': n}}} syllabus; chapters missing from the DB are skipped. Returns the
+    number of chapter rows written, or None if the stream doesn't exist yet.
+    """
+    from questions.models import Streams, Chapters, ExamBlueprint, BlueprintChapter
+    stream = Streams.objects.filter(stream_name=stream_name).first()
+    if stream is None:
+        return None
+
+    blueprint, _ = ExamBlueprint.objects.get_or_create(stream=stream)
+    chapters = {
+        (subject_name, chapter_name): chapter_id
+        for chapter_id, subject_name, chapter_name in Chapters.objects.filter(
+            sub_id__subject_name__in=list(syllabus)
+        ).values_list('id', 'sub_id__subject_name', 'chapter_name')
+    }
+    written = 0
+    for subject_name, subject_chapters in syllabus.items():
+        for chapter_name, marks_info in subject_chapters.items():
+            chapter_id = chapters.get((subject_name, chapter_name))
+            if chapter_id is None:
+                continue
+            for marks, key in ((1, 'mark1'), (2, 'mark2')):
+                if marks_info[key] > 0:
+                    BlueprintChapter.objects.update_or_create(
+                        blueprint=blueprint, chapter_id=chapter_id, marks=marks,
+                        defaults={'num_questions': marks_info[key]},
+                    )
+                    written += 1
+    return written
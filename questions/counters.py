@@ -0,0 +1,26 @@
+import time
+
+from django.core.cache import cache
+
+# Shared version counters. Derived data is cached under the counter value it was
+# built from, and each process keeps its own copy until the counter moves, so the
+# warm path is a single cache read.
+
+
+def read_counter(key):
+    """Current value of the counter at `key`, creating it on first use."""
+    value = cache.get(key)
+    if value is None:
+        # Seeded from the clock so a flushed cache never reuses a value a process has seen
+        cache.add(key, time.time_ns(), None)
+        value = cache.get(key)
+    return value
+
+
+def bump_counter(key):
+    """Atomically increment the counter at `key` and return the new value."""
+    try:
+        return cache.incr(key)
+    except ValueError: # Key not set yet
+        read_counter(key)
+        return cache.incr(key)
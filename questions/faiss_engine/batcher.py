@@ -0,0 +1,59 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent calls: items submitted within `max_wait` seconds of
+    the first one (up to `max_batch` of them) go to a single `handler(items)`
+    call, which must return one result per item, in order. The handler runs on
+    one daemon thread, started on first use so it survives pre-fork servers.
+    """
+    def __init__(self, handler, max_batch: int = 16, max_wait: float = 0.005):
+        self.handler = handler
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue = queue.SimpleQueue()
+        self._worker = None
+        self._lock = threading.Lock()
+
+    def submit(self, item):
+        """Queue `item` and block until its batch has been handled; re-raises the handler's error."""
+        future = Future()
+        self._queue.put((item, future))
+        self._ensure_worker()
+        return future.result()
+
+    def _ensure_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            with self._lock:
+                if self._worker is None or not self._worker.is_alive():
+                    self._worker = threading.Thread(target=self._run, name='similarity-batcher', daemon=True)
+                    self._worker.start()
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                results = self.handler([item for item, _ in batch])
+            except Exception as exc:
+                for _, future in batch:
+                    future.set_exception(exc)
+            else:
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
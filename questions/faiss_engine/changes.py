@@ -0,0 +1,37 @@
+from django.core.cache import cache
+
+from ..counters import bump_counter, read_counter
+
+# Shared log of question ids whose text changed (created, edited or deleted),
+# numbered by a counter. Each process remembers the last number it applied to
+# its own index and replays only what came after it.
+CHANGE_SEQ_KEY = 'qindex:seq'
+CHANGE_KEY = 'qindex:change:{seq}'
+CHANGE_TIMEOUT = 60 * 60 * 24 * 7
+MAX_REPLAY = 5000 # Further behind than this, reconciling ids against the DB is cheaper
+
+
+def current_seq():
+    return read_counter(CHANGE_SEQ_KEY)
+
+
+def record_change(question_id):
+    seq = bump_counter(CHANGE_SEQ_KEY)
+    cache.set(CHANGE_KEY.format(seq=seq), question_id, CHANGE_TIMEOUT)
+
+
+def changes_since(seq):
+    """
+    (latest seq, ids changed after `seq`). The ids are None when the log can no
+    longer cover the gap (entries expired, cache flushed, or too far behind) and
+    the caller has to reconcile against the database instead.
+    """
+    latest = current_seq()
+    if latest == seq:
+        return latest, set()
+    if latest < seq or latest - seq > MAX_REPLAY:
+        return latest, None
+    entries = cache.get_many([CHANGE_KEY.format(seq=n) for n in range(seq + 1, latest + 1)])
+    if len(entries) < latest - seq:
+        return latest, None
+    return latest, set(entries.values())
@@ -1,17 +1,77 @@
-from sentence_transformers import SentenceTransformer, CrossEncoder
+import threading
+
+import numpy as np
+from django.conf import settings
+
+from .embedding_cache import cache_timeout, embedding_key, get_embeddings, normalize_text, put_embeddings
+
+CACHE_CHUNK = 1000 # Keys per cache round trip when embedding a large batch
+
 
 class TextEmbedder:
-    """Handles bi-encoder and cross-encoder models."""
+    """
+    Handles bi-encoder and cross-encoder models. Each model (and
+    sentence_transformers itself) is loaded on first use, so processes that
+    never serve similarity traffic don't pay for them.
+    """
     def __init__(self,
                  bi_model_name: str = 'all-MiniLM-L12-v2',
                  rerank_model_name: str = 'cross-encoder/ms-marco-MiniLM-L-6-v2'):
+        self.bi_model_name = bi_model_name
+        self.rerank_model_name = rerank_model_name
+        self._bi_encoder = None
+        self._reranker = None
+        self._lock = threading.Lock()
+
+    @property
+    def bi_encoder(self):
         # Bi-encoder for vector search
-        self.bi_encoder = SentenceTransformer(bi_model_name)
+        if self._bi_encoder is None:
+            with self._lock:
+                if self._bi_encoder is None:
+                    from sentence_transformers import SentenceTransformer
+                    self._bi_encoder = SentenceTransformer(self.bi_model_name)
+        return self._bi_encoder
+
+    @property
+    def reranker(self):
         # Cross-encoder for reranking
-        self.reranker = CrossEncoder(rerank_model_name)
+        if self._reranker is None:
+            with self._lock:
+                if self._reranker is None:
+                    from sentence_transformers import CrossEncoder
+                    self._reranker = CrossEncoder(self.rerank_model_name)
+        return self._reranker
+
+    def dimension(self) -> int:
+        return self.bi_encoder.get_sentence_embedding_dimension()
 
     def encode_bi(self, texts, normalize: bool = True):
-        return self.bi_encoder.encode(texts, normalize_embeddings=normalize)
+        """
+        float32 vectors for `texts`, one row each. Texts are whitespace/Unicode
+        normalized, and only those missing from the embedding cache (by text
+        hash and model) go through the bi-encoder.
+        """
+        texts = [normalize_text(text) for text in texts]
+        if not cache_timeout():
+            return np.asarray(self.bi_encoder.encode(texts, normalize_embeddings=normalize), dtype='float32')
+        if not texts:
+            return np.zeros((0, self.dimension()), dtype='float32')
+
+        keys = [embedding_key(self.bi_model_name, text, normalize) for text in texts]
+        vectors = {}
+        for start in range(0, len(keys), CACHE_CHUNK):
+            vectors.update(get_embeddings(keys[start:start + CACHE_CHUNK]))
+
+        missing = {key: text for key, text in zip(keys, texts) if key not in vectors} # Also folds duplicates
+        if missing:
+            encoded = self.bi_encoder.encode(list(missing.values()), normalize_embeddings=normalize)
+            fresh = dict(zip(missing, np.asarray(encoded, dtype='float32')))
+            items = list(fresh.items())
+            for start in range(0, len(items), CACHE_CHUNK):
+                put_embeddings(dict(items[start:start + CACHE_CHUNK]))
+            vectors.update(fresh)
+        return np.stack([vectors[key] for key in keys])
 
     def rerank(self, query: str, candidates: list) -> list:
         # candidates: list of (id, text)
@@ -19,4 +79,19 @@ class TextEmbedder:
         scores = self.reranker.predict(pairs)
         # Return list of tuples: (id, text, score)
         return [(candidates[i][0], candidates[i][1], float(scores[i]))
-                for i in range(len(candidates))]
\ No newline at end of file
+                for i in range(len(candidates))]
+
+    def rerank_many(self, batches: list) -> list:
+        """rerank() for several (query, candidates) at once, with a single cross-encoder call."""
+        pairs = [(query, text) for query, candidates in batches for (_id, text) in candidates]
+        scores = iter(self.reranker.predict(pairs) if pairs else [])
+        return [[(qid, text, float(next(scores))) for (qid, text) in candidates] for _, candidates in batches]
+
+
+def get_embedder():
+    """The shared embedding server's client when EMBEDDING_SERVER_SOCKET is set, else in-process models."""
+    socket_path = getattr(settings, 'EMBEDDING_SERVER_SOCKET', None)
+    if socket_path:
+        from .embedding_server import RemoteEmbedder
+        return RemoteEmbedder(socket_path)
+    return TextEmbedder()
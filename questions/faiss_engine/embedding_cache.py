@@ -0,0 +1,37 @@
+import hashlib
+import unicodedata
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+# Content-addressed: the same text under the same model maps to the same entry,
+# whichever question, request or process produced it. Values are raw float32 bytes.
+EMBEDDING_KEY = 'emb:{digest}'
+
+
+def cache_timeout():
+    """Seconds to keep a vector; 0 turns the cache off."""
+    return getattr(settings, 'EMBEDDING_CACHE_TIMEOUT', 60 * 60 * 24 * 30)
+
+
+def normalize_text(text: str) -> str:
+    """Fold Unicode compatibility forms and collapse runs of whitespace."""
+    return ' '.join(unicodedata.normalize('NFKC', text).split())
+
+
+def embedding_key(model_name: str, text: str, normalized: bool) -> str:
+    digest = hashlib.sha256(f'{model_name}\0{int(normalized)}\0{text}'.encode('utf-8')).hexdigest()
+    return EMBEDDING_KEY.format(digest=digest)
+
+
+def get_embeddings(keys) -> dict:
+    """{key: float32 vector} for the keys that are cached."""
+    return {key: np.frombuffer(blob, dtype='float32') for key, blob in cache.get_many(list(keys)).items()}
+
+
+def put_embeddings(vectors: dict):
+    cache.set_many(
+        {key: np.asarray(vec, dtype='float32').tobytes() for key, vec in vectors.items()},
+        cache_timeout()
+    )
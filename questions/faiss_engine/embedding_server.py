@@ -0,0 +1,135 @@
+"""
+One local process holding the embedding models for every worker on the host.
+
+Workers talk to it over a Unix socket (EMBEDDING_SERVER_SOCKET, served by
+`manage.py run_embedding_server`). A message is two big-endian uint32 lengths,
+a JSON header and an optional binary payload; vectors travel as raw float32
+so nothing is pickled across the socket.
+"""
+import json
+import os
+import socket
+import socketserver
+import struct
+
+import numpy as np
+from django.conf import settings
+
+from .embedder import TextEmbedder
+
+PREFIX = struct.Struct('!II')
+
+
+class EmbeddingServerError(RuntimeError):
+    pass
+
+
+def _recv_exact(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise EmbeddingServerError("Embedding server connection closed mid-message")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def send_message(sock, header, payload=b''):
+    header = json.dumps(header).encode('utf-8')
+    sock.sendall(PREFIX.pack(len(header), len(payload)) + header + payload)
+
+
+def recv_message(sock):
+    header_size, payload_size = PREFIX.unpack(_recv_exact(sock, PREFIX.size))
+    header = json.loads(_recv_exact(sock, header_size))
+    return header, _recv_exact(sock, payload_size)
+
+
+class RemoteEmbedder:
+    """TextEmbedder's interface, answered by the embedding server."""
+    def __init__(self, socket_path: str, timeout: float = None):
+        self.socket_path = socket_path
+        self.timeout = timeout if timeout is not None else getattr(settings, 'EMBEDDING_SERVER_TIMEOUT', 30)
+        self._info = None
+
+    def _call(self, header):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            send_message(sock, header)
+            reply, payload = recv_message(sock)
+        if 'error' in reply:
+            raise EmbeddingServerError(reply['error'])
+        return reply, payload
+
+    def _server_info(self):
+        if self._info is None:
+            self._info, _ = self._call({'op': 'info'})
+        return self._info
+
+    @property
+    def bi_model_name(self):
+        return self._server_info()['bi_model_name']
+
+    def dimension(self) -> int:
+        return self._server_info()['dim']
+
+    def encode_bi(self, texts, normalize: bool = True):
+        reply, payload = self._call({'op': 'encode', 'texts': list(texts), 'normalize': normalize})
+        return np.frombuffer(payload, dtype='float32').reshape(reply['shape'])
+
+    def rerank(self, query: str, candidates: list) -> list:
+        reply, _ = self._call({'op': 'rerank', 'query': query, 'texts': [text for _id, text in candidates]})
+        return [(qid, text, score) for (qid, text), score in zip(candidates, reply['scores'])]
+
+    def rerank_many(self, batches: list) -> list:
+        reply, _ = self._call({
+            'op': 'rerank_many',
+            'batches': [[query, [text for _id, text in candidates]] for query, candidates in batches],
+        })
+        return [
+            [(qid, text, score) for (qid, text), score in zip(candidates, scores)]
+            for (_, candidates), scores in zip(batches, reply['scores'])
+        ]
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        embedder = self.server.embedder
+        try:
+            request, _ = recv_message(self.request)
+            op = request.get('op')
+            if op == 'info':
+                send_message(self.request, {'bi_model_name': embedder.bi_model_name, 'dim': embedder.dimension()})
+            elif op == 'encode':
+                vecs = np.ascontiguousarray(embedder.encode_bi(request['texts'], request.get('normalize', True)), dtype='float32')
+                send_message(self.request, {'shape': list(vecs.shape)}, vecs.tobytes())
+            elif op == 'rerank':
+                scored = embedder.rerank(request['query'], list(enumerate(request['texts'])))
+                send_message(self.request, {'scores': [score for _, _, score in scored]})
+            elif op == 'rerank_many':
+                scored = embedder.rerank_many([(query, list(enumerate(texts))) for query, texts in request['batches']])
+                send_message(self.request, {'scores': [[score for _, _, score in batch] for batch in scored]})
+            else:
+                send_message(self.request, {'error': f"Unknown op {op!r}"})
+        except (EmbeddingServerError, OSError):
+            pass # Client went away; nothing to answer
+        except Exception as exc:
+            send_message(self.request, {'error': f"{type(exc).__name__}: {exc}"})
+
+
+class EmbeddingServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, embedder=None):
+        if os.path.exists(socket_path):
+            os.unlink(socket_path) # Left behind by a previous run
+        self.embedder = embedder or TextEmbedder()
+        super().__init__(socket_path, _Handler)
+        os.chmod(socket_path, 0o660)
+
+    def warm_up(self):
+        """Load both models before accepting requests, so the first caller doesn't wait."""
+        self.embedder.dimension()
+        self.embedder.reranker
@@ -1,37 +1,109 @@
+import json
+import os
+
 import faiss
 import numpy as np
 
+# On-disk layout of a saved index: the FAISS index (which carries its DB ids)
+# and a small manifest, written last.
+INDEX_FILE = 'index.faiss'
+META_FILE = 'meta.json'
+
+# Flat indexes can only be memory-mapped by FAISS >= 1.10 (IO_FLAG_MMAP_IFC);
+# older versions read them into memory and use IO_FLAG_MMAP for inverted lists only.
+MMAP_FLAGS = getattr(faiss, 'IO_FLAG_MMAP_IFC', faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+
+
+def _replace(path, write):
+    """Write through `write(tmp_path)` then atomically swap the file into place."""
+    tmp = f'{path}.tmp{os.getpid()}'
+    write(tmp)
+    os.replace(tmp, path)
+
+
+def _ids(ids):
+    return np.asarray(ids, dtype='int64')
+
+
 class FAISSIndexer:
-    """Manages FAISS index for fast vector retrieval."""
+    """
+    Manages FAISS index for fast vector retrieval. Vectors are stored under
+    their DB ids (IndexIDMap), so search returns ids directly and a question
+    can be removed or replaced without touching the others.
+    """
     def __init__(self, dim: int = 384):
-        self.index = faiss.IndexFlatIP(dim)
-        self.id_map = {}  # maps index positions --> database IDs
+        self.dim = dim
+        self.index = faiss.IndexIDMap(faiss.IndexFlatIP(dim))
+        self._mapped = False
+
+    def _writable(self):
+        # A memory-mapped index is read-only: copy it into memory before the first write
+        if self._mapped:
+            # clone_index would keep viewing the mapped pages; a serialize round trip owns its data
+            self.index = faiss.deserialize_index(faiss.serialize_index(self.index))
+            self._mapped = False
 
     def add(self, vectors: np.ndarray, ids: list):
-        """Add vectors and map their positions to DB IDs."""
+        """Add vectors for DB ids that are not in the index yet."""
         assert vectors.ndim == 2 and len(ids) == vectors.shape[0]
-        self.index.add(vectors)
-        base = self.index.ntotal - vectors.shape[0]
-        for i, db_id in enumerate(ids):
-            self.id_map[base + i] = db_id
+        self._writable()
+        self.index.add_with_ids(vectors, _ids(ids))
+
+    def upsert(self, vectors: np.ndarray, ids: list):
+        """Add vectors, replacing any already stored under the same DB ids."""
+        self.remove(ids)
+        self.add(vectors, ids)
+
+    def remove(self, ids: list) -> int:
+        """Drop the vectors of these DB ids; returns how many were present."""
+        if not len(ids):
+            return 0
+        self._writable()
+        return self.index.remove_ids(_ids(ids))
 
-    def remove(self, db_id: int):
-        """FAISS Flat indexes do not support removal. Must rebuild entire index."""
-        # Flag for rebuild
-        raise NotImplementedError("Removal not supported; rebuild index on delete.")
+    def ids(self) -> np.ndarray:
+        return faiss.vector_to_array(self.index.id_map)
 
     def search(self, vector: np.ndarray, top_k: int = 5):
-        scores, indices = self.index.search(vector, top_k)
-        # returns list of tuples: (db_id, score)
-        results = []
-        for idx, score in zip(indices[0], scores[0]):
-            db_id = self.id_map.get(idx)
-            if db_id is not None:
-                results.append((db_id, float(score)))
-        return results
-
-    def save(self, path: str):
-        faiss.write_index(self.index, path)
-
-    def load(self, path: str):
-        self.index = faiss.read_index(path)
+        return self.search_many(vector, top_k)[0]
+
+    def search_many(self, vectors: np.ndarray, top_k: int = 5):
+        """One FAISS search for a matrix of queries: a list of (db_id, score) lists, one per row."""
+        scores, labels = self.index.search(vectors, top_k)
+        # -1 pads results when the index is small
+        return [
+            [(int(db_id), float(score)) for db_id, score in zip(row_labels, row_scores) if db_id != -1]
+            for row_labels, row_scores in zip(labels, scores)
+        ]
+
+    def save(self, directory: str, fingerprint: dict, state: dict = None):
+        """
+        Persist the index, the fingerprint of the model that produced it and
+        the caller's `state`, handed back by load().
+        """
+        os.makedirs(directory, exist_ok=True)
+        _replace(os.path.join(directory, INDEX_FILE), lambda tmp: faiss.write_index(self.index, tmp))
+        def write_meta(tmp):
+            with open(tmp, 'w') as f:
+                json.dump({'fingerprint': fingerprint, 'ntotal': int(self.index.ntotal), 'state': state or {}}, f)
+        _replace(os.path.join(directory, META_FILE), write_meta)
+
+    def load(self, directory: str, fingerprint: dict):
+        """
+        Memory-map a saved index if it was built with the same `fingerprint`
+        and return the state saved with it. Returns None (leaving this indexer
+        untouched) when there is nothing usable on disk.
+        """
+        try:
+            with open(os.path.join(directory, META_FILE)) as f:
+                meta = json.load(f)
+            if meta.get('fingerprint') != fingerprint:
+                return None
+            index = faiss.read_index(os.path.join(directory, INDEX_FILE), MMAP_FLAGS)
+        except (OSError, ValueError, RuntimeError): # RuntimeError: FAISS could not read the file
+            return None
+        if index.d != self.dim or index.ntotal != meta['ntotal'] or not isinstance(index, faiss.IndexIDMap):
+            return None # Written by an interrupted save, or by an older layout
+        self.index = index
+        self._mapped = True
+        return meta['state']
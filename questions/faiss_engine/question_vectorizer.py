@@ -1,79 +1,264 @@
+import datetime
+import threading
+import time
+
 import numpy as np
-from .embedder import TextEmbedder
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .batcher import MicroBatcher
+from .changes import changes_since, current_seq
+from .embedder import get_embedder
 from .faiss_indexer import FAISSIndexer
+from .text_store import TextStore
+
+# Bump when the way vectors are produced changes without the model name changing
+INDEX_FORMAT = 2
+
+# Slack on the updated_at high-water mark, for clock skew between app servers and
+# saves that were still committing when the mark was taken
+RECONCILE_OVERLAP = datetime.timedelta(minutes=1)
+
+
+def index_dir():
+    return getattr(settings, 'QUESTION_INDEX_DIR', None)
+
+
+def sync_interval():
+    return getattr(settings, 'QUESTION_INDEX_SYNC_INTERVAL', 5)
+
+
+def compress_texts():
+    return getattr(settings, 'QUESTION_INDEX_COMPRESS_TEXTS', False)
+
+
+def batch_limits():
+    """(max queries per batch, seconds to wait for more); a zero wait turns batching off."""
+    return (
+        getattr(settings, 'QUESTION_SIMILARITY_BATCH_SIZE', 16),
+        getattr(settings, 'QUESTION_SIMILARITY_BATCH_WAIT_MS', 5) / 1000,
+    )
+
 
 class QuestionVectorizer:
-    """Coordinates DB, FAISS filtering, and cross-encoder reranking with auto-sync."""
+    """
+    Coordinates DB, FAISS filtering, and cross-encoder reranking. Question
+    changes reach the index through the shared change log (see changes.py),
+    applied in a background thread at most every QUESTION_INDEX_SYNC_INTERVAL
+    seconds, so queries never scan the questions table. Nothing is loaded
+    until the first query (or build), and the models may live in the shared
+    embedding server instead of this process.
+    """
     def __init__(self):
-        self.embedder = TextEmbedder()
-        dim = self.embedder.bi_encoder.get_sentence_embedding_dimension()
-        self.indexer = FAISSIndexer(dim=dim)
+        self.embedder = get_embedder()
+        self.indexer = None # Created by build(), once the model's dimension is known
+        self.texts = TextStore(compress=compress_texts()) # Reranker input for every indexed id
         self._built = False
+        self._lock = threading.Lock() # FAISS indexes are not safe to search while being written
+        self._build_lock = threading.Lock()
+        max_batch, max_wait = batch_limits()
+        self._batcher = MicroBatcher(self.query_many, max_batch, max_wait) if max_wait > 0 and max_batch > 1 else None
+        self._synced_seq = None       # Last change-log entry applied to this index
+        self._synced_at = None        # Questions.updated_at high-water mark of the last sync
+        self._next_sync_check = 0
+        self._syncing = False
 
-    def build(self):
-        """Initial full build of the index."""
+    def fingerprint(self):
+        """What a saved index must have been built with to be reused."""
+        return {
+            'model': self.embedder.bi_model_name,
+            'dim': self.indexer.dim,
+            'normalized': True,
+            'format': INDEX_FORMAT,
+        }
+
+    def build(self, reuse_saved=True):
+        """
+        Warm start from the saved index when it matches the current model, then
+        catch up on the changes logged since it was saved; otherwise embed the
+        whole bank and save the result for the next process.
+        """
+        if self.indexer is None:
+            self.indexer = FAISSIndexer(dim=self.embedder.dimension())
+        if reuse_saved and index_dir():
+            state = self.indexer.load(index_dir(), self.fingerprint())
+            if state is not None:
+                self._synced_seq = state.get('synced_seq')
+                self._synced_at = parse_datetime(state['synced_at']) if state.get('synced_at') else None
+                indexed_ids = set(self.indexer.ids().tolist())
+                if not self.texts.load(index_dir()) or self.texts.ids() != indexed_ids:
+                    from questions.models import Questions
+                    self.texts = TextStore(compress=compress_texts())
+                    self.texts.update(dict(Questions.objects.filter(id__in=indexed_ids).values_list('id', 'question')))
+                self._built = True
+                self.sync()
+                return
         from questions.models import Questions
-        qs = Questions.objects.all()
-        texts = [q.question for q in qs]
-        ids = [q.id for q in qs]
+        # Read the log position first: a change landing mid-build is replayed, never lost
+        self._synced_seq = current_seq()
+        self._synced_at = timezone.now()
+        ids, texts = [], []
+        for qid, text in Questions.objects.values_list('id', 'question'):
+            ids.append(qid)
+            texts.append(text)
         if texts:
             vecs = np.array(self.embedder.encode_bi(texts), dtype='float32')
-            self.indexer.add(vecs, ids)
+            with self._lock:
+                self.indexer.add(vecs, ids)
+                self.texts.update(dict(zip(ids, texts)))
         self._built = True
+        self.save()
 
-    def _sync_new(self):
-        """Sync any new DB entries not yet in the index."""
-        from questions.models import Questions
-        all_qs = Questions.objects.all()
-        all_ids = {q.id for q in all_qs}
-        indexed_ids = set(self.indexer.id_map.values())
-        new_ids = all_ids - indexed_ids
-        if not new_ids:
+    def ensure_built(self):
+        if not self._built:
+            with self._build_lock:
+                if not self._built: # Another thread may have built it while we waited
+                    self.build()
+
+    def save(self):
+        if index_dir():
+            with self._lock:
+                self.texts.save(index_dir()) # Before the index, whose manifest is written last
+                self.indexer.save(index_dir(), self.fingerprint(), {
+                    'synced_seq': self._synced_seq,
+                    'synced_at': self._synced_at.isoformat() if self._synced_at else None,
+                })
+
+    def _maybe_sync(self):
+        """Start a background sync if the change log moved; a cache read at most every few seconds."""
+        now = time.monotonic()
+        if self._syncing or now < self._next_sync_check:
+            return
+        self._next_sync_check = now + sync_interval()
+        if self._synced_seq == current_seq():
             return
-        new_qs = [q for q in all_qs if q.id in new_ids]
-        texts = [q.question for q in new_qs]
-        ids = [q.id for q in new_qs]
-        vecs = np.array(self.embedder.encode_bi(texts), dtype='float32')
-        self.indexer.add(vecs, ids)
+        self._syncing = True
+        threading.Thread(target=self._sync_in_background, daemon=True).start()
+
+    def _sync_in_background(self):
+        try:
+            self.sync()
+        finally:
+            self._syncing = False
+            close_old_connections()
+
+    def sync(self):
+        """Apply the logged changes since the last sync, or reconcile if the log can't cover them."""
+        started = timezone.now()
+        latest, changed = changes_since(self._synced_seq) if self._synced_seq is not None else (current_seq(), None)
+        if changed is None:
+            self.reconcile()
+        elif changed:
+            self.refresh(changed)
+        self._synced_seq = latest
+        self._synced_at = started
+
+    def refresh(self, question_ids):
+        """Re-embed these questions if they still exist, drop them otherwise."""
+        from questions.models import Questions
+        rows = dict(Questions.objects.filter(id__in=question_ids).values_list('id', 'question'))
+        vecs = None
+        if rows:
+            vecs = np.array(self.embedder.encode_bi(list(rows.values())), dtype='float32')
+        with self._lock:
+            removed = [qid for qid in question_ids if qid not in rows]
+            self.indexer.remove(removed)
+            self.texts.remove(removed)
+            if vecs is not None:
+                self.indexer.upsert(vecs, list(rows))
+                self.texts.update(rows)
+
+    def reconcile(self):
+        """
+        Match the index to the table without the change log: one (id, updated_at)
+        scan, re-embedding only ids that are missing or were edited since the
+        last sync (everything, if the index carries no high-water mark).
+        """
+        from questions.models import Questions
+        since = self._synced_at - RECONCILE_OVERLAP if self._synced_at else None
+        db_ids, stale = set(), set()
+        for qid, updated_at in Questions.objects.values_list('id', 'updated_at'):
+            db_ids.add(qid)
+            if since is None or updated_at >= since:
+                stale.add(qid)
+        indexed_ids = set(self.indexer.ids().tolist())
+        with self._lock:
+            self.indexer.remove(list(indexed_ids - db_ids))
+            self.texts.remove(indexed_ids - db_ids)
+        stale |= db_ids - indexed_ids
+        if stale:
+            self.refresh(stale)
 
     def query(self, text: str, filter_k: int = 50, rerank_k: int = 5):
         """
         2-stage pipeline:
-         1) Build if needed, then sync new entries
+         1) Build if needed (later DB changes are synced in the background)
          2) FAISS filter + cross-encoder rerank
+        Concurrent calls are coalesced into one query_many batch unless
+        QUESTION_SIMILARITY_BATCH_WAIT_MS is 0.
         """
-        if not self._built:
-            self.build()
-        # Sync DB additions
-        self._sync_new()
+        self.ensure_built()
+        self._maybe_sync()
+        if self._batcher is None:
+            return self.query_many([(text, filter_k, rerank_k)])[0]
+        return self._batcher.submit((text, filter_k, rerank_k))
 
+    def query_many(self, requests: list) -> list:
+        """
+        Answer several (text, filter_k, rerank_k) queries with one bi-encoder
+        batch, one FAISS search over the query matrix and one cross-encoder
+        call; returns each query's reranked (id, text, score) list, in order.
+        """
         # Step 1: filter
-        q_vec = np.array(self.embedder.encode_bi([text]), dtype='float32')
-        candidates = self.indexer.search(q_vec, top_k=filter_k)
+        q_vecs = np.array(self.embedder.encode_bi([text for text, _, _ in requests]), dtype='float32')
+        with self._lock:
+            hits = self.indexer.search_many(q_vecs, top_k=max(filter_k for _, filter_k, _ in requests))
+            # Candidate texts come from memory, read under the same lock as the ids
+            cand_lists = [
+                [(qid, self.texts.get(qid)) for qid, _ in row[:filter_k] if qid in self.texts]
+                for row, (_, filter_k, _) in zip(hits, requests)
+            ]
 
         # Step 2: rerank
-        from questions.models import Questions
-        cand_list = []
-        for qid, _ in candidates:
-            try:
-                cand_list.append((qid, Questions.objects.get(id=qid).question))
-            except Questions.DoesNotExist:
-                continue
-        reranked = self.embedder.rerank(text, cand_list)
-        reranked.sort(key=lambda x: x[2], reverse=True)
-        return reranked[:rerank_k]
+        scored = self.embedder.rerank_many([(text, cands) for (text, _, _), cands in zip(requests, cand_lists)])
+        results = []
+        for reranked, (_, _, rerank_k) in zip(scored, requests):
+            reranked.sort(key=lambda x: x[2], reverse=True)
+            results.append(reranked[:rerank_k])
+        return results
 
     def add(self, question_obj):
-        """Add single question to index immediately."""
+        """Add or re-embed a single question immediately."""
+        self.ensure_built()
         vec = np.array(self.embedder.encode_bi([question_obj.question]), dtype='float32')
-        self.indexer.add(vec, [question_obj.id])
+        with self._lock:
+            self.indexer.upsert(vec, [question_obj.id])
+            self.texts.update({question_obj.id: question_obj.question})
+
+    def remove(self, question_id):
+        """Drop a deleted question's vector."""
+        if self._built:
+            with self._lock:
+                self.indexer.remove([question_id])
+                self.texts.remove([question_id])
 
     def rebuild(self):
-        """Full rebuild (e.g., on deletion)."""
-        dim = self.embedder.bi_encoder.get_sentence_embedding_dimension()
-        self.indexer = FAISSIndexer(dim=dim)
+        """Full rebuild (e.g., after changing the embedding model)."""
+        self.indexer = FAISSIndexer(dim=self.embedder.dimension())
+        self.texts = TextStore(compress=compress_texts())
         self._built = False
-        self.build()
+        self.build(reuse_saved=False)
+
+_vectorizer = None
+_vectorizer_lock = threading.Lock()
+
 
-# Singleton instance
-_qv = QuestionVectorizer()
\ No newline at end of file
+def get_vectorizer():
+    """The process-wide QuestionVectorizer, created on first use."""
+    global _vectorizer
+    if _vectorizer is None:
+        with _vectorizer_lock:
+            if _vectorizer is None:
+                _vectorizer = QuestionVectorizer()
+    return _vectorizer
@@ -1,16 +1,19 @@
+from django.db import transaction
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from questions.models import Questions
-from .question_vectorizer import _qv
+from .changes import record_change
+
+# Only log the change here: every process applies it to its own index on its
+# next sync, without the saving request paying for an embedding.
 
 @receiver(post_save, sender=Questions)
-def on_question_save(sender, instance, **kwargs):
-    # Ensure index is built before adding
-    if not _qv._built:
-        _qv.build()
-    _qv.add(instance)
+def on_question_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        question_id = instance.id # instance.id is None by the time a later delete commits
+        transaction.on_commit(lambda: record_change(question_id))
 
 @receiver(post_delete, sender=Questions)
 def on_question_delete(sender, instance, **kwargs):
-    # Rebuild index on deletion
-    _qv.rebuild()
\ No newline at end of file
+    question_id = instance.id
+    transaction.on_commit(lambda: record_change(question_id))
@@ -0,0 +1,59 @@
+import gzip
+import json
+import os
+import zlib
+
+TEXTS_FILE = 'texts.json.gz'
+
+
+class TextStore:
+    """
+    Question text by DB id, kept next to the FAISS index so reranking never
+    goes back to the database. With compress=True each text is held
+    zlib-compressed, trading a little CPU per candidate for memory.
+    """
+    def __init__(self, compress: bool = False):
+        self.compress = compress
+        self._texts = {}
+
+    def __len__(self):
+        return len(self._texts)
+
+    def __contains__(self, question_id):
+        return question_id in self._texts
+
+    def get(self, question_id, default=None):
+        text = self._texts.get(question_id)
+        if text is None:
+            return default
+        return zlib.decompress(text).decode('utf-8') if self.compress else text
+
+    def update(self, texts: dict):
+        """Add or replace {id: text}."""
+        if self.compress:
+            texts = {qid: zlib.compress(text.encode('utf-8')) for qid, text in texts.items()}
+        self._texts.update(texts)
+
+    def remove(self, question_ids):
+        for qid in question_ids:
+            self._texts.pop(qid, None)
+
+    def ids(self):
+        return set(self._texts)
+
+    def save(self, directory: str):
+        path = os.path.join(directory, TEXTS_FILE)
+        tmp = f'{path}.tmp{os.getpid()}'
+        with gzip.open(tmp, 'wt', encoding='utf-8') as f:
+            json.dump({qid: self.get(qid) for qid in self._texts}, f)
+        os.replace(tmp, path)
+
+    def load(self, directory: str) -> bool:
+        try:
+            with gzip.open(os.path.join(directory, TEXTS_FILE), 'rt', encoding='utf-8') as f:
+                texts = json.load(f)
+        except (OSError, ValueError):
+            return False
+        self._texts = {}
+        self.update({int(qid): text for qid, text in texts.items()})
+        return True
@@ -0,0 +1,109 @@
+import json
+from collections import Counter
+
+from django.core.cache import cache
+
+from .paper_cache import question_set_version
+
+# Compiled per paper at creation; keyed by the question-set version like the payloads,
+# so editing a question's answer can never grade against a stale key.
+ANSWER_KEY_KEY = 'paper:answerkey:{paper_id}:v{version}'
+ANSWER_KEY_TIMEOUT = 60 * 60 * 24
+
+
+def canonical_answer(answer):
+    """JSON-compatible answer as a string, independent of key order and whitespace."""
+    return json.dumps(answer, sort_keys=True, separators=(',', ':'))
+
+
+class AnswerKey:
+    """
+    Everything needed to grade and record a submission for one paper without
+    touching the DB: paper metadata plus, per base question id,
+    (canonical correct answer, marks, hero question id).
+    """
+    def __init__(self, paper_id, stream_id, test_type, total_marks, subjects_included, questions):
+        self.paper_id = paper_id
+        self.stream_id = stream_id
+        self.test_type = test_type
+        self.total_marks = total_marks
+        self.subjects_included = subjects_included
+        self.questions = questions
+
+    @property
+    def hero_ids(self):
+        return [hero_id for _, _, hero_id in self.questions.values()]
+
+    def mismatch(self, answers):
+        """
+        {'missing_answers_for_question_ids'/'extra_answers_for_question_ids'/
+        'duplicate_answers_for_question_ids': [...]} for an 'answers' list, empty if none.
+        """
+        expected = self.questions.keys()
+        submitted_ids = {submission['question_id'] for submission in answers}
+        detail = {}
+        missing = expected - submitted_ids
+        extra = submitted_ids - expected
+        if missing: detail["missing_answers_for_question_ids"] = sorted(missing)
+        if extra: detail["extra_answers_for_question_ids"] = sorted(extra)
+        if len(answers) != len(submitted_ids): # A repeated question would be graded twice
+            counts = Counter(submission['question_id'] for submission in answers)
+            detail["duplicate_answers_for_question_ids"] = sorted(qid for qid, n in counts.items() if n > 1)
+        return detail
+
+    def grade(self, answers):
+        """
+        Score TestSubmissionSerializer's 'answers' list in one pass.
+        Returns (obtained_marks, results) with one (question_id, user_answer, is_correct, marks)
+        tuple per answer; callers check mismatch() first.
+        """
+        questions = self.questions
+        obtained = 0
+        results = []
+        for submission in answers:
+            question_id = submission['question_id']
+            user_answer = submission['user_answer']
+            correct, marks, _ = questions[question_id]
+            is_correct = canonical_answer(user_answer) == correct
+            if is_correct:
+                obtained += marks
+            results.append((question_id, user_answer, is_correct, marks))
+        return obtained, results
+
+
+def compile_answer_key(paper, hero_questions):
+    """hero_questions need select_related('question')."""
+    return AnswerKey(
+        paper_id=paper.id,
+        stream_id=paper.stream_id,
+        test_type=paper.test_type,
+        total_marks=paper.total_marks,
+        subjects_included=paper.subjects_included,
+        questions={
+            hero.question_id: (canonical_answer(hero.question.answer), hero.marks, hero.id)
+            for hero in hero_questions
+        },
+    )
+
+
+def cache_answer_key(paper, hero_questions):
+    answer_key = compile_answer_key(paper, hero_questions)
+    cache.set(ANSWER_KEY_KEY.format(paper_id=paper.id, version=question_set_version()), answer_key, ANSWER_KEY_TIMEOUT)
+    return answer_key
+
+
+def load_answer_key(paper_id):
+    """
+    The paper's AnswerKey from the cache, or rebuilt from the DB (two queries)
+    and cached. None if the paper doesn't exist.
+    """
+    from .models import GeneratedTestPaper, HeroQuestions
+    answer_key = cache.get(ANSWER_KEY_KEY.format(paper_id=paper_id, version=question_set_version()))
+    if answer_key is not None:
+        return answer_key
+
+    paper = GeneratedTestPaper.objects.filter(pk=paper_id).first()
+    if paper is None:
+        return None
+    hero_questions = HeroQuestions.objects.filter(testquestionlink__test_id=paper).select_related('question')
+    return cache_answer_key(paper, hero_questions)
@@ -0,0 +1,65 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+from .grading import canonical_answer
+
+# Set (NX) before grading and replaced by the finished response, so a retry
+# either replays the first result or learns the first attempt is still running.
+SUBMISSION_KEY = 'submit:idem:{user_id}:{digest}'
+IN_PROGRESS = 'in-progress'
+IN_PROGRESS_TIMEOUT = 60
+
+
+def idempotency_timeout():
+    return getattr(settings, 'SUBMISSION_IDEMPOTENCY_TTL', 60 * 60 * 24)
+
+
+def submission_key(user_id, test_paper_id, answers, client_key=None):
+    """
+    Cache key for one submission: the client's Idempotency-Key header if sent,
+    otherwise a hash of the paper id and the (order-independent) answers.
+    """
+    if client_key:
+        material = f'{test_paper_id}:key:{client_key}'
+    else:
+        material = f'{test_paper_id}:' + canonical_answer(sorted(
+            ([answer['question_id'], answer['user_answer']] for answer in answers), key=lambda pair: pair[0]
+        ))
+    digest = hashlib.sha256(material.encode()).hexdigest()
+    return SUBMISSION_KEY.format(user_id=user_id, digest=digest)
+
+
+def begin_submission(key):
+    """
+    Claim the key for this request. Returns None if the submission should be
+    graded, otherwise the Response to send back (a replay, or 409 while the
+    original attempt is still being processed).
+    """
+    if cache.add(key, IN_PROGRESS, IN_PROGRESS_TIMEOUT):
+        return None
+    previous = cache.get(key)
+    if previous is None: # Expired between the two calls; let this attempt through
+        cache.set(key, IN_PROGRESS, IN_PROGRESS_TIMEOUT)
+        return None
+    if previous == IN_PROGRESS:
+        return Response({"detail": "This submission is already being processed."}, status=status.HTTP_409_CONFLICT)
+    status_code, data = previous
+    response = Response(data, status=status_code)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def finish_submission(key, response):
+    """Remember a successful response for replays; release the key after a failure so the client can retry."""
+    if status.is_success(response.status_code):
+        cache.set(key, (response.status_code, response.data), idempotency_timeout())
+    else:
+        cache.delete(key)
+
+
+def abandon_submission(key):
+    cache.delete(key)
@@ -0,0 +1,142 @@
+import logging
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import Questions, ResultQuestionLink, SubmissionOutbox, TestHistory
+from .signals import submissions_saved
+from .stats import record_submissions
+
+logger = logging.getLogger('questions.ingest')
+
+
+def ingest_mode():
+    return getattr(settings, 'SUBMISSION_INGEST_MODE', 'sync')
+
+
+def flush_batch_size():
+    return getattr(settings, 'SUBMISSION_FLUSH_BATCH_SIZE', 500)
+
+
+def _notify(histories, subject_marks):
+    responses = submissions_saved.send_robust(sender=TestHistory, histories=histories, subject_marks=subject_marks)
+    for receiver, response in responses:
+        # A failed receiver (e.g. Redis down for the leaderboards) must not fail the
+        # submission, but the scores it dropped have to show up somewhere
+        if isinstance(response, Exception):
+            logger.error(
+                'submissions_saved receiver %s failed for %d histories', receiver, len(histories),
+                exc_info=response,
+            )
+
+
+def _announce(histories, subject_marks):
+    transaction.on_commit(lambda: _notify(histories, subject_marks))
+
+
+def _result_links(history, results):
+    return [
+        ResultQuestionLink(
+            result_id=history,
+            question_id_id=question_id,
+            user_answer=user_answer,
+            is_correct=is_correct,
+            total_marks=marks,
+            marks_obtained=marks if is_correct else 0
+        )
+        for question_id, user_answer, is_correct, marks in results
+    ]
+
+
+def save_submission(user, answer_key, obtained_marks, results, time_taken):
+    """Write a graded submission straight to TestHistory/ResultQuestionLink (sync mode)."""
+    with transaction.atomic():
+        history = TestHistory.objects.create(
+            user=user,
+            total_marks=answer_key.total_marks,
+            obtained_marks=obtained_marks,
+            time=time_taken,
+            test_type=answer_key.test_type,
+            stream_id=answer_key.stream_id,
+            subjects_included=answer_key.subjects_included
+        )
+        ResultQuestionLink.objects.bulk_create(_result_links(history, results))
+        _announce([history], record_submissions([(history, results)]))
+    return history
+
+
+def enqueue_submission(user, answer_key, obtained_marks, results, time_taken):
+    """
+    Durably queue a graded submission for flush_submissions (queued mode).
+    Returns (row, created); a retry of an already queued (user, paper) gets the
+    original row back with created=False.
+    """
+    try:
+        with transaction.atomic():
+            row = SubmissionOutbox.objects.create(
+                user=user,
+                test_paper_id=answer_key.paper_id,
+                stream_id=answer_key.stream_id,
+                test_type=answer_key.test_type,
+                total_marks=answer_key.total_marks,
+                obtained_marks=obtained_marks,
+                time=time_taken,
+                subjects_included=answer_key.subjects_included,
+                results=[list(result) for result in results],
+            )
+        return row, True
+    except IntegrityError:
+        return SubmissionOutbox.objects.get(user=user, test_paper_id=answer_key.paper_id), False
+
+
+def flush_submissions(batch_size=None):
+    """
+    Move up to `batch_size` queued submissions into TestHistory/ResultQuestionLink
+    with a fixed number of queries per batch. SKIP LOCKED lets several workers
+    drain the queue side by side. Returns the number of submissions flushed.
+    """
+    batch_size = batch_size or flush_batch_size()
+    with transaction.atomic():
+        pending = list(
+            SubmissionOutbox.objects.filter(flushed_at__isnull=True)
+            .select_for_update(skip_locked=True).order_by('id')[:batch_size]
+        )
+        if not pending:
+            return 0
+
+        histories = TestHistory.objects.bulk_create([
+            TestHistory(
+                user_id=row.user_id,
+                total_marks=row.total_marks,
+                obtained_marks=row.obtained_marks,
+                time=row.time,
+                test_type=row.test_type,
+                stream_id=row.stream_id,
+                subjects_included=row.subjects_included,
+            )
+            for row in pending
+        ])
+        # auto_now_add stamps the flush time; history should carry the submission time
+        for history, row in zip(histories, pending):
+            history.created_at = row.created_at
+        TestHistory.objects.bulk_update(histories, ['created_at'])
+
+        # A question deleted while its submission sat in the queue would fail the
+        # link FK and roll back (and so stall) the whole batch; drop those links
+        question_ids = {result[0] for row in pending for result in row.results}
+        existing = set(Questions.objects.filter(id__in=question_ids).values_list('id', flat=True))
+        ResultQuestionLink.objects.bulk_create([
+            link
+            for history, row in zip(histories, pending)
+            for link in _result_links(history, [result for result in row.results if result[0] in existing])
+        ], batch_size=5000)
+        subject_marks = record_submissions((history, row.results) for history, row in zip(histories, pending))
+
+        flushed_at = timezone.now()
+        for history, row in zip(histories, pending):
+            row.history = history
+            row.flushed_at = flushed_at
+        SubmissionOutbox.objects.bulk_update(pending, ['history', 'flushed_at'])
+        _announce(histories, subject_marks)
+    return len(pending)
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from questions.faiss_engine.question_vectorizer import get_vectorizer, index_dir
+
+
+class Command(BaseCommand):
+    help = "Embed the question bank and save the FAISS index to QUESTION_INDEX_DIR (run on deploy)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--if-stale', action='store_true',
+                            help="Keep a saved index that matches the current model instead of re-embedding.")
+
+    def handle(self, *args, **options):
+        if not index_dir():
+            raise CommandError("QUESTION_INDEX_DIR is not set")
+        vectorizer = get_vectorizer()
+        if options['if_stale']:
+            vectorizer.build()
+        else:
+            vectorizer.rebuild()
+        self.stdout.write(f"{vectorizer.indexer.index.ntotal} questions indexed in {index_dir()}")
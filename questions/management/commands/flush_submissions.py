@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from questions.ingest import flush_batch_size, flush_submissions
+
+
+class Command(BaseCommand):
+    help = "Write queued test submissions (SUBMISSION_INGEST_MODE='queued') to TestHistory in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help="Submissions written per transaction (default: SUBMISSION_FLUSH_BATCH_SIZE).")
+        parser.add_argument('--interval', type=float, default=0,
+                            help="Seconds between flushes; 0 drains the queue once and exits.")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size'] or flush_batch_size()
+
+        while True:
+            flushed = 0
+            while True:
+                written = flush_submissions(batch_size)
+                flushed += written
+                if written < batch_size:
+                    break
+            if flushed:
+                self.stdout.write(f"Flushed {flushed} submissions")
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from questions.blueprints import get_compiled_blueprint
+from questions.models import Streams
+from questions.reservoir import refill_reservoir, reservoir_depth_target
+
+
+class Command(BaseCommand):
+    help = "Keep a reservoir of pre-assembled mock test papers topped up for generate_mock_test to claim."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stream', action='append', dest='streams',
+                            help="Stream name to refill (repeatable, default: IOE).")
+        parser.add_argument('--depth', type=int, default=None,
+                            help="Target number of unclaimed papers per stream (default: MOCK_RESERVOIR_DEPTH).")
+        parser.add_argument('--interval', type=float, default=0,
+                            help="Seconds between refills; 0 runs once and exits.")
+
+    def handle(self, *args, **options):
+        streams = options['streams'] or ['IOE']
+        depth = options['depth'] if options['depth'] is not None else reservoir_depth_target()
+
+        while True:
+            for stream_name in streams:
+                try:
+                    plan = get_compiled_blueprint(stream_name)
+                except Streams.DoesNotExist:
+                    raise CommandError(f"Stream '{stream_name}' not found")
+                added = refill_reservoir(plan, depth)
+                if added:
+                    self.stdout.write(f"{stream_name}: added {added} mock papers (target depth {depth})")
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
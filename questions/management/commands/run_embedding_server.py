@@ -0,0 +1,32 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from questions.faiss_engine.embedding_server import EmbeddingServer
+
+
+class Command(BaseCommand):
+    help = "Host the embedding models for every worker on this machine behind a Unix socket."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--socket', default=None,
+                            help="Socket path (default: EMBEDDING_SERVER_SOCKET).")
+
+    def handle(self, *args, **options):
+        socket_path = options['socket'] or getattr(settings, 'EMBEDDING_SERVER_SOCKET', None)
+        if not socket_path:
+            raise CommandError("Pass --socket or set EMBEDDING_SERVER_SOCKET")
+
+        server = EmbeddingServer(socket_path)
+        self.stdout.write("Loading models...")
+        server.warm_up()
+        self.stdout.write(f"Serving embeddings on {socket_path}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            if os.path.exists(socket_path):
+                os.unlink(socket_path)
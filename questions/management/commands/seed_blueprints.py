@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from questions.blueprints import DEFAULT_SYLLABI, seed_blueprint
+
+
+class Command(BaseCommand):
+    help = "Create or update the default exam blueprints for streams that exist in the database."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stream', action='append', dest='streams',
+                            help="Stream name to seed (repeatable, default: every stream with a default syllabus).")
+
+    def handle(self, *args, **options):
+        streams = options['streams'] or list(DEFAULT_SYLLABI)
+        for stream_name in streams:
+            syllabus = DEFAULT_SYLLABI.get(stream_name)
+            if syllabus is None:
+                raise CommandError(f"No default syllabus for stream '{stream_name}'")
+            written = seed_blueprint(stream_name, syllabus)
+            if written is None:
+                raise CommandError(f"Stream '{stream_name}' not found")
+            self.stdout.write(f"{stream_name}: {written} blueprint rows")
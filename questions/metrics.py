@@ -0,0 +1,33 @@
+import logging
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger('questions.metrics')
+
+
+class Timer:
+    """Elapsed wall time of a timed() block, in milliseconds."""
+    def __init__(self, name):
+        self.name = name
+        self.ms = 0.0
+
+    def server_timing(self):
+        # Value for the Server-Timing response header, e.g. "paper_persist;dur=4.21"
+        return f"{self.name.removesuffix('_ms')};dur={self.ms:.2f}"
+
+
+@contextmanager
+def timed(name, **labels):
+    """
+    Time a block and log it as a metric line on the 'questions.metrics' logger:
+        with timed('paper_persist_ms', test_type='MOCK') as t:
+            ...
+    """
+    timer = Timer(name)
+    start = time.perf_counter()
+    try:
+        yield timer
+    finally:
+        timer.ms = (time.perf_counter() - start) * 1000
+        extra = ' '.join(f'{key}={value}' for key, value in labels.items())
+        logger.info('%s=%.2f %s', name, timer.ms, extra)
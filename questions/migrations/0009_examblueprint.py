@@ -0,0 +1,35 @@
+# Generated by Django 5.1.5 on 2026-10-18 10:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0008_auto_20250524_0555'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExamBlueprint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('stream', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='blueprint', to='questions.streams')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='BlueprintChapter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('marks', models.IntegerField()),
+                ('num_questions', models.IntegerField()),
+                ('chapter', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='questions.chapters')),
+                ('blueprint', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='questions.examblueprint')),
+            ],
+            options={
+                'unique_together': {('blueprint', 'chapter', 'marks')},
+            },
+        ),
+    ]
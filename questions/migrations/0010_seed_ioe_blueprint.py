@@ -0,0 +1,68 @@
+from django.db import migrations
+
+# The IOE syllabus that used to be hardcoded in views.generate_mock_test, frozen here;
+# blueprints.IOE_SYLLABUS is the copy `manage.py seed_blueprints` keeps up to date.
+IOE_SYLLABUS = {
+    "English": {
+        "Reading Passage": {"mark1": 0, "mark2": 4},
+        "Grammar": {"mark1": 10, "mark2": 0},
+        "Vocabulary": {"mark1": 2, "mark2": 0},
+        "Phonemes and Stress": {"mark1": 2, "mark2": 0},
+    },
+    "Maths": {
+        "Set and Function": {"mark1": 1, "mark2": 1},
+        "Algebra": {"mark1": 2, "mark2": 4},
+        "Trigonometry": {"mark1": 1, "mark2": 2},
+        "Coordinate Geometry": {"mark1": 2, "mark2": 4},
+        "Calculus": {"mark1": 3, "mark2": 4},
+        "Vectors": {"mark1": 1, "mark2": 1},
+    },
+    "Physics": {
+        "Mechanics": {"mark1": 2, "mark2": 4},
+        "Heat and Thermodynamics": {"mark1": 2, "mark2": 1},
+        "Wave and Optics": {"mark1": 2, "mark2": 3},
+        "Electricity and Magnetism": {"mark1": 2, "mark2": 4},
+        "Modern Physics and Electronics": {"mark1": 2, "mark2": 3},
+    },
+    "Chemistry": {
+        "Physical Chemistry": {"mark1": 6, "mark2": 3},
+        "Inorganic Chemistry": {"mark1": 3, "mark2": 1},
+        "Organic Chemistry": {"mark1": 3, "mark2": 0},
+    },
+}
+
+
+def seed_ioe_blueprint(apps, schema_editor):
+    Streams = apps.get_model('questions', 'Streams')
+    Chapters = apps.get_model('questions', 'Chapters')
+    ExamBlueprint = apps.get_model('questions', 'ExamBlueprint')
+    BlueprintChapter = apps.get_model('questions', 'BlueprintChapter')
+
+    stream = Streams.objects.filter(stream_name='IOE').first()
+    if stream is None:
+        return # Fresh database; `manage.py seed_blueprints` creates it once the stream exists
+
+    blueprint, _ = ExamBlueprint.objects.get_or_create(stream=stream)
+    for subject_name, chapters in IOE_SYLLABUS.items():
+        for chapter_name, marks_info in chapters.items():
+            # Same behaviour as the old view: chapters missing from the DB are skipped
+            chapter = Chapters.objects.filter(sub_id__subject_name=subject_name, chapter_name=chapter_name).first()
+            if chapter is None:
+                continue
+            for marks, key in ((1, 'mark1'), (2, 'mark2')):
+                if marks_info[key] > 0:
+                    BlueprintChapter.objects.update_or_create(
+                        blueprint=blueprint, chapter=chapter, marks=marks,
+                        defaults={'num_questions': marks_info[key]},
+                    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0009_examblueprint'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_ioe_blueprint, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.5 on 2026-10-18 11:02
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0010_seed_ioe_blueprint'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generatedtestpaper',
+            name='blueprint_version',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='generatedtestpaper',
+            name='created_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='generatedtestpaper',
+            index=models.Index(condition=models.Q(('created_by__isnull', True)), fields=['stream', 'blueprint_version'], name='mock_reservoir_idx'),
+        ),
+    ]
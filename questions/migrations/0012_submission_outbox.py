@@ -0,0 +1,38 @@
+# Generated by Django 5.1.5 on 2026-10-18 10:47
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0011_mock_reservoir'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubmissionOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('test_type', models.CharField(max_length=6)),
+                ('total_marks', models.IntegerField(default=0)),
+                ('obtained_marks', models.IntegerField(default=0)),
+                ('time', models.IntegerField(default=0)),
+                ('subjects_included', models.JSONField(default=list)),
+                ('results', models.JSONField(default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('flushed_at', models.DateTimeField(blank=True, null=True)),
+                ('history', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='questions.testhistory')),
+                ('stream', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='questions.streams')),
+                ('test_paper', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='questions.generatedtestpaper')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('flushed_at__isnull', True)), fields=['id'], name='submission_pending_idx')],
+                'unique_together': {('user', 'test_paper')},
+            },
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.1.5 on 2026-10-18 10:49
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum, Case, When, IntegerField
+
+
+def backfill_rollups(apps, schema_editor):
+    """Seed one rollup per user from existing history so later increments start from the right totals."""
+    TestHistory = apps.get_model('questions', 'TestHistory')
+    ResultQuestionLink = apps.get_model('questions', 'ResultQuestionLink')
+    UserStatsRollup = apps.get_model('questions', 'UserStatsRollup')
+
+    rollups = {
+        row['user_id']: UserStatsRollup(user_id=row['user_id'], tests_taken=row['tests_taken'])
+        for row in TestHistory.objects.values('user_id').annotate(tests_taken=Count('id'))
+    }
+    totals = ResultQuestionLink.objects.values('result_id__user_id').annotate(
+        attempted=Count('id'),
+        correct=Sum(Case(When(is_correct=True, then=1), default=0, output_field=IntegerField())),
+        marks_possible=Sum('total_marks'),
+        marks_obtained=Sum('marks_obtained'),
+    )
+    for row in totals:
+        rollup = rollups[row['result_id__user_id']]
+        for field in ('attempted', 'correct', 'marks_possible', 'marks_obtained'):
+            setattr(rollup, field, row[field] or 0)
+    UserStatsRollup.objects.bulk_create(rollups.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('questions', '0012_submission_outbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStatsRollup',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats_rollup', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('tests_taken', models.IntegerField(default=0)),
+                ('attempted', models.IntegerField(default=0)),
+                ('correct', models.IntegerField(default=0)),
+                ('marks_possible', models.IntegerField(default=0)),
+                ('marks_obtained', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.1.5 on 2026-10-18 10:50
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum, Case, When, IntegerField
+
+
+def backfill_topic_stats(apps, schema_editor):
+    """Seed per-topic counters from existing results so later increments start from the right totals."""
+    ResultQuestionLink = apps.get_model('questions', 'ResultQuestionLink')
+    UserTopicStats = apps.get_model('questions', 'UserTopicStats')
+
+    totals = ResultQuestionLink.objects.filter(question_id__topic__isnull=False).values(
+        'result_id__user_id', 'question_id__topic_id'
+    ).annotate(
+        attempted=Count('id'),
+        correct=Sum(Case(When(is_correct=True, then=1), default=0, output_field=IntegerField())),
+        marks_possible=Sum('total_marks'),
+        marks_obtained=Sum('marks_obtained'),
+    )
+    UserTopicStats.objects.bulk_create([
+        UserTopicStats(
+            user_id=row['result_id__user_id'],
+            topic_id=row['question_id__topic_id'],
+            attempted=row['attempted'],
+            correct=row['correct'] or 0,
+            marks_possible=row['marks_possible'] or 0,
+            marks_obtained=row['marks_obtained'] or 0,
+        )
+        for row in totals
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0013_user_stats_rollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserTopicStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempted', models.IntegerField(default=0)),
+                ('correct', models.IntegerField(default=0)),
+                ('marks_possible', models.IntegerField(default=0)),
+                ('marks_obtained', models.IntegerField(default=0)),
+                ('topic', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='questions.topics')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='topic_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'topic')},
+            },
+        ),
+        migrations.RunPython(backfill_topic_stats, migrations.RunPython.noop),
+    ]
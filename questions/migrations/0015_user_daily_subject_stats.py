@@ -0,0 +1,65 @@
+# Generated by Django 5.1.5 on 2026-10-18 10:51
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum, Case, When, IntegerField
+from django.db.models.functions import TruncDate
+
+
+def backfill_daily_stats(apps, schema_editor):
+    """Seed the daily buckets from existing results so trends cover past activity."""
+    ResultQuestionLink = apps.get_model('questions', 'ResultQuestionLink')
+    UserDailySubjectStats = apps.get_model('questions', 'UserDailySubjectStats')
+
+    totals = ResultQuestionLink.objects.filter(question_id__topic__isnull=False).annotate(
+        day=TruncDate('result_id__created_at')
+    ).values(
+        'result_id__user_id', 'question_id__topic__chapter__sub_id', 'day'
+    ).annotate(
+        attempted=Count('id'),
+        correct=Sum(Case(When(is_correct=True, then=1), default=0, output_field=IntegerField())),
+        marks_possible=Sum('total_marks'),
+        marks_obtained=Sum('marks_obtained'),
+    )
+    UserDailySubjectStats.objects.bulk_create([
+        UserDailySubjectStats(
+            user_id=row['result_id__user_id'],
+            subject_id=row['question_id__topic__chapter__sub_id'],
+            day=row['day'],
+            attempted=row['attempted'],
+            correct=row['correct'] or 0,
+            marks_possible=row['marks_possible'] or 0,
+            marks_obtained=row['marks_obtained'] or 0,
+        )
+        for row in totals
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0014_user_topic_stats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserDailySubjectStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('attempted', models.IntegerField(default=0)),
+                ('correct', models.IntegerField(default=0)),
+                ('marks_possible', models.IntegerField(default=0)),
+                ('marks_obtained', models.IntegerField(default=0)),
+                ('subject', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='questions.subjects')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_subject_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'day'], name='daily_stats_user_day_idx')],
+                'unique_together': {('user', 'subject', 'day')},
+            },
+        ),
+        migrations.RunPython(backfill_daily_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.5 on 2026-10-18 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0015_user_daily_subject_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='questions',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
@@ -48,6 +48,8 @@ class Questions(models.Model):
     question = models.TextField()
     options = models.JSONField()
     answer = models.JSONField()
+    # Lets the similarity index find edits it missed when its change log expired
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return f"Q{self.id}: {self.question[:50]}..."
@@ -83,13 +85,25 @@ class GeneratedTestPaper(models.Model):
     total_marks = models.IntegerField()
     total_questions = models.IntegerField()
     created_at = models.DateTimeField(auto_now_add=True)
-    created_by = models.ForeignKey(User, on_delete=models.CASCADE)
+    # NULL while the paper sits unclaimed in the mock reservoir (see questions.reservoir)
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
     TEST_TYPE_CHOICES = [
         ('CUSTOM', 'custom'), 
         ('MOCK', 'mock'), 
     ]
     test_type = models.CharField(max_length=6, choices=TEST_TYPE_CHOICES, default='custom')
     subjects_included = models.JSONField(default=list)
+    # Compiled blueprint version a reservoir paper was assembled from; stale ones are discarded
+    blueprint_version = models.BigIntegerField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['stream', 'blueprint_version'],
+                condition=models.Q(created_by__isnull=True),
+                name='mock_reservoir_idx',
+            ),
+        ]
     
     
     def __str__(self): 
@@ -142,3 +156,111 @@ class ResultQuestionLink(models.Model):
     def __str__(self):
         return f"ResultLink (History: {self.result_id_id}, BaseQ: {self.question_id_id}, Correct: {self.is_correct})"
 
+
+
+class ExamBlueprint(models.Model):
+    """
+    Persisted exam syllabus for a stream: which chapters a mock paper draws from
+    and how many questions of each mark value. Compiled into an id-resolved plan
+    by questions.blueprints so request paths never resolve names.
+    """
+    stream = models.OneToOneField(Streams, on_delete=models.CASCADE, related_name='blueprint')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Blueprint ({self.stream.stream_name})"
+
+
+class BlueprintChapter(models.Model):
+    blueprint = models.ForeignKey(ExamBlueprint, on_delete=models.CASCADE, related_name='entries')
+    chapter = models.ForeignKey(Chapters, on_delete=models.CASCADE)
+    marks = models.IntegerField() # Marks per question, e.g. 1 or 2
+    num_questions = models.IntegerField()
+
+    class Meta:
+        unique_together = ('blueprint', 'chapter', 'marks')
+
+    def __str__(self):
+        return f"{self.chapter} - {self.num_questions} x {self.marks} mark"
+
+
+class SubmissionOutbox(models.Model):
+    """
+    A graded submission waiting to be written to TestHistory/ResultQuestionLink
+    in batches by `manage.py flush_submissions` (SUBMISSION_INGEST_MODE='queued').
+    One row per (user, paper), kept after flushing, so retried submits never count twice.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    test_paper = models.ForeignKey(GeneratedTestPaper, on_delete=models.CASCADE)
+    stream = models.ForeignKey(Streams, on_delete=models.CASCADE, null=True)
+    test_type = models.CharField(max_length=6)
+    total_marks = models.IntegerField(default=0)
+    obtained_marks = models.IntegerField(default=0)
+    time = models.IntegerField(default=0)
+    subjects_included = models.JSONField(default=list)
+    results = models.JSONField(default=list) # [[question_id, user_answer, is_correct, marks], ...]
+    created_at = models.DateTimeField(auto_now_add=True)
+    flushed_at = models.DateTimeField(null=True, blank=True)
+    history = models.OneToOneField(TestHistory, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+
+    class Meta:
+        unique_together = ('user', 'test_paper')
+        indexes = [
+            models.Index(fields=['id'], name='submission_pending_idx', condition=models.Q(flushed_at__isnull=True)),
+        ]
+
+    def __str__(self):
+        return f"Submission ({self.user_id}, paper {self.test_paper_id})"
+
+
+class UserStatsRollup(models.Model):
+    """
+    Running totals behind OverallStatsView, bumped by questions.stats each time a
+    submission is written; `?recompute=1` rebuilds a row from TestHistory.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='stats_rollup')
+    tests_taken = models.IntegerField(default=0)
+    attempted = models.IntegerField(default=0)
+    correct = models.IntegerField(default=0)
+    marks_possible = models.IntegerField(default=0)
+    marks_obtained = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"Stats ({self.user_id})"
+
+
+class UserTopicStats(models.Model):
+    """
+    Per-user, per-topic answer counters bumped on every submission; chapter and
+    subject performance are rolled up from these through the cached taxonomy.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='topic_stats')
+    topic = models.ForeignKey(Topics, on_delete=models.CASCADE)
+    attempted = models.IntegerField(default=0)
+    correct = models.IntegerField(default=0)
+    marks_possible = models.IntegerField(default=0)
+    marks_obtained = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('user', 'topic')
+
+    def __str__(self):
+        return f"Topic stats ({self.user_id}, {self.topic_id})"
+
+
+class UserDailySubjectStats(models.Model):
+    """One bucket per user, subject and day, bumped on submission; backs /stats/trend/."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_subject_stats')
+    subject = models.ForeignKey(Subjects, on_delete=models.CASCADE)
+    day = models.DateField()
+    attempted = models.IntegerField(default=0)
+    correct = models.IntegerField(default=0)
+    marks_possible = models.IntegerField(default=0)
+    marks_obtained = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('user', 'subject', 'day')
+        indexes = [models.Index(fields=['user', 'day'], name='daily_stats_user_day_idx')]
+
+    def __str__(self):
+        return f"Daily stats ({self.user_id}, {self.subject_id}, {self.day})"
@@ -0,0 +1,72 @@
+import gzip
+
+from django.core.cache import cache
+from django.http import HttpResponse
+from rest_framework.renderers import JSONRenderer
+
+from .counters import bump_counter, read_counter
+
+# Bumped whenever any question's text/options change, so cached payloads never serve
+# a stale question set. Payloads are keyed by paper id *and* this version.
+QUESTION_SET_VERSION_KEY = 'paper:qset:version'
+PAPER_PAYLOAD_KEY = 'paper:payload:{paper_id}:v{version}'
+PAPER_PAYLOAD_TIMEOUT = 60 * 60 * 24
+
+
+def question_set_version():
+    return read_counter(QUESTION_SET_VERSION_KEY)
+
+
+def invalidate_paper_payloads():
+    bump_counter(QUESTION_SET_VERSION_KEY)
+
+
+def render_paper_payload(paper, hero_questions):
+    """
+    Render the answer-free {'test_details', 'questions'} response body once and
+    return it gzip-compressed; hero_questions need select_related('question').
+    """
+    from .serializers import GeneratedTestPaperSerializer, HeroQuestionsWithoutAnswerSerializer
+    body = JSONRenderer().render({
+        'test_details': GeneratedTestPaperSerializer(paper).data,
+        'questions': HeroQuestionsWithoutAnswerSerializer(hero_questions, many=True).data,
+    })
+    return gzip.compress(body, mtime=0)
+
+
+def cache_paper_payload(paper, hero_questions):
+    """Render and cache a paper's payload; returns the compressed blob."""
+    blob = render_paper_payload(paper, hero_questions)
+    key = PAPER_PAYLOAD_KEY.format(paper_id=paper.id, version=question_set_version())
+    cache.set(key, (paper.created_by_id, blob), PAPER_PAYLOAD_TIMEOUT)
+    return blob
+
+
+def load_paper_payload(paper_id):
+    """
+    (owner_id, blob) for a paper: from the cache on the warm path, otherwise
+    rebuilt from the DB (two queries) and cached. None if the paper doesn't exist.
+    """
+    from .models import GeneratedTestPaper, HeroQuestions
+    cached = cache.get(PAPER_PAYLOAD_KEY.format(paper_id=paper_id, version=question_set_version()))
+    if cached is not None:
+        return cached
+
+    paper = GeneratedTestPaper.objects.filter(pk=paper_id).first()
+    if paper is None:
+        return None
+    hero_questions = HeroQuestions.objects.filter(testquestionlink__test_id=paper).select_related(
+        'question'
+    ).order_by('testquestionlink__id')
+    return paper.created_by_id, cache_paper_payload(paper, hero_questions)
+
+
+def paper_payload_response(request, blob, status=200):
+    """Serve a cached blob as-is to gzip-capable clients, inflated for the rest."""
+    if 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', ''):
+        response = HttpResponse(blob, content_type='application/json', status=status)
+        response['Content-Encoding'] = 'gzip'
+    else:
+        response = HttpResponse(gzip.decompress(blob), content_type='application/json', status=status)
+    response['Vary'] = 'Accept-Encoding'
+    return response
@@ -0,0 +1,55 @@
+from django.db import transaction
+
+from .grading import cache_answer_key
+from .metrics import timed
+from .models import GeneratedTestPaper, HeroQuestions, TestQuestionLink
+from .pools import question_pools
+
+
+def assemble_mock_paper(plan, exclude=None):
+    """
+    Draw one mock paper's HeroQuestions for a compiled blueprint from the pool index.
+    Returned in blueprint order, with question and topic__chapter already loaded.
+    `exclude` is an optional SeenBitmap of questions to avoid repeating.
+    """
+    selected_ids = []
+    for entry in plan.entries:
+        selected_ids.extend(question_pools.sample(
+            plan.stream_id, entry.chapter_id, entry.marks, entry.num_questions, exclude=exclude
+        ))
+
+    # Hydrate the sampled questions in one query, keeping the syllabus order
+    hero_map = HeroQuestions.objects.select_related('question', 'topic__chapter').in_bulk(selected_ids)
+    return [hero_map[qid] for qid in selected_ids if qid in hero_map]
+
+
+def persist_test_paper(stream_id, created_by, test_type, hero_questions, subject_ids=None, blueprint_version=None):
+    """
+    Save a GeneratedTestPaper and all of its TestQuestionLink rows in one transaction
+    (one INSERT for the paper, one bulk INSERT for the links).
+
+    hero_questions should be fetched with select_related('question', 'topic__chapter')
+    so the subject ids and the answer key can be derived without another query.
+    Returns (paper, timer) where timer.ms is the paper_persist_ms metric.
+    """
+    if subject_ids is None:
+        subject_ids = sorted({q.topic.chapter.sub_id_id for q in hero_questions})
+
+    with timed('paper_persist_ms', test_type=test_type, questions=len(hero_questions)) as timer:
+        with transaction.atomic():
+            paper = GeneratedTestPaper.objects.create(
+                stream_id=stream_id,
+                total_marks=sum(q.marks for q in hero_questions),
+                total_questions=len(hero_questions),
+                created_by=created_by,
+                test_type=test_type,
+                subjects_included=list(subject_ids),
+                blueprint_version=blueprint_version,
+            )
+            TestQuestionLink.objects.bulk_create([
+                TestQuestionLink(test_id=paper, question_id=question)
+                for question in hero_questions
+            ])
+    # Compiled now so submissions grade without reading the paper back
+    cache_answer_key(paper, hero_questions)
+    return paper, timer
@@ -0,0 +1,221 @@
+import random
+import threading
+from array import array
+
+from django.core.cache import cache
+
+from .counters import bump_counter
+
+# Shared copy of the index so every worker doesn't have to rebuild it from the DB.
+# Each pool is its own cache entry, so an edit rewrites one pool, not the bank;
+# every write bumps the version and logs which pools it touched under that number.
+# The v2 prefix marks 64-bit ids (BigAutoField); bump it whenever the byte format changes.
+POOL_VERSION_KEY = 'qpool:v2:version'
+POOL_KEYS_KEY = 'qpool:v2:keys'
+POOL_KEY = 'qpool:v2:pool:{stream_id}:{chapter_id}:{marks}'
+POOL_CHANGE_KEY = 'qpool:v2:change:{version}'
+POOL_CACHE_TIMEOUT = None  # Kept until explicitly invalidated
+POOL_CHANGE_TIMEOUT = 60 * 60 * 24
+MAX_REPLAY = 1000 # Further behind than this, reloading every pool is cheaper
+
+
+def _pool_key(key):
+    stream_id, chapter_id, marks = key
+    return POOL_KEY.format(stream_id=stream_id, chapter_id=chapter_id, marks=marks)
+
+
+def _unpack(raw):
+    ids = array('q')
+    ids.frombytes(raw)
+    return ids
+
+
+class QuestionPoolIndex:
+    """
+    In-process index of HeroQuestions ids grouped by (stream_id, chapter_id, marks).
+
+    Each pool is a compact array of ids so a draw is a random.sample over k
+    positions instead of an ORDER BY RANDOM() scan of the hero question table.
+    Pools are published to the cache so other workers can load them without
+    touching the DB, and are patched incrementally by the HeroQuestions signals;
+    a worker that falls behind reloads only the pools named in the change log.
+    Edits to the same pool published from two workers at the same moment are
+    last-writer-wins; invalidate() forces a clean rebuild from the DB.
+    """
+    def __init__(self):
+        self._pools = {}      # (stream_id, chapter_id, marks) -> array('q') of HeroQuestions ids
+        self._locations = {}  # HeroQuestions id -> pool key, needed to move/remove on save/delete
+        self._version = None
+        self._lock = threading.RLock()
+
+    # --- Loading -----------------------------------------------------------
+
+    def build(self):
+        """Full build from the DB (one query) and publish every pool to the cache."""
+        from questions.models import HeroQuestions
+        rows = HeroQuestions.objects.values_list('id', 'stream_id', 'topic__chapter_id', 'marks')
+        with self._lock:
+            self._pools = {}
+            self._locations = {}
+            for hero_id, stream_id, chapter_id, marks in rows:
+                self._insert(hero_id, (stream_id, chapter_id, marks))
+            cache.set_many({_pool_key(key): ids.tobytes() for key, ids in self._pools.items()}, POOL_CACHE_TIMEOUT)
+            cache.set(POOL_KEYS_KEY, list(self._pools), POOL_CACHE_TIMEOUT)
+            # No change entry for this version: other workers reload every pool
+            self._version = bump_counter(POOL_VERSION_KEY)
+
+    def _load_all(self, version):
+        keys = cache.get(POOL_KEYS_KEY)
+        if keys is None:
+            return False
+        raw = cache.get_many([_pool_key(key) for key in keys])
+        if len(raw) < len(keys):
+            return False
+        self._pools = {}
+        self._locations = {}
+        for key in keys:
+            for hero_id in _unpack(raw[_pool_key(key)]):
+                self._insert(hero_id, key)
+        self._version = version
+        return True
+
+    def _replay(self, version):
+        """Reload just the pools changed since our version; False if the log can't cover the gap."""
+        if self._version is None or not 0 < version - self._version <= MAX_REPLAY:
+            return False
+        changes = cache.get_many([POOL_CHANGE_KEY.format(version=n) for n in range(self._version + 1, version + 1)])
+        if len(changes) < version - self._version:
+            return False
+        keys = {key for changed in changes.values() for key in changed}
+        raw = cache.get_many([_pool_key(key) for key in keys])
+        if len(raw) < len(keys):
+            return False
+        for key in keys:
+            for hero_id in self._pools.pop(key, ()):
+                if self._locations.get(hero_id) == key:
+                    del self._locations[hero_id]
+        for key in keys:
+            for hero_id in _unpack(raw[_pool_key(key)]):
+                self._discard(hero_id) # Moved here by an edit whose other pool we haven't seen yet
+                self._insert(hero_id, key)
+        self._version = version
+        return True
+
+    def _ensure_fresh(self):
+        """Catch up with pools other workers have changed."""
+        version = cache.get(POOL_VERSION_KEY)
+        if version is not None and version == self._version:
+            return
+        with self._lock:
+            if version is None or not (self._replay(version) or self._load_all(version)):
+                self.build()
+
+    def _publish(self, keys, new_pool=False):
+        """Write the given pools to the cache and log them under a new version."""
+        if new_pool:
+            listed = cache.get(POOL_KEYS_KEY) or []
+            cache.set(POOL_KEYS_KEY, listed + [key for key in keys if key not in listed], POOL_CACHE_TIMEOUT)
+        cache.set_many(
+            {_pool_key(key): self._pools.get(key, array('q')).tobytes() for key in keys}, POOL_CACHE_TIMEOUT
+        )
+        version = bump_counter(POOL_VERSION_KEY)
+        cache.set(POOL_CHANGE_KEY.format(version=version), list(keys), POOL_CHANGE_TIMEOUT)
+        if self._version == version - 1:
+            self._version = version # Otherwise there are other workers' changes still to replay
+
+    # --- Mutation ----------------------------------------------------------
+
+    def _insert(self, hero_id, key):
+        self._pools.setdefault(key, array('q')).append(hero_id)
+        self._locations[hero_id] = key
+
+    def _discard(self, hero_id):
+        key = self._locations.pop(hero_id, None)
+        if key is None:
+            return None
+        pool = self._pools.get(key)
+        if pool is not None:
+            pool.remove(hero_id)
+            if not pool:
+                del self._pools[key]
+        return key
+
+    def upsert(self, hero_id, stream_id, chapter_id, marks):
+        """Add a hero question or move it to its new pool after an edit."""
+        self._ensure_fresh()
+        key = (stream_id, chapter_id, marks)
+        with self._lock:
+            if self._locations.get(hero_id) == key:
+                return
+            old_key = self._discard(hero_id)
+            is_new_pool = key not in self._pools
+            self._insert(hero_id, key)
+            self._publish([key] if old_key is None else [old_key, key], new_pool=is_new_pool)
+
+    def remove(self, hero_id):
+        self._ensure_fresh()
+        with self._lock:
+            key = self._discard(hero_id)
+            if key is not None:
+                self._publish([key])
+
+    def invalidate(self):
+        """Drop the shared index; the next access rebuilds from the DB."""
+        with self._lock:
+            cache.delete_many([POOL_VERSION_KEY, POOL_KEYS_KEY])
+            self._version = None
+
+    # --- Sampling ----------------------------------------------------------
+
+    def available(self, stream_id, chapter_id, marks):
+        self._ensure_fresh()
+        return len(self._pools.get((stream_id, chapter_id, marks), ()))
+
+    def sample(self, stream_id, chapter_id, marks, k, exclude=None):
+        """
+        Draw up to k distinct HeroQuestions ids from one pool without replacement.
+        Returns fewer than k ids if the pool is smaller than requested.
+
+        Ids in `exclude` (e.g. a SeenBitmap) are avoided where possible: they are
+        only used to top the draw up when the pool has too few other questions.
+        """
+        if k <= 0:
+            return []
+        self._ensure_fresh()
+        pool = self._pools.get((stream_id, chapter_id, marks))
+        if not pool:
+            return []
+        k = min(k, len(pool))
+        if not exclude:
+            return random.sample(pool, k)
+
+        # Rejection sampling stays O(k) while most of the pool is still unseen...
+        picked, taken = [], set() # Draw order, and membership for the duplicate check
+        for _ in range(4 * k + 16):
+            qid = pool[random.randrange(len(pool))]
+            if qid not in exclude and qid not in taken:
+                picked.append(qid)
+                taken.add(qid)
+                if len(picked) == k:
+                    return picked
+        # ...otherwise fall back to one pass over the pool
+        unseen = [qid for qid in pool if qid not in exclude and qid not in taken]
+        picked.extend(random.sample(unseen, min(k - len(picked), len(unseen))))
+        if len(picked) < k:
+            taken.update(picked)
+            seen = [qid for qid in pool if qid not in taken]
+            picked.extend(random.sample(seen, k - len(picked)))
+        return picked
+
+    def chapter_ids(self, stream_id, chapter_ids):
+        """Every HeroQuestions id of a stream in the given chapters, whatever the marks."""
+        self._ensure_fresh()
+        chapter_ids = set(chapter_ids)
+        return [
+            qid for (pool_stream, pool_chapter, _), pool in self._pools.items()
+            if pool_stream == stream_id and pool_chapter in chapter_ids for qid in pool
+        ]
+
+
+# Singleton instance
+question_pools = QuestionPoolIndex()
@@ -0,0 +1,79 @@
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .metrics import timed
+from .models import GeneratedTestPaper, TestQuestionLink
+from .papers import assemble_mock_paper, persist_test_paper
+
+
+def reservoir_depth_target():
+    return getattr(settings, 'MOCK_RESERVOIR_DEPTH', 50)
+
+
+def _unclaimed(plan):
+    return GeneratedTestPaper.objects.filter(
+        created_by__isnull=True,
+        stream_id=plan.stream_id,
+        test_type='mock',
+        blueprint_version=plan.version,
+    )
+
+
+# How many reservoir papers a claim compares against the user's seen questions
+RESERVOIR_CLAIM_CANDIDATES = 5
+
+
+def claim_mock_paper(plan, user, seen=None):
+    """
+    Bind one pre-assembled mock paper to `user`. Returns (paper, timer), with paper
+    None if the reservoir for this blueprint version is empty. SKIP LOCKED lets
+    concurrent requests claim different papers without waiting on each other.
+
+    With a SeenBitmap, the claim picks whichever of the next few papers repeats
+    the fewest questions the user has already seen.
+    """
+    with timed('mock_claim_ms', stream=plan.stream_name) as timer:
+        with transaction.atomic():
+            candidates = list(
+                _unclaimed(plan).select_for_update(skip_locked=True)
+                .order_by('id')[:RESERVOIR_CLAIM_CANDIDATES if seen else 1]
+            )
+            paper = candidates[0] if candidates else None
+            if len(candidates) > 1:
+                links = TestQuestionLink.objects.filter(test_id__in=candidates).values_list('test_id', 'question_id')
+                overlap = Counter(test_id for test_id, hero_id in links if hero_id in seen)
+                paper = min(candidates, key=lambda p: overlap[p.id])
+            if paper is not None:
+                paper.created_by = user
+                paper.created_at = timezone.now() # The attempt starts now, not when it was assembled
+                paper.save(update_fields=['created_by', 'created_at'])
+    return paper, timer
+
+
+def refill_reservoir(plan, depth=None):
+    """
+    Top the reservoir up to `depth` unclaimed papers for the plan's current version,
+    discarding papers assembled from an older blueprint. Returns the number added.
+    """
+    depth = reservoir_depth_target() if depth is None else depth
+    GeneratedTestPaper.objects.filter(
+        created_by__isnull=True, stream_id=plan.stream_id, test_type='mock'
+    ).exclude(blueprint_version=plan.version).delete()
+
+    added = 0
+    for _ in range(depth - _unclaimed(plan).count()):
+        hero_questions = assemble_mock_paper(plan)
+        if not hero_questions:
+            break # Empty question bank for this blueprint; nothing worth reserving
+        persist_test_paper(
+            stream_id=plan.stream_id,
+            created_by=None,
+            test_type='mock',
+            hero_questions=hero_questions,
+            blueprint_version=plan.version,
+        )
+        added += 1
+    return added
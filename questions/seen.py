@@ -0,0 +1,93 @@
+import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+# One Redis bitmap per user per day: bit n is set if HeroQuestions n was in a paper the
+# user submitted. Day buckets expire on their own, which is what gives the window its decay.
+SEEN_KEY = 'seen:{user_id}:{day}'
+
+
+def _redis(write=False):
+    return cache.client.get_client(write=write)
+
+
+def seen_window_days():
+    return getattr(settings, 'SEEN_QUESTIONS_WINDOW_DAYS', 30)
+
+
+class SeenBitmap:
+    """
+    Compact set of question ids backed by a bytearray (1 bit per id), in the
+    bit order of Redis SETBIT/GETBIT so a day bucket loads as-is.
+    """
+    def __init__(self, data=b''):
+        self.bits = bytearray(data)
+
+    def add(self, qid):
+        byte = qid >> 3
+        if byte >= len(self.bits):
+            self.bits.extend(bytes(byte + 1 - len(self.bits)))
+        self.bits[byte] |= 0x80 >> (qid & 7)
+
+    def update(self, other):
+        """In-place OR with another bitmap."""
+        if len(other.bits) > len(self.bits):
+            self.bits.extend(bytes(len(other.bits) - len(self.bits)))
+        for i, byte in enumerate(other.bits):
+            if byte:
+                self.bits[i] |= byte
+
+    def __contains__(self, qid):
+        byte = qid >> 3
+        return byte < len(self.bits) and bool(self.bits[byte] & 0x80 >> (qid & 7))
+
+    def __len__(self):
+        return int.from_bytes(self.bits, 'little').bit_count()
+
+    def __bool__(self):
+        return any(self.bits)
+
+    def __iter__(self):
+        for i, byte in enumerate(self.bits):
+            while byte:
+                high = byte.bit_length() - 1
+                yield (i << 3) + 7 - high
+                byte ^= 1 << high
+
+    def tobytes(self):
+        return bytes(self.bits)
+
+
+def _day_keys(user_id, days):
+    today = timezone.now().date()
+    return [SEEN_KEY.format(user_id=user_id, day=(today - datetime.timedelta(days=d)).toordinal())
+            for d in range(days)]
+
+
+def mark_seen(user_id, hero_ids):
+    """Record questions from a submitted paper in today's bucket."""
+    days = seen_window_days()
+    if days <= 0 or not hero_ids:
+        return
+    key = _day_keys(user_id, 1)[0]
+    # SETBIT, not a read-modify-write, so two submissions landing together both stick.
+    # The bucket is as long as the highest id set, not the number of questions seen.
+    pipe = _redis(write=True).pipeline(transaction=False)
+    for hero_id in hero_ids:
+        pipe.setbit(key, hero_id, 1)
+    pipe.expire(key, days * 24 * 60 * 60)
+    pipe.execute()
+
+
+def load_seen(user_id):
+    """Union of the user's day buckets inside the decay window, in one Redis round trip."""
+    days = seen_window_days()
+    seen = SeenBitmap()
+    if days <= 0:
+        return seen
+    for data in _redis().mget(_day_keys(user_id, days)):
+        if data:
+            seen.update(SeenBitmap(data))
+    return seen
@@ -0,0 +1,92 @@
+from django.db.models import Case, F, IntegerField, Value, When, Window
+from django.db.models.functions import Random, RowNumber
+from rest_framework import status
+
+from .models import Chapters, HeroQuestions
+from .pools import question_pools
+
+
+class SelectionError(Exception):
+    """Raised when a test request can't be satisfied; carries the HTTP status to answer with."""
+    def __init__(self, message, status_code=status.HTTP_400_BAD_REQUEST):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+def select_custom_test_questions(stream_id, subjects, exclude=None):
+    """
+    Pick random HeroQuestions for every requested chapter in two queries, independent
+    of how many chapters are requested:
+      1. one query validating all subject/chapter ids,
+      2. one window-ranked query (ROW_NUMBER() OVER (PARTITION BY chapter ORDER BY RANDOM()))
+         drawing every chapter's sample at once.
+
+    `subjects` is CustomTestSerializer's validated 'subjects' list. Ids in `exclude`
+    (e.g. the user's SeenBitmap) are ranked after every unseen question of the chapter;
+    they are matched against the chapters' candidates in the pool index first.
+    Returns (hero_questions, subject_ids) in request order; raises SelectionError.
+    """
+    subject_ids = {s['subject_id'] for s in subjects}
+    chapter_rows = Chapters.objects.filter(sub_id__in=subject_ids).values_list(
+        'id', 'sub_id', 'chapter_name', 'sub_id__subject_name'
+    )
+    chapters = {cid: (sub_id, chapter_name, subject_name) for cid, sub_id, chapter_name, subject_name in chapter_rows}
+    known_subjects = {sub_id: subject_name for sub_id, _, subject_name in chapters.values()}
+
+    # Requested count per chapter, in request order (a chapter listed twice adds up)
+    requested = {}
+    for subject_data in subjects:
+        subject_id = subject_data['subject_id']
+        if subject_id not in known_subjects:
+            raise SelectionError(f"Subject with ID {subject_id} not found.", status.HTTP_404_NOT_FOUND)
+        for chapter_data in subject_data['chapters']:
+            chapter_id = chapter_data['chapter_id']
+            if chapters.get(chapter_id, (None,))[0] != subject_id:
+                raise SelectionError(
+                    f"Chapter with ID {chapter_id} not found for Subject {known_subjects[subject_id]}.",
+                    status.HTTP_404_NOT_FOUND
+                )
+            requested[chapter_id] = requested.get(chapter_id, 0) + chapter_data['num_questions']
+
+    if not requested:
+        return [], []
+
+    order_by = [Random()]
+    if exclude:
+        # Only the requested chapters' seen questions go into the SQL, not the user's whole history
+        seen = [qid for qid in question_pools.chapter_ids(stream_id, requested) if qid in exclude]
+        if seen:
+            order_by.insert(0, Case(
+                When(id__in=seen, then=Value(1)), default=Value(0), output_field=IntegerField()
+            ))
+
+    # Every chapter gets at most max(requested) ranked rows; trimmed per chapter below
+    ranked = HeroQuestions.objects.filter(
+        stream_id=stream_id,
+        topic__chapter_id__in=requested.keys(),
+    ).annotate(
+        pick_chapter=F('topic__chapter_id'),
+        pick_rank=Window(RowNumber(), partition_by=F('topic__chapter_id'), order_by=order_by),
+    ).filter(
+        pick_rank__lte=max(requested.values())
+    ).select_related('question')
+
+    drawn = {chapter_id: [] for chapter_id in requested}
+    for hero in ranked:
+        drawn[hero.pick_chapter].append(hero)
+
+    selected, subject_ids_included = [], []
+    for chapter_id, num_requested in requested.items():
+        found = sorted(drawn[chapter_id], key=lambda hero: hero.pick_rank)
+        if len(found) < num_requested:
+            sub_id, chapter_name, subject_name = chapters[chapter_id]
+            raise SelectionError(
+                f'Not enough questions available for {subject_name} - {chapter_name}. '
+                f'Found {len(found)}, requested {num_requested}.'
+            )
+        selected.extend(found[:num_requested])
+        if chapters[chapter_id][0] not in subject_ids_included:
+            subject_ids_included.append(chapters[chapter_id][0])
+
+    return selected, subject_ids_included
@@ -187,6 +187,7 @@ class CustomTestSerializer(serializers.Serializer):
         required=True
     )
     time_minutes = serializers.IntegerField(min_value=1, required=True)
+    stream = serializers.CharField(required=False, default='IOE', help_text="Stream name, resolved through its compiled blueprint.")
 
 class QuestionWithAnswerSerializer(serializers.ModelSerializer):
     class Meta:
@@ -311,6 +312,36 @@ class TestHistorySummarySerializer(serializers.ModelSerializer):
 
 
 
+class SubmissionReceiptSerializer(serializers.ModelSerializer):
+    """Score of a queued submission; `history` stays null until flush_submissions writes it."""
+    score_percentage = serializers.SerializerMethodField()
+    results = serializers.SerializerMethodField()
+
+    class Meta:
+        model = SubmissionOutbox
+        fields = [
+            'test_paper', 'history', 'total_marks', 'obtained_marks', 'score_percentage',
+            'created_at', 'time', 'test_type', 'subjects_included', 'results',
+        ]
+
+    def get_score_percentage(self, obj):
+        if obj.total_marks and obj.total_marks > 0:
+            return round((obj.obtained_marks / obj.total_marks) * 100, 2)
+        return 0.0
+
+    def get_results(self, obj):
+        return [
+            {
+                'question_id': question_id,
+                'user_answer': user_answer,
+                'is_correct': is_correct,
+                'marks_obtained': marks if is_correct else 0,
+                'total_marks': marks,
+            }
+            for question_id, user_answer, is_correct, marks in obj.results
+        ]
+
+
 class OverallStatsSerializer(serializers.Serializer):
     total_tests_taken = serializers.IntegerField()
     total_questions_attempted = serializers.IntegerField()
@@ -355,6 +386,20 @@ class TopicPerformanceSerializer(BasePerformanceSerializer):
             'accuracy_percentage', 'score_percentage'
         ]
 
+class ChapterPerformanceTreeSerializer(ChapterPerformanceSerializer):
+    topics = TopicPerformanceSerializer(many=True)
+
+class SubjectPerformanceTreeSerializer(SubjectPerformanceSerializer):
+    chapters = ChapterPerformanceTreeSerializer(many=True)
+
+class PerformanceTrendSerializer(BasePerformanceSerializer):
+    period_start = serializers.DateField()
+
+class PerformanceTrendQuerySerializer(serializers.Serializer):
+    granularity = serializers.ChoiceField(choices=['day', 'week'], default='day')
+    subject = serializers.IntegerField(required=False)
+    days = serializers.IntegerField(min_value=1, max_value=366, default=30)
+
 
 class HeroQuestionWritePayloadSerializer(serializers.Serializer):
     question = serializers.CharField(max_length=10000)
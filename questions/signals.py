@@ -1,7 +1,17 @@
 # your_app_name/signals.py (create this file if it doesn't exist)
-from django.db.models.signals import post_delete
-from django.dispatch import receiver
-from .models import HeroQuestions, Questions
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+from .models import HeroQuestions, Questions, Topics, Subjects, Streams, Chapters, ExamBlueprint, BlueprintChapter
+from .pools import question_pools
+from .blueprints import invalidate_blueprints
+from .paper_cache import invalidate_paper_payloads
+from .taxonomy import invalidate_taxonomy
+
+# Sent (robustly) once the transaction that wrote a batch of TestHistory rows has
+# committed, with histories=[TestHistory, ...] and subject_marks={history.pk:
+# {subject_id: marks_obtained}}. bulk_create sends no post_save.
+submissions_saved = Signal()
 
 @receiver(post_delete, sender=HeroQuestions)
 def delete_orphaned_question(sender, instance, **kwargs):
@@ -18,14 +28,58 @@ def delete_orphaned_question(sender, instance, **kwargs):
         if not question_to_check.hero_instances.exists():
             question_to_check.delete()
 
-# your_app_name/apps.py
-from django.apps import AppConfig
 
-class QuestionsConfig(AppConfig):
-    default_auto_field = 'django.db.models.BigAutoField'
-    name = 'your_app_name'
+@receiver(post_save, sender=HeroQuestions)
+def update_question_pool_on_save(sender, instance, raw=False, **kwargs):
+    """Keep the (stream, chapter, marks) sampling pools in step with the bank."""
+    if raw:  # loaddata
+        return
+    # Applied on commit, so a rolled-back save never leaves its id in a shared pool
+    hero_id, stream_id, topic_id, marks = instance.id, instance.stream_id, instance.topic_id, instance.marks
+    def upsert():
+        chapter_id = Topics.objects.filter(id=topic_id).values_list('chapter_id', flat=True).first()
+        question_pools.upsert(hero_id, stream_id, chapter_id, marks)
+    transaction.on_commit(upsert)
+
+@receiver(post_delete, sender=HeroQuestions)
+def update_question_pool_on_delete(sender, instance, **kwargs):
+    hero_id = instance.id
+    transaction.on_commit(lambda: question_pools.remove(hero_id))
+
+@receiver(post_save, sender=Topics)
+@receiver(post_delete, sender=Topics)
+def invalidate_question_pool_on_topic_change(sender, instance, **kwargs):
+    # A topic moving chapters re-keys every hero question under it; rebuild lazily.
+    transaction.on_commit(question_pools.invalidate)
+
+@receiver(post_save, sender=ExamBlueprint)
+@receiver(post_delete, sender=ExamBlueprint)
+@receiver(post_save, sender=BlueprintChapter)
+@receiver(post_delete, sender=BlueprintChapter)
+@receiver(post_save, sender=Chapters)
+@receiver(post_delete, sender=Chapters)
+@receiver(post_save, sender=Subjects)
+@receiver(post_save, sender=Streams)
+@receiver(post_delete, sender=Streams)
+def invalidate_compiled_blueprints(sender, instance, **kwargs):
+    # Compiled plans embed chapter/subject/stream names and ids; recompile on the next request.
+    invalidate_blueprints()
 
-    def ready(self):
-        import questions.signals # Import signals here
+@receiver(post_save, sender=Questions)
+@receiver(post_delete, sender=Questions)
+@receiver(post_save, sender=HeroQuestions)
+@receiver(post_delete, sender=HeroQuestions)
+def invalidate_cached_paper_payloads(sender, instance, raw=False, **kwargs):
+    # Cached paper payloads embed question text/options; move them all to a new version.
+    if not raw:
+        invalidate_paper_payloads()
 
-# Make sure YourAppNameConfig is registered in settings.INSTALLED_APPS
\ No newline at end of file
+@receiver(post_save, sender=Subjects)
+@receiver(post_delete, sender=Subjects)
+@receiver(post_save, sender=Chapters)
+@receiver(post_delete, sender=Chapters)
+@receiver(post_save, sender=Topics)
+@receiver(post_delete, sender=Topics)
+def invalidate_cached_taxonomy(sender, instance, **kwargs):
+    # Stats rollups read names and parents from the cached tree.
+    invalidate_taxonomy()
@@ -0,0 +1,245 @@
+import datetime
+import operator
+from functools import reduce
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Sum, Case, When, IntegerField, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Questions, ResultQuestionLink, TestHistory, UserDailySubjectStats, UserStatsRollup, UserTopicStats
+from .taxonomy import get_taxonomy
+
+COUNTERS = ('attempted', 'correct', 'marks_possible', 'marks_obtained')
+
+
+def add_to_counters(model, key_fields, deltas):
+    """
+    Add `deltas` ({key tuple: {field: amount}}) onto the counter rows of `model`
+    identified by `key_fields`, creating the rows that don't exist yet. Takes a
+    fixed number of queries however many rows are touched (lock, insert, update)
+    and must run inside the caller's transaction. Rows are locked and created in
+    key order, so concurrent flushes can't deadlock on each other.
+    """
+    if not deltas:
+        return
+    deltas = dict(sorted(deltas.items()))
+    if len(key_fields) == 1:
+        lookup = Q(**{f'{key_fields[0]}__in': [key[0] for key in deltas]})
+    else:
+        # Exactly these keys; per-field __in filters would lock their whole cross product
+        lookup = reduce(operator.or_, (Q(**dict(zip(key_fields, key))) for key in deltas))
+    fields = sorted({field for amounts in deltas.values() for field in amounts})
+
+    for attempt in range(2):
+        existing = {
+            tuple(getattr(row, field) for field in key_fields): row
+            for row in model.objects.select_for_update().filter(lookup).order_by('pk')
+        }
+        missing = [
+            model(**dict(zip(key_fields, key)), **amounts)
+            for key, amounts in deltas.items() if key not in existing
+        ]
+        if missing:
+            try:
+                with transaction.atomic():
+                    model.objects.bulk_create(missing)
+            except IntegrityError:
+                if attempt:
+                    raise
+                continue # A concurrent submission created some of them first; lock and add instead
+
+        updated = []
+        for key, amounts in deltas.items():
+            row = existing.get(key)
+            if row is not None:
+                for field, amount in amounts.items():
+                    setattr(row, field, getattr(row, field) + amount)
+                updated.append(row)
+        if updated:
+            model.objects.bulk_update(updated, fields)
+        return
+
+
+def _tally(counters, results):
+    for _, _, is_correct, marks in results:
+        counters['attempted'] += 1
+        counters['marks_possible'] += marks
+        if is_correct:
+            counters['correct'] += 1
+            counters['marks_obtained'] += marks
+
+
+def record_submissions(submissions):
+    """
+    Fold freshly written submissions into the stats tables. `submissions` is an
+    iterable of (TestHistory, results) with the graded
+    (question_id, user_answer, is_correct, marks) results; call inside the
+    transaction that wrote them. Returns each history's marks per subject,
+    {history.pk: {subject_id: marks_obtained}}, for the subject leaderboards.
+    """
+    submissions = list(submissions)
+    question_ids = {result[0] for _, results in submissions for result in results}
+    topic_of = dict(
+        Questions.objects.filter(id__in=question_ids, topic__isnull=False).values_list('id', 'topic_id')
+    )
+
+    taxonomy = get_taxonomy()
+
+    rollups, topics, days, subject_marks = {}, {}, {}, {}
+    for history, results in submissions:
+        counters = rollups.setdefault((history.user_id,), dict.fromkeys(('tests_taken',) + COUNTERS, 0))
+        counters['tests_taken'] += 1
+        _tally(counters, results)
+        day = timezone.localdate(history.created_at)
+        by_topic = {}
+        for result in results:
+            if result[0] in topic_of:
+                by_topic.setdefault(topic_of[result[0]], []).append(result)
+        for topic_id, topic_results in by_topic.items():
+            _tally(topics.setdefault((history.user_id, topic_id), dict.fromkeys(COUNTERS, 0)), topic_results)
+            if topic_id in taxonomy.topics:
+                subject_id = taxonomy.chapters[taxonomy.topics[topic_id][1]][1]
+                _tally(days.setdefault((history.user_id, subject_id, day), dict.fromkeys(COUNTERS, 0)), topic_results)
+                marks = subject_marks.setdefault(history.pk, {})
+                marks[subject_id] = marks.get(subject_id, 0) + sum(r[3] for r in topic_results if r[2])
+
+    add_to_counters(UserStatsRollup, ('user_id',), rollups)
+    add_to_counters(UserTopicStats, ('user_id', 'topic_id'), topics)
+    add_to_counters(UserDailySubjectStats, ('user_id', 'subject_id', 'day'), days)
+    return subject_marks
+
+
+def _result_totals():
+    return {
+        'attempted': Count('id'),
+        'correct': Sum(Case(When(is_correct=True, then=1), default=0, output_field=IntegerField())),
+        'marks_possible': Sum('total_marks'),
+        'marks_obtained': Sum('marks_obtained'),
+    }
+
+
+def rebuild_user_stats(user_id):
+    """Recompute all of a user's stats tables from their full TestHistory."""
+    results = ResultQuestionLink.objects.filter(result_id__user_id=user_id)
+    with transaction.atomic():
+        totals = results.aggregate(**_result_totals())
+        rollup, _ = UserStatsRollup.objects.update_or_create(user_id=user_id, defaults={
+            'tests_taken': TestHistory.objects.filter(user_id=user_id).count(),
+            **{field: totals[field] or 0 for field in COUNTERS},
+        })
+
+        UserTopicStats.objects.filter(user_id=user_id).delete()
+        by_topic = results.filter(question_id__topic__isnull=False).values('question_id__topic_id').annotate(**_result_totals())
+        UserTopicStats.objects.bulk_create([
+            UserTopicStats(user_id=user_id, topic_id=row['question_id__topic_id'], **{field: row[field] or 0 for field in COUNTERS})
+            for row in by_topic
+        ])
+
+        UserDailySubjectStats.objects.filter(user_id=user_id).delete()
+        by_day = results.filter(question_id__topic__isnull=False).annotate(
+            day=TruncDate('result_id__created_at')
+        ).values('question_id__topic__chapter__sub_id', 'day').annotate(**_result_totals())
+        UserDailySubjectStats.objects.bulk_create([
+            UserDailySubjectStats(
+                user_id=user_id, subject_id=row['question_id__topic__chapter__sub_id'], day=row['day'],
+                **{field: row[field] or 0 for field in COUNTERS}
+            )
+            for row in by_day
+        ])
+    return rollup
+
+
+def _performance():
+    return {'attempted': 0, 'correct': 0, 'total_marks_possible': 0, 'marks_obtained': 0}
+
+
+def _node(level, node_id, name):
+    return {f'{level}_id': node_id, f'{level}_name': name, **_performance()}
+
+
+def _add(node, attempted, correct, marks_possible, marks_obtained):
+    node['attempted'] += attempted
+    node['correct'] += correct
+    node['total_marks_possible'] += marks_possible
+    node['marks_obtained'] += marks_obtained
+
+
+def _finish(nodes, children=None):
+    """Sort a level by id, add the percentages and turn child dicts into lists."""
+    finished = []
+    for _, node in sorted(nodes.items()):
+        node['accuracy_percentage'] = round(node['correct'] * 100.0 / node['attempted'], 2) if node['attempted'] > 0 else 0.0
+        node['score_percentage'] = round(node['marks_obtained'] * 100.0 / node['total_marks_possible'], 2) if node['total_marks_possible'] > 0 else 0.0
+        if children:
+            node[children[0]] = _finish(node[children[0]], children[1:])
+        finished.append(node)
+    return finished
+
+
+def performance_tree(user_id):
+    """
+    The user's performance as a subject > chapters > topics tree, from one
+    query on UserTopicStats; chapter and subject totals are summed in memory
+    using the cached taxonomy.
+    """
+    taxonomy = get_taxonomy()
+    subjects = {}
+    rows = UserTopicStats.objects.filter(user_id=user_id).values_list('topic_id', *COUNTERS)
+    for topic_id, attempted, correct, marks_possible, marks_obtained in rows:
+        if topic_id not in taxonomy.topics:
+            continue # Deleted after the tree was cached
+        topic_name, chapter_id = taxonomy.topics[topic_id]
+        chapter_name, subject_id = taxonomy.chapters[chapter_id]
+
+        subject = subjects.get(subject_id)
+        if subject is None:
+            subject = subjects[subject_id] = {**_node('subject', subject_id, taxonomy.subjects[subject_id]), 'chapters': {}}
+        chapter = subject['chapters'].get(chapter_id)
+        if chapter is None:
+            chapter = subject['chapters'][chapter_id] = {**_node('chapter', chapter_id, chapter_name), 'topics': {}}
+        topic = chapter['topics'][topic_id] = _node('topic', topic_id, topic_name)
+
+        for node in (subject, chapter, topic):
+            _add(node, attempted, correct, marks_possible, marks_obtained)
+
+    return _finish(subjects, ['chapters', 'topics'])
+
+
+def performance_levels(tree):
+    """Flatten a performance_tree into {'subject': [...], 'chapter': [...], 'topic': [...]}."""
+    levels = {'subject': [], 'chapter': [], 'topic': []}
+    for subject in tree:
+        levels['subject'].append({k: v for k, v in subject.items() if k != 'chapters'})
+        for chapter in subject['chapters']:
+            levels['chapter'].append({k: v for k, v in chapter.items() if k != 'topics'})
+            levels['topic'].extend(chapter['topics'])
+    return levels
+
+
+def performance_trend(user_id, granularity='day', days=30, subject_id=None):
+    """
+    Accuracy and score per day or ISO week (keyed by its Monday) over the last
+    `days` days, optionally for one subject. Reads only the daily buckets, and
+    every period in the window is listed, including empty ones.
+    """
+    today = timezone.localdate()
+    start = today - datetime.timedelta(days=days - 1)
+    buckets = UserDailySubjectStats.objects.filter(user_id=user_id, day__gte=start, day__lte=today)
+    if subject_id is not None:
+        buckets = buckets.filter(subject_id=subject_id)
+
+    def period_of(day):
+        return day - datetime.timedelta(days=day.weekday()) if granularity == 'week' else day
+
+    step = datetime.timedelta(days=7 if granularity == 'week' else 1)
+    periods = {}
+    period = period_of(start)
+    while period <= today:
+        periods[period] = {'period_start': period, **_performance()}
+        period += step
+
+    for day, *counts in buckets.values_list('day', *COUNTERS):
+        _add(periods[period_of(day)], *counts)
+
+    return _finish(periods)
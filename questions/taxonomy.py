@@ -0,0 +1,55 @@
+from django.core.cache import cache
+
+from .counters import bump_counter, read_counter
+
+# Bumped whenever a subject, chapter or topic changes (see signals).
+TAXONOMY_VERSION_KEY = 'taxonomy:version'
+TAXONOMY_TREE_KEY = 'taxonomy:tree:v{version}'
+TAXONOMY_TREE_TIMEOUT = 60 * 60 * 24
+
+
+class Taxonomy:
+    """Subject > chapter > topic names and parent ids; cheap to pickle into the cache."""
+    def __init__(self, version, subjects, chapters, topics):
+        self.version = version
+        self.subjects = subjects # {subject_id: subject_name}
+        self.chapters = chapters # {chapter_id: (chapter_name, subject_id)}
+        self.topics = topics     # {topic_id: (topic_name, chapter_id)}
+
+
+_local_tree = {}
+
+
+def current_version():
+    return read_counter(TAXONOMY_VERSION_KEY)
+
+
+def invalidate_taxonomy():
+    bump_counter(TAXONOMY_VERSION_KEY)
+    _local_tree.clear()
+
+
+def build_taxonomy(version):
+    from questions.models import Subjects, Chapters, Topics
+    return Taxonomy(
+        version,
+        subjects=dict(Subjects.objects.values_list('id', 'subject_name')),
+        chapters={cid: (name, sub_id) for cid, name, sub_id in Chapters.objects.values_list('id', 'chapter_name', 'sub_id')},
+        topics={tid: (name, chapter_id) for tid, name, chapter_id in Topics.objects.values_list('id', 'topic_name', 'chapter_id')},
+    )
+
+
+def get_taxonomy():
+    """The whole subject/chapter/topic tree, built at most once per version."""
+    version = current_version()
+    tree = _local_tree.get('tree')
+    if tree is not None and tree.version == version:
+        return tree
+
+    key = TAXONOMY_TREE_KEY.format(version=version)
+    tree = cache.get(key)
+    if tree is None:
+        tree = build_taxonomy(version)
+        cache.set(key, tree, TAXONOMY_TREE_TIMEOUT)
+    _local_tree['tree'] = tree
+    return tree
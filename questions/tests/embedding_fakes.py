@@ -0,0 +1,37 @@
+import hashlib
+
+import numpy as np
+
+
+class FakeEmbedder:
+    """
+    TextEmbedder stand-in for tests: hashed bag-of-words vectors and dot-product
+    rerank scores, so similar texts score higher without loading any model.
+    Records every text it encodes.
+    """
+    bi_model_name = 'fake-bi-encoder'
+    dim = 16
+
+    def __init__(self):
+        self.encoded = []
+
+    def dimension(self) -> int:
+        return self.dim
+
+    def _vector(self, text):
+        vec = np.zeros(self.dim, dtype='float32')
+        for word in text.lower().split():
+            vec[int(hashlib.md5(word.encode('utf-8')).hexdigest(), 16) % self.dim] += 1
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def encode_bi(self, texts, normalize: bool = True):
+        texts = list(texts)
+        self.encoded.extend(texts)
+        return np.array([self._vector(text) for text in texts], dtype='float32').reshape(len(texts), self.dim)
+
+    def rerank(self, query: str, candidates: list) -> list:
+        return [(qid, text, float(self._vector(query) @ self._vector(text))) for qid, text in candidates]
+
+    def rerank_many(self, batches: list) -> list:
+        return [self.rerank(query, candidates) for query, candidates in batches]
@@ -0,0 +1,35 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.test import SimpleTestCase
+from questions.faiss_engine.batcher import MicroBatcher
+
+
+class MicroBatcherTests(SimpleTestCase):
+
+    def test_concurrent_calls_share_a_batch(self):
+        batches = []
+        release = threading.Event()
+
+        def handler(items):
+            batches.append(list(items))
+            release.wait(1) # Hold the first batch so the rest queue up behind it
+            return [item * 10 for item in items]
+
+        batcher = MicroBatcher(handler, max_batch=4, max_wait=0.05)
+        with ThreadPoolExecutor(9) as pool:
+            futures = [pool.submit(batcher.submit, n) for n in range(9)]
+            release.set()
+            results = [future.result() for future in futures]
+
+        self.assertEqual(results, [n * 10 for n in range(9)])
+        self.assertEqual(sorted(item for batch in batches for item in batch), list(range(9)))
+        self.assertTrue(all(len(batch) <= 4 for batch in batches))
+        self.assertLess(len(batches), 9)
+
+    def test_handler_errors_reach_every_caller(self):
+        batcher = MicroBatcher(lambda items: 1 / 0, max_batch=4, max_wait=0.001)
+        with self.assertRaises(ZeroDivisionError):
+            batcher.submit(1)
+        with self.assertRaises(ZeroDivisionError):
+            batcher.submit(2) # The worker thread survives a failed batch
@@ -0,0 +1,84 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from questions.models import Subjects, Streams, Chapters, ExamBlueprint, BlueprintChapter
+from questions.blueprints import IOE_SYLLABUS, get_compiled_blueprint, seed_blueprint
+
+
+class CompiledBlueprintTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.stream = Streams.objects.create(stream_name="IOE")
+        cls.maths = Subjects.objects.create(subject_name="Maths")
+        cls.algebra = Chapters.objects.create(sub_id=cls.maths, chapter_name="Algebra")
+        cls.calculus = Chapters.objects.create(sub_id=cls.maths, chapter_name="Calculus")
+        cls.blueprint = ExamBlueprint.objects.create(stream=cls.stream)
+        BlueprintChapter.objects.create(blueprint=cls.blueprint, chapter=cls.algebra, marks=1, num_questions=2)
+        BlueprintChapter.objects.create(blueprint=cls.blueprint, chapter=cls.algebra, marks=2, num_questions=4)
+        BlueprintChapter.objects.create(blueprint=cls.blueprint, chapter=cls.calculus, marks=2, num_questions=3)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_plan_is_id_resolved_and_cached(self):
+        plan = get_compiled_blueprint('IOE')
+        self.assertEqual(plan.stream_id, self.stream.id)
+        self.assertEqual(
+            [(e.chapter_id, e.marks, e.num_questions) for e in plan.entries],
+            [(self.algebra.id, 1, 2), (self.algebra.id, 2, 4), (self.calculus.id, 2, 3)]
+        )
+        self.assertEqual(plan.total_questions, 9)
+        self.assertEqual(plan.total_marks, 2 + 8 + 6)
+
+        with self.assertNumQueries(0):
+            self.assertIs(get_compiled_blueprint('IOE'), plan)
+
+    def test_editing_the_blueprint_invalidates_the_plan(self):
+        get_compiled_blueprint('IOE')
+        entry = BlueprintChapter.objects.get(chapter=self.calculus)
+        entry.num_questions = 5
+        entry.save()
+        self.assertEqual(get_compiled_blueprint('IOE').total_questions, 11)
+
+    def test_as_syllabus_matches_agent_format(self):
+        syllabus = get_compiled_blueprint('IOE').as_syllabus()
+        self.assertEqual(syllabus, [{
+            "Subject": "Maths", "Total_marks": 16, "Number_of_questions": 9,
+            "Chapters": {"Algebra": {"mark1": 2, "mark2": 4}, "Calculus": {"mark1": 0, "mark2": 3}},
+        }])
+
+    def test_unknown_stream_raises(self):
+        with self.assertRaises(Streams.DoesNotExist):
+            get_compiled_blueprint('Medical')
+
+
+class SeedBlueprintTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_seeds_existing_chapters_and_skips_missing_ones(self):
+        self.assertIsNone(seed_blueprint('IOE', IOE_SYLLABUS))
+
+        stream = Streams.objects.create(stream_name="IOE")
+        maths = Subjects.objects.create(subject_name="Maths")
+        algebra = Chapters.objects.create(sub_id=maths, chapter_name="Algebra")
+        self.assertEqual(seed_blueprint('IOE', IOE_SYLLABUS), 2)
+        self.assertEqual(
+            set(BlueprintChapter.objects.filter(blueprint__stream=stream).values_list('chapter_id', 'marks', 'num_questions')),
+            {(algebra.id, 1, 2), (algebra.id, 2, 4)}
+        )
+        self.assertEqual(get_compiled_blueprint('IOE').total_questions, 6)
+
+    def test_command_seeds_default_streams(self):
+        with self.assertRaises(CommandError):
+            call_command('seed_blueprints', stdout=StringIO())
+
+        Streams.objects.create(stream_name="IOE")
+        chemistry = Subjects.objects.create(subject_name="Chemistry")
+        Chapters.objects.create(sub_id=chemistry, chapter_name="Organic Chemistry")
+        call_command('seed_blueprints', stdout=StringIO())
+        self.assertEqual(get_compiled_blueprint('IOE').total_questions, 3)
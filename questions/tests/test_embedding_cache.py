@@ -0,0 +1,47 @@
+import numpy as np
+from django.core.cache import cache
+from django.test import SimpleTestCase
+from questions.faiss_engine.embedder import TextEmbedder
+from questions.faiss_engine.embedding_cache import normalize_text
+
+
+class CountingEncoder:
+    """Stands in for the SentenceTransformer: deterministic vectors, records what it was asked."""
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, normalize_embeddings=True):
+        self.calls.append(list(texts))
+        return np.array([[len(text), text.count(' '), 1.0] for text in texts], dtype='float32')
+
+    def get_sentence_embedding_dimension(self):
+        return 3
+
+
+class EmbeddingCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.embedder = TextEmbedder()
+        self.embedder._bi_encoder = self.encoder = CountingEncoder()
+
+    def test_normalization(self):
+        self.assertEqual(normalize_text("  What is\u00a0x?\n "), "What is x?")
+
+    def test_repeated_texts_skip_the_encoder(self):
+        first = self.embedder.encode_bi(["What is x?", "Define y", "What  is x? "])
+        self.assertEqual(self.encoder.calls, [["What is x?", "Define y"]])
+        np.testing.assert_array_equal(first[0], first[2])
+
+        again = self.embedder.encode_bi(["Define y", "New one"])
+        self.assertEqual(self.encoder.calls[1:], [["New one"]])
+        np.testing.assert_array_equal(again[0], first[1])
+        self.assertEqual((again.shape, again.dtype), ((2, 3), np.float32))
+
+    def test_models_do_not_share_entries(self):
+        self.embedder.encode_bi(["What is x?"])
+        other = TextEmbedder(bi_model_name='another-model')
+        other._bi_encoder = self.encoder
+        other.encode_bi(["What is x?"])
+        self.assertEqual(len(self.encoder.calls), 2)
+        self.assertEqual(self.embedder.encode_bi([]).shape, (0, 3))
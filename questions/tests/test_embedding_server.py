@@ -0,0 +1,99 @@
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+
+import numpy as np
+from django.conf import settings
+from django.test import SimpleTestCase
+from questions.faiss_engine.embedding_server import (
+    EmbeddingServer, EmbeddingServerError, RemoteEmbedder, recv_message, send_message
+)
+from questions.tests.embedding_fakes import FakeEmbedder
+
+
+class BrokenEmbedder(FakeEmbedder):
+    def rerank(self, query, candidates):
+        raise ValueError("model not loaded")
+
+
+class EmbeddingServerTests(SimpleTestCase):
+
+    def start_server(self, embedder):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        socket_path = os.path.join(directory, 'embedding.sock')
+        server = EmbeddingServer(socket_path, embedder=embedder)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return RemoteEmbedder(socket_path, timeout=5)
+
+    def test_framing_carries_header_and_binary_payload(self):
+        left, right = socket.socketpair()
+        self.addCleanup(left.close)
+        self.addCleanup(right.close)
+        payload = np.arange(300000, dtype='float32').tobytes() # Several recv() chunks
+        sender = threading.Thread(target=send_message, args=(left, {'op': 'encode', 'texts': ["ä"]}, payload))
+        sender.start()
+        header, received = recv_message(right)
+        sender.join()
+        self.assertEqual(header, {'op': 'encode', 'texts': ["ä"]})
+        self.assertEqual(received, payload)
+
+        left.sendall(b'\x00\x00\x00\x10') # Closed halfway through the length prefix
+        left.close()
+        with self.assertRaises(EmbeddingServerError):
+            recv_message(right)
+
+    def test_remote_embedder_matches_the_local_one(self):
+        local = FakeEmbedder()
+        remote = self.start_server(FakeEmbedder())
+        self.assertEqual(remote.dimension(), local.dim)
+        self.assertEqual(remote.bi_model_name, local.bi_model_name)
+
+        texts = ["convex lens", "concave mirror"]
+        np.testing.assert_array_equal(remote.encode_bi(texts), local.encode_bi(texts))
+        self.assertEqual(remote.encode_bi([]).shape, (0, local.dim))
+
+        candidates = [(7, "convex lens"), (9, "ohm's law")]
+        self.assertEqual(remote.rerank("lens", candidates), local.rerank("lens", candidates))
+        batches = [("lens", candidates), ("mirror", [(3, "concave mirror")]), ("empty", [])]
+        self.assertEqual(remote.rerank_many(batches), local.rerank_many(batches))
+
+    def test_server_errors_are_raised_by_the_client(self):
+        remote = self.start_server(BrokenEmbedder())
+        with self.assertRaisesMessage(EmbeddingServerError, "Unknown op 'nope'"):
+            remote._call({'op': 'nope'})
+        with self.assertRaisesMessage(EmbeddingServerError, "ValueError: model not loaded"):
+            remote.rerank("lens", [(1, "convex lens")])
+        self.assertEqual(remote.dimension(), FakeEmbedder.dim) # The server is still answering
+
+
+# Run in a fresh interpreter: other tests may already have imported the models.
+# The study-plan agents are stubbed out, as they bring their own dependencies.
+IMPORT_CHECK = """
+import sys, types
+import django
+django.setup()
+agents = types.ModuleType('study_plan.main')
+agents.GenerateQuestionFlow = agents.MakeStudyPlanFlow = agents.ExplainAnswerFlow = agents.EvaluateUserFlow = object
+agents.SYLLABUS = []
+sys.modules['study_plan'] = types.ModuleType('study_plan')
+sys.modules['study_plan.main'] = agents
+import questions.views
+print(','.join(name for name in ('faiss', 'sentence_transformers') if name in sys.modules))
+"""
+
+
+class LazyImportTests(SimpleTestCase):
+
+    def test_importing_views_loads_neither_faiss_nor_the_models(self):
+        result = subprocess.run(
+            [sys.executable, '-c', IMPORT_CHECK], cwd=settings.BASE_DIR, capture_output=True, text=True
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout.strip(), '')
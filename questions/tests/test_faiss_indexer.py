@@ -0,0 +1,99 @@
+import importlib.util
+import json
+import os
+import shutil
+import tempfile
+from unittest import skipUnless
+
+import numpy as np
+from django.test import SimpleTestCase
+
+HAS_FAISS = importlib.util.find_spec('faiss') is not None
+
+
+def unit_vectors(n, dim=8, seed=0):
+    vecs = np.random.default_rng(seed).standard_normal((n, dim)).astype('float32')
+    return vecs / np.linalg.norm(vecs, axis=1, keepdims=True)
+
+
+@skipUnless(HAS_FAISS, "faiss is not installed")
+class FAISSIndexerTests(SimpleTestCase):
+
+    def setUp(self):
+        from questions.faiss_engine.faiss_indexer import FAISSIndexer
+        self.indexer = FAISSIndexer(dim=8)
+        self.vecs = unit_vectors(4)
+        self.indexer.add(self.vecs, [10, 20, 30, 40])
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def test_search_returns_db_ids(self):
+        self.assertEqual(sorted(self.indexer.ids().tolist()), [10, 20, 30, 40])
+        self.assertEqual(self.indexer.search(self.vecs[2:3], top_k=1)[0][0], 30)
+        self.assertEqual(len(self.indexer.search(self.vecs[:1], top_k=10)), 4) # -1 padding dropped
+
+    def test_upsert_replaces_the_vector_under_an_id(self):
+        self.indexer.upsert(self.vecs[0:1], [20])
+        self.assertEqual(sorted(self.indexer.ids().tolist()), [10, 20, 30, 40])
+        hits = dict(self.indexer.search(self.vecs[0:1], top_k=4))
+        self.assertAlmostEqual(hits[20], hits[10], places=5)
+
+    def test_remove_drops_only_present_ids(self):
+        self.assertEqual(self.indexer.remove([20, 99]), 1)
+        self.assertEqual(self.indexer.remove([]), 0)
+        self.assertEqual(sorted(self.indexer.ids().tolist()), [10, 30, 40])
+        self.assertNotIn(20, [db_id for db_id, _ in self.indexer.search(self.vecs[1:2], top_k=4)])
+
+    def test_load_ignores_an_index_saved_in_the_old_positional_layout(self):
+        import faiss
+        from questions.faiss_engine.faiss_indexer import INDEX_FILE, META_FILE
+        fingerprint = {'model': 'fake', 'dim': 8, 'normalized': True, 'format': 2}
+        flat = faiss.IndexFlatIP(8)
+        flat.add(self.vecs)
+        faiss.write_index(flat, os.path.join(self.directory, INDEX_FILE))
+        with open(os.path.join(self.directory, META_FILE), 'w') as f:
+            json.dump({'fingerprint': fingerprint, 'ntotal': 4, 'state': {}}, f)
+
+        self.assertIsNone(self.indexer.load(self.directory, fingerprint))
+        self.assertEqual(sorted(self.indexer.ids().tolist()), [10, 20, 30, 40]) # Left untouched
+
+    def test_save_then_load_round_trips_ids_and_search(self):
+        from questions.faiss_engine.faiss_indexer import FAISSIndexer
+        fingerprint = {'model': 'fake', 'dim': 8}
+        self.indexer.save(self.directory, fingerprint, {'synced_seq': 7})
+
+        loaded = FAISSIndexer(dim=8)
+        self.assertEqual(loaded.load(self.directory, fingerprint), {'synced_seq': 7})
+        self.assertEqual(sorted(loaded.ids().tolist()), [10, 20, 30, 40])
+        for vec in self.vecs:
+            self.assertEqual(loaded.search(vec[None], top_k=2), self.indexer.search(vec[None], top_k=2))
+
+    def test_load_rejects_a_different_fingerprint_or_count(self):
+        from questions.faiss_engine.faiss_indexer import FAISSIndexer, META_FILE
+        self.indexer.save(self.directory, {'model': 'fake', 'dim': 8})
+        self.assertIsNone(FAISSIndexer(dim=8).load(self.directory, {'model': 'other', 'dim': 8}))
+
+        meta_path = os.path.join(self.directory, META_FILE)
+        with open(meta_path) as f:
+            meta = json.load(f)
+        meta['ntotal'] = 3 # As if the manifest belonged to an earlier save
+        with open(meta_path, 'w') as f:
+            json.dump(meta, f)
+        self.assertIsNone(FAISSIndexer(dim=8).load(self.directory, {'model': 'fake', 'dim': 8}))
+
+    def test_mapped_index_is_copied_before_the_first_write(self):
+        from questions.faiss_engine.faiss_indexer import FAISSIndexer
+        self.indexer.save(self.directory, {'model': 'fake'})
+        loaded = FAISSIndexer(dim=8)
+        loaded.load(self.directory, {'model': 'fake'})
+        self.assertTrue(loaded._mapped)
+        mapped = loaded.index
+
+        loaded.remove([10])
+        self.assertFalse(loaded._mapped)
+        self.assertIsNot(loaded.index, mapped)
+        self.assertEqual(sorted(loaded.ids().tolist()), [20, 30, 40])
+
+        reloaded = FAISSIndexer(dim=8)
+        reloaded.load(self.directory, {'model': 'fake'})
+        self.assertEqual(sorted(reloaded.ids().tolist()), [10, 20, 30, 40]) # The file itself is untouched
@@ -0,0 +1,69 @@
+from django.core.cache import cache
+from django.test import TestCase
+from accounts.models import User
+from questions.grading import load_answer_key
+from questions.models import Subjects, Streams, Chapters, Topics, Questions, HeroQuestions
+from questions.papers import persist_test_paper
+
+
+class AnswerKeyTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='grade@example.com', username='grade', password='password123')
+        cls.stream = Streams.objects.create(stream_name="IOE")
+        topic = Topics.objects.create(
+            chapter=Chapters.objects.create(sub_id=Subjects.objects.create(subject_name="Maths"), chapter_name="Algebra"),
+            topic_name="Matrices"
+        )
+        cls.text_question = Questions.objects.create(topic=topic, question="2+2?", options=["3", "4"], answer="4")
+        cls.json_question = Questions.objects.create(
+            topic=topic, question="Pair?", options=["a", "b"], answer={"x": 1, "y": [1, 2]}
+        )
+        HeroQuestions.objects.create(topic=topic, question=cls.text_question, stream=cls.stream, marks=1)
+        HeroQuestions.objects.create(topic=topic, question=cls.json_question, stream=cls.stream, marks=2)
+
+    def setUp(self):
+        cache.clear()
+        heroes = list(HeroQuestions.objects.select_related('question', 'topic__chapter'))
+        self.paper, _ = persist_test_paper(self.stream.id, self.user, 'CUSTOM', heroes)
+
+    def test_key_is_compiled_at_creation(self):
+        with self.assertNumQueries(0):
+            answer_key = load_answer_key(self.paper.id)
+        self.assertEqual(answer_key.total_marks, 3)
+        self.assertEqual(set(answer_key.questions), {self.text_question.id, self.json_question.id})
+
+    def test_grade_ignores_key_order(self):
+        answer_key = load_answer_key(self.paper.id)
+        obtained, results = answer_key.grade([
+            {'question_id': self.text_question.id, 'user_answer': "3"},
+            {'question_id': self.json_question.id, 'user_answer': {"y": [1, 2], "x": 1}},
+        ])
+        self.assertEqual(obtained, 2)
+        self.assertEqual([is_correct for _, _, is_correct, _ in results], [False, True])
+
+    def test_mismatch(self):
+        answer_key = load_answer_key(self.paper.id)
+        answer = lambda question_id: {'question_id': question_id, 'user_answer': "a"}
+        self.assertEqual(answer_key.mismatch([answer(self.text_question.id), answer(self.json_question.id)]), {})
+        self.assertEqual(answer_key.mismatch([answer(self.text_question.id), answer(999)]), {
+            "missing_answers_for_question_ids": [self.json_question.id],
+            "extra_answers_for_question_ids": [999],
+        })
+
+    def test_duplicate_answers_are_rejected(self):
+        answer_key = load_answer_key(self.paper.id)
+        answers = [{'question_id': qid, 'user_answer': "a"}
+                   for qid in (self.text_question.id, self.json_question.id, self.json_question.id)]
+        self.assertEqual(answer_key.mismatch(answers), {
+            "duplicate_answers_for_question_ids": [self.json_question.id],
+        })
+
+    def test_cold_path_and_answer_edits(self):
+        self.json_question.answer = "b"
+        self.json_question.save()
+        answer_key = load_answer_key(self.paper.id)
+        obtained, _ = answer_key.grade([{'question_id': self.json_question.id, 'user_answer': "b"}])
+        self.assertEqual(obtained, 2)
+        self.assertIsNone(load_answer_key(self.paper.id + 1000))
@@ -0,0 +1,35 @@
+from django.core.cache import cache
+from django.test import SimpleTestCase
+from rest_framework.response import Response
+from questions.idempotency import abandon_submission, begin_submission, finish_submission, submission_key
+
+
+class SubmissionIdempotencyTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_derived_key_ignores_answer_order(self):
+        answers = [{'question_id': 2, 'user_answer': {"b": 1, "a": 2}}, {'question_id': 1, 'user_answer': "x"}]
+        self.assertEqual(submission_key(7, 10, answers), submission_key(7, 10, answers[::-1]))
+        self.assertNotEqual(submission_key(7, 10, answers), submission_key(7, 11, answers))
+        self.assertNotEqual(submission_key(7, 10, answers), submission_key(8, 10, answers))
+        self.assertNotEqual(submission_key(7, 10, answers), submission_key(7, 10, answers, client_key='abc'))
+
+    def test_retry_replays_first_response(self):
+        key = submission_key(7, 10, [], client_key='abc')
+        self.assertIsNone(begin_submission(key))
+        self.assertEqual(begin_submission(key).status_code, 409)
+
+        finish_submission(key, Response({'obtained_marks': 4}, status=201))
+        replay = begin_submission(key)
+        self.assertEqual((replay.status_code, replay.data), (201, {'obtained_marks': 4}))
+        self.assertEqual(replay['Idempotent-Replayed'], 'true')
+
+    def test_failures_release_the_key(self):
+        key = submission_key(7, 10, [], client_key='abc')
+        begin_submission(key)
+        finish_submission(key, Response({'detail': 'Mismatch'}, status=400))
+        self.assertIsNone(begin_submission(key))
+        abandon_submission(key)
+        self.assertIsNone(begin_submission(key))
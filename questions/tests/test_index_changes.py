@@ -0,0 +1,40 @@
+from django.core.cache import cache
+from django.test import TestCase
+from questions.faiss_engine.changes import CHANGE_KEY, changes_since, current_seq
+from questions.models import Subjects, Chapters, Topics, Questions
+
+
+class QuestionIndexChangeLogTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.topic = Topics.objects.create(
+            chapter=Chapters.objects.create(sub_id=Subjects.objects.create(subject_name="Maths"), chapter_name="Algebra"),
+            topic_name="Matrices"
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_saves_and_deletes_are_logged_after_commit(self):
+        seq = current_seq()
+        with self.captureOnCommitCallbacks(execute=True):
+            question = Questions.objects.create(topic=self.topic, question="Q1", options=["a", "b"], answer="a")
+        self.assertEqual(changes_since(seq), (seq + 1, {question.id}))
+
+        question_id = question.id
+        with self.captureOnCommitCallbacks(execute=True):
+            question.question = "Q1 edited"
+            question.save()
+            question.delete()
+        self.assertEqual(changes_since(seq + 1), (seq + 3, {question_id}))
+        self.assertEqual(changes_since(seq + 3), (seq + 3, set()))
+
+    def test_gaps_the_log_cannot_cover_ask_for_a_reconcile(self):
+        seq = current_seq()
+        with self.captureOnCommitCallbacks(execute=True):
+            Questions.objects.create(topic=self.topic, question="Q1", options=["a", "b"], answer="a")
+            Questions.objects.create(topic=self.topic, question="Q2", options=["a", "b"], answer="a")
+        cache.delete(CHANGE_KEY.format(seq=seq + 1)) # Expired
+        self.assertEqual(changes_since(seq), (seq + 2, None))
+        self.assertEqual(changes_since(seq + 5), (seq + 2, None)) # Cache flushed and reseeded
@@ -0,0 +1,97 @@
+from django.core.cache import cache
+from django.test import TestCase
+from accounts.models import User
+from questions.grading import load_answer_key
+from questions.ingest import enqueue_submission, flush_submissions, save_submission
+from questions.signals import submissions_saved
+from questions.models import (
+    Subjects, Streams, Chapters, Topics, Questions, HeroQuestions,
+    ResultQuestionLink, SubmissionOutbox, TestHistory
+)
+from questions.papers import persist_test_paper
+from questions.taxonomy import get_taxonomy
+
+
+class SubmissionIngestTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='ingest@example.com', username='ingest', password='password123')
+        cls.stream = Streams.objects.create(stream_name="IOE")
+        topic = Topics.objects.create(
+            chapter=Chapters.objects.create(sub_id=Subjects.objects.create(subject_name="Maths"), chapter_name="Algebra"),
+            topic_name="Matrices"
+        )
+        for n in range(3):
+            question = Questions.objects.create(topic=topic, question=f"Q{n}", options=["a", "b"], answer="a")
+            HeroQuestions.objects.create(topic=topic, question=question, stream=cls.stream, marks=2)
+
+    def setUp(self):
+        cache.clear()
+        heroes = list(HeroQuestions.objects.select_related('question', 'topic__chapter'))
+        self.papers = [persist_test_paper(self.stream.id, self.user, 'CUSTOM', heroes)[0] for _ in range(2)]
+
+    def grade(self, paper):
+        answer_key = load_answer_key(paper.id)
+        answers = [{'question_id': qid, 'user_answer': "a"} for qid in answer_key.questions]
+        answers[0]['user_answer'] = "b"
+        return answer_key, *answer_key.grade(answers)
+
+    def test_sync_save_writes_history_and_links(self):
+        answer_key, obtained, results = self.grade(self.papers[0])
+        history = save_submission(self.user, answer_key, obtained, results, 60)
+        self.assertEqual((history.total_marks, history.obtained_marks), (6, 4))
+        self.assertEqual(history.question_links.count(), 3)
+
+    def test_failed_score_receiver_is_logged(self):
+        def fail(**kwargs):
+            raise ConnectionError("redis is down")
+        submissions_saved.connect(fail, weak=False, dispatch_uid='test_failed_score_receiver')
+        self.addCleanup(submissions_saved.disconnect, dispatch_uid='test_failed_score_receiver')
+
+        answer_key, obtained, results = self.grade(self.papers[0])
+        with self.assertLogs('questions.ingest', 'ERROR') as logs, self.captureOnCommitCallbacks(execute=True):
+            history = save_submission(self.user, answer_key, obtained, results, 60)
+        self.assertTrue(any('redis is down' in line for line in logs.output))
+        self.assertTrue(TestHistory.objects.filter(id=history.id).exists())
+
+    def test_retried_enqueue_is_idempotent(self):
+        answer_key, obtained, results = self.grade(self.papers[0])
+        row, created = enqueue_submission(self.user, answer_key, obtained, results, 60)
+        retry, retry_created = enqueue_submission(self.user, answer_key, obtained, results, 60)
+        self.assertTrue(created)
+        self.assertFalse(retry_created)
+        self.assertEqual(retry.id, row.id)
+        self.assertEqual(SubmissionOutbox.objects.count(), 1)
+        self.assertFalse(TestHistory.objects.exists())
+
+    def test_flush_writes_batches_once(self):
+        rows = [enqueue_submission(self.user, *self.grade(paper), 60)[0] for paper in self.papers]
+
+        # select, history insert, created_at update, existing questions, link insert, outbox update
+        # (+ savepoint/release), then question topics and per stats table: lock, insert (+ savepoint/release)
+        get_taxonomy()
+        with self.assertNumQueries(21):
+            self.assertEqual(flush_submissions(batch_size=10), 2)
+        self.assertEqual(flush_submissions(batch_size=10), 0)
+
+        self.assertEqual(TestHistory.objects.count(), 2)
+        self.assertEqual(ResultQuestionLink.objects.filter(is_correct=True).count(), 4)
+        history = SubmissionOutbox.objects.get(id=rows[0].id).history
+        self.assertEqual(history.obtained_marks, 4)
+        self.assertEqual(history.created_at, rows[0].created_at)
+
+    def test_flush_skips_links_to_questions_deleted_while_queued(self):
+        answer_key, obtained, results = self.grade(self.papers[0])
+        row, _ = enqueue_submission(self.user, answer_key, obtained, results, 60)
+        deleted_id = results[0][0]
+        Questions.objects.filter(id=deleted_id).delete()
+
+        self.assertEqual(flush_submissions(batch_size=10), 1)
+        history = SubmissionOutbox.objects.get(id=row.id).history
+        self.assertEqual(history.obtained_marks, obtained)
+        self.assertEqual(
+            sorted(history.question_links.values_list('question_id', flat=True)),
+            sorted(result[0] for result in results[1:])
+        )
+        self.assertFalse(SubmissionOutbox.objects.filter(flushed_at__isnull=True).exists())
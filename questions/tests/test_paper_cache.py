@@ -0,0 +1,60 @@
+import gzip
+import json
+
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
+from accounts.models import User
+from questions.models import Subjects, Streams, Chapters, Topics, Questions, HeroQuestions
+from questions.paper_cache import cache_paper_payload, load_paper_payload, paper_payload_response
+from questions.papers import persist_test_paper
+
+
+class PaperPayloadCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='cache@example.com', username='cache', password='password123')
+        cls.stream = Streams.objects.create(stream_name="IOE")
+        topic = Topics.objects.create(
+            chapter=Chapters.objects.create(sub_id=Subjects.objects.create(subject_name="Maths"), chapter_name="Algebra"),
+            topic_name="Matrices"
+        )
+        cls.question = Questions.objects.create(topic=topic, question="2+2?", options=["3", "4"], answer="4")
+        HeroQuestions.objects.create(topic=topic, question=cls.question, stream=cls.stream, marks=1)
+
+    def setUp(self):
+        cache.clear()
+        self.heroes = list(HeroQuestions.objects.select_related('question', 'topic__chapter'))
+        self.paper, _ = persist_test_paper(self.stream.id, self.user, 'CUSTOM', self.heroes)
+
+    def test_payload_has_no_answers_and_is_served_from_cache(self):
+        cache_paper_payload(self.paper, self.heroes)
+        with self.assertNumQueries(0):
+            owner_id, blob = load_paper_payload(self.paper.id)
+
+        self.assertEqual(owner_id, self.user.id)
+        body = json.loads(gzip.decompress(blob))
+        self.assertEqual(body['test_details']['id'], self.paper.id)
+        self.assertEqual(body['questions'][0]['question']['question'], "2+2?")
+        self.assertNotIn('answer', body['questions'][0]['question'])
+
+    def test_cold_path_rebuilds_from_db(self):
+        owner_id, blob = load_paper_payload(self.paper.id)
+        self.assertEqual(len(json.loads(gzip.decompress(blob))['questions']), 1)
+        self.assertIsNone(load_paper_payload(self.paper.id + 1000))
+
+    def test_editing_a_question_invalidates_payloads(self):
+        cache_paper_payload(self.paper, self.heroes)
+        self.question.question = "2+3?"
+        self.question.save()
+        _, blob = load_paper_payload(self.paper.id)
+        self.assertEqual(json.loads(gzip.decompress(blob))['questions'][0]['question']['question'], "2+3?")
+
+    def test_response_encoding(self):
+        blob = cache_paper_payload(self.paper, self.heroes)
+        factory = RequestFactory()
+        gzipped = paper_payload_response(factory.get('/', HTTP_ACCEPT_ENCODING='gzip, br'), blob)
+        self.assertEqual(gzipped['Content-Encoding'], 'gzip')
+        self.assertEqual(gzipped.content, blob)
+        plain = paper_payload_response(factory.get('/'), blob)
+        self.assertEqual(json.loads(plain.content)['test_details']['id'], self.paper.id)
@@ -0,0 +1,36 @@
+from django.test import TestCase
+from accounts.models import User
+from questions.models import (
+    Subjects, Streams, Chapters, Topics, Questions, HeroQuestions, TestQuestionLink
+)
+from questions.papers import persist_test_paper
+
+
+class PersistTestPaperTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='paper@example.com', username='paper', password='password123')
+        cls.stream = Streams.objects.create(stream_name="IOE")
+        cls.physics = Subjects.objects.create(subject_name="Physics")
+        cls.maths = Subjects.objects.create(subject_name="Maths")
+        Subjects.objects.create(subject_name="English") # Not used by any question
+        cls.topics = [
+            Topics.objects.create(chapter=Chapters.objects.create(sub_id=subject, chapter_name="Ch"), topic_name="T")
+            for subject in (cls.physics, cls.maths)
+        ]
+        for i, topic in enumerate(cls.topics * 3):
+            question = Questions.objects.create(topic=topic, question=f"Q{i}", options=["a"], answer="a")
+            HeroQuestions.objects.create(topic=topic, question=question, stream=cls.stream, marks=1 + i % 2)
+
+    def test_paper_and_links_saved_in_one_batch(self):
+        heroes = list(HeroQuestions.objects.select_related('question', 'topic__chapter'))
+        with self.assertNumQueries(4): # savepoint, paper insert, bulk link insert, release
+            paper, timer = persist_test_paper(self.stream.id, self.user, 'MOCK', heroes)
+
+        self.assertEqual(paper.total_questions, 6)
+        self.assertEqual(paper.total_marks, sum(q.marks for q in heroes))
+        self.assertEqual(sorted(paper.subjects_included), sorted([self.physics.id, self.maths.id]))
+        self.assertEqual(TestQuestionLink.objects.filter(test_id=paper).count(), 6)
+        self.assertGreaterEqual(timer.ms, 0)
+        self.assertTrue(timer.server_timing().startswith('paper_persist;dur='))
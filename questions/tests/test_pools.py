@@ -0,0 +1,114 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TestCase
+from questions.models import Subjects, Streams, Chapters, Topics, Questions, HeroQuestions
+from questions.pools import QuestionPoolIndex, question_pools
+from questions.seen import SeenBitmap
+
+
+class QuestionPoolIndexTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.stream = Streams.objects.create(stream_name="IOE")
+        cls.subject = Subjects.objects.create(subject_name="Physics")
+        cls.chapter1 = Chapters.objects.create(sub_id=cls.subject, chapter_name="Mechanics")
+        cls.chapter2 = Chapters.objects.create(sub_id=cls.subject, chapter_name="Optics")
+        cls.topic1 = Topics.objects.create(chapter=cls.chapter1, topic_name="Kinematics")
+        cls.topic2 = Topics.objects.create(chapter=cls.chapter2, topic_name="Lenses")
+
+    def setUp(self):
+        cache.clear()
+        question_pools.invalidate()
+
+    def make_hero(self, topic, marks):
+        question = Questions.objects.create(topic=topic, question="Q", options=["a", "b"], answer="a")
+        return HeroQuestions.objects.create(topic=topic, question=question, stream=self.stream, marks=marks)
+
+    def test_sample_draws_distinct_ids_from_matching_pool(self):
+        one_mark = {self.make_hero(self.topic1, 1).id for _ in range(5)}
+        self.make_hero(self.topic1, 2)
+        self.make_hero(self.topic2, 1)
+
+        sample = question_pools.sample(self.stream.id, self.chapter1.id, 1, 3)
+        self.assertEqual(len(sample), 3)
+        self.assertEqual(len(set(sample)), 3)
+        self.assertTrue(set(sample) <= one_mark)
+
+    def test_sample_returns_whole_pool_when_too_small(self):
+        hero = self.make_hero(self.topic2, 2)
+        self.assertEqual(question_pools.sample(self.stream.id, self.chapter2.id, 2, 10), [hero.id])
+        self.assertEqual(question_pools.sample(self.stream.id, self.chapter1.id, 2, 10), [])
+
+    def test_signals_move_and_remove_ids(self):
+        hero = self.make_hero(self.topic1, 1)
+        self.assertEqual(question_pools.available(self.stream.id, self.chapter1.id, 1), 1)
+
+        hero.topic = self.topic2
+        hero.marks = 2
+        with self.captureOnCommitCallbacks(execute=True):
+            hero.save()
+        self.assertEqual(question_pools.available(self.stream.id, self.chapter1.id, 1), 0)
+        self.assertEqual(question_pools.available(self.stream.id, self.chapter2.id, 2), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            hero.delete()
+        self.assertEqual(question_pools.available(self.stream.id, self.chapter2.id, 2), 0)
+
+    def test_sample_avoids_excluded_ids_until_pool_runs_out(self):
+        ids = [self.make_hero(self.topic1, 1).id for _ in range(6)]
+        seen = SeenBitmap()
+        for hero_id in ids[:4]:
+            seen.add(hero_id)
+
+        self.assertEqual(set(question_pools.sample(self.stream.id, self.chapter1.id, 1, 2, exclude=seen)), set(ids[4:]))
+        topped_up = question_pools.sample(self.stream.id, self.chapter1.id, 1, 3, exclude=seen)
+        self.assertEqual(len(set(topped_up)), 3)
+        self.assertTrue(set(ids[4:]) <= set(topped_up))
+
+    def test_other_workers_load_the_shared_snapshot(self):
+        hero = self.make_hero(self.topic1, 1)
+        question_pools.available(self.stream.id, self.chapter1.id, 1)
+
+        other_worker = QuestionPoolIndex()
+        with self.assertNumQueries(0):
+            self.assertEqual(other_worker.sample(self.stream.id, self.chapter1.id, 1, 1), [hero.id])
+
+    def test_other_workers_replay_only_changed_pools(self):
+        first = self.make_hero(self.topic1, 1)
+        other_worker = QuestionPoolIndex()
+        other_worker.available(self.stream.id, self.chapter1.id, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second = self.make_hero(self.topic1, 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                sorted(other_worker.sample(self.stream.id, self.chapter1.id, 1, 5)), [first.id, second.id]
+            )
+
+    def test_rolled_back_save_leaves_no_id_in_pool(self):
+        self.make_hero(self.topic1, 1)
+        self.assertEqual(question_pools.available(self.stream.id, self.chapter1.id, 1), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    self.make_hero(self.topic1, 1)
+                    raise RuntimeError("rollback")
+            except RuntimeError:
+                pass
+        self.assertEqual(question_pools.available(self.stream.id, self.chapter1.id, 1), 1)
+
+    def test_sample_with_exclude_keeps_draw_order(self):
+        ids = [self.make_hero(self.topic1, 1).id for _ in range(5)]
+        seen = SeenBitmap()
+        seen.add(ids[0])
+
+        question_pools.available(self.stream.id, self.chapter1.id, 1)
+        pool = list(question_pools._pools[(self.stream.id, self.chapter1.id, 1)])
+        draws = [pool.index(ids[4]), pool.index(ids[0]), pool.index(ids[2]), pool.index(ids[1])]
+        with mock.patch('questions.pools.random.randrange', side_effect=draws):
+            self.assertEqual(question_pools.sample(self.stream.id, self.chapter1.id, 1, 3, exclude=seen),
+                             [ids[4], ids[2], ids[1]])
@@ -0,0 +1,114 @@
+import datetime
+import importlib.util
+import os
+import shutil
+import tempfile
+from unittest import mock, skipUnless
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from questions.models import Subjects, Chapters, Topics, Questions
+from questions.tests.embedding_fakes import FakeEmbedder
+
+HAS_FAISS = importlib.util.find_spec('faiss') is not None
+
+
+@skipUnless(HAS_FAISS, "faiss is not installed")
+class QuestionVectorizerTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.topic = Topics.objects.create(
+            chapter=Chapters.objects.create(sub_id=Subjects.objects.create(subject_name="Physics"), chapter_name="Optics"),
+            topic_name="Lenses"
+        )
+        cls.questions = [
+            Questions.objects.create(topic=cls.topic, question=text, options=["a", "b"], answer="a")
+            for text in ("convex lens focal length", "concave mirror image", "refractive index of glass")
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.index_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.index_dir, ignore_errors=True)
+        settings = override_settings(QUESTION_INDEX_DIR=self.index_dir, QUESTION_SIMILARITY_BATCH_WAIT_MS=0)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def make_vectorizer(self, embedder=None):
+        from questions.faiss_engine.question_vectorizer import QuestionVectorizer
+        with mock.patch('questions.faiss_engine.question_vectorizer.get_embedder', return_value=embedder or FakeEmbedder()):
+            return QuestionVectorizer()
+
+    def test_reconcile_picks_up_edits_after_the_change_log_expired(self):
+        from questions.faiss_engine.changes import CHANGE_KEY, current_seq
+        Questions.objects.update(updated_at=timezone.now() - datetime.timedelta(hours=1)) # Written long ago
+        self.make_vectorizer().build()
+
+        edited, unchanged = self.questions[0], self.questions[1]
+        with self.captureOnCommitCallbacks(execute=True):
+            edited.question = "total internal reflection"
+            edited.save()
+        cache.delete(CHANGE_KEY.format(seq=current_seq())) # The log entry expired
+
+        embedder = FakeEmbedder()
+        warm = self.make_vectorizer(embedder)
+        warm.build()
+        self.assertIn("total internal reflection", embedder.encoded)
+        self.assertNotIn(unchanged.question, embedder.encoded)
+        self.assertEqual(warm.texts.get(edited.id), "total internal reflection")
+        self.assertEqual(warm.query("total internal reflection", rerank_k=1)[0][0], edited.id)
+
+    def test_warm_start_reloads_texts_that_dont_match_the_index(self):
+        from questions.faiss_engine.text_store import TEXTS_FILE, TextStore
+        self.make_vectorizer().build()
+        stale = TextStore()
+        stale.update({self.questions[0].id: self.questions[0].question}) # Saved by an older run
+        stale.save(self.index_dir)
+
+        embedder = FakeEmbedder()
+        warm = self.make_vectorizer(embedder)
+        with self.assertNumQueries(1):
+            warm.build()
+        self.assertEqual(embedder.encoded, []) # Vectors came from disk
+        self.assertEqual(warm.texts.ids(), {q.id for q in self.questions})
+        self.assertEqual(warm.texts.get(self.questions[2].id), self.questions[2].question)
+
+        os.remove(os.path.join(self.index_dir, TEXTS_FILE))
+        with self.assertNumQueries(1):
+            self.make_vectorizer().build()
+
+
+@skipUnless(HAS_FAISS, "faiss is not installed")
+class QuestionSimilarityViewTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        topic = Topics.objects.create(
+            chapter=Chapters.objects.create(sub_id=Subjects.objects.create(subject_name="Physics"), chapter_name="Optics"),
+            topic_name="Lenses"
+        )
+        cls.questions = [
+            Questions.objects.create(topic=topic, question=f"Q{n}", options=["a", "b"], answer="a") for n in range(3)
+        ]
+
+    def test_hydrates_results_in_one_query_keeping_rerank_order(self):
+        first, second, third = self.questions
+        deleted_id = third.id
+        third.delete()
+        ranked = [(second.id, "Q1", 0.9), (deleted_id, "Q2", 0.7), (first.id, "Q0", 0.4)]
+        vectorizer = mock.Mock(**{'query.return_value': ranked})
+
+        with mock.patch('questions.faiss_engine.question_vectorizer.get_vectorizer', return_value=vectorizer):
+            with self.assertNumQueries(1):
+                response = self.client.post(reverse('question-similarity'), {'question': "lens"}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(item['question']['id'], item['score']) for item in response.data['similar']],
+            [(second.id, 0.9), (first.id, 0.4)]
+        )
+        self.assertNotIn('answer', response.data['similar'][0]['question'])
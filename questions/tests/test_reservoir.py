@@ -0,0 +1,62 @@
+from django.core.cache import cache
+from django.test import TestCase
+from accounts.models import User
+from questions.models import (
+    Subjects, Streams, Chapters, Topics, Questions, HeroQuestions,
+    ExamBlueprint, BlueprintChapter, GeneratedTestPaper, TestQuestionLink
+)
+from questions.blueprints import get_compiled_blueprint
+from questions.pools import question_pools
+from questions.reservoir import claim_mock_paper, refill_reservoir
+
+
+class MockReservoirTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='mock@example.com', username='mock', password='password123')
+        cls.stream = Streams.objects.create(stream_name="IOE")
+        chapter = Chapters.objects.create(sub_id=Subjects.objects.create(subject_name="Maths"), chapter_name="Algebra")
+        topic = Topics.objects.create(chapter=chapter, topic_name="Matrices")
+        for i in range(6):
+            question = Questions.objects.create(topic=topic, question=f"Q{i}", options=["a"], answer="a")
+            HeroQuestions.objects.create(topic=topic, question=question, stream=cls.stream, marks=1 + i % 2)
+        blueprint = ExamBlueprint.objects.create(stream=cls.stream)
+        cls.entry = BlueprintChapter.objects.create(blueprint=blueprint, chapter=chapter, marks=1, num_questions=2)
+        BlueprintChapter.objects.create(blueprint=blueprint, chapter=chapter, marks=2, num_questions=1)
+
+    def setUp(self):
+        cache.clear()
+        question_pools.invalidate()
+
+    def test_refill_then_claim(self):
+        plan = get_compiled_blueprint('IOE')
+        self.assertEqual(refill_reservoir(plan, depth=3), 3)
+        self.assertEqual(refill_reservoir(plan, depth=3), 0)
+
+        paper, timer = claim_mock_paper(plan, self.user)
+        self.assertEqual(paper.created_by, self.user)
+        self.assertEqual(paper.total_questions, 3)
+        self.assertEqual(paper.total_marks, 4)
+        self.assertEqual(TestQuestionLink.objects.filter(test_id=paper).count(), 3)
+        self.assertEqual(GeneratedTestPaper.objects.filter(created_by__isnull=True).count(), 2)
+
+    def test_claim_from_empty_reservoir(self):
+        paper, timer = claim_mock_paper(get_compiled_blueprint('IOE'), self.user)
+        self.assertIsNone(paper)
+
+    def test_blueprint_change_discards_stale_papers(self):
+        refill_reservoir(get_compiled_blueprint('IOE'), depth=2)
+        self.entry.num_questions = 1
+        self.entry.save()
+
+        plan = get_compiled_blueprint('IOE')
+        refill_reservoir(plan, depth=2)
+        unclaimed = GeneratedTestPaper.objects.filter(created_by__isnull=True)
+        self.assertEqual(unclaimed.count(), 2)
+        self.assertTrue(all(p.total_questions == 2 and p.blueprint_version == plan.version for p in unclaimed))
+
+    def test_refill_with_empty_bank_adds_nothing(self):
+        HeroQuestions.objects.all().delete()
+        self.assertEqual(refill_reservoir(get_compiled_blueprint('IOE'), depth=3), 0)
+        self.assertFalse(GeneratedTestPaper.objects.exists())
@@ -0,0 +1,62 @@
+from unittest import mock, skipUnless
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from questions.seen import SeenBitmap, load_seen, mark_seen
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+
+class SeenBitmapTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_bitmap_membership(self):
+        bitmap = SeenBitmap()
+        for qid in (0, 7, 8, 1000):
+            bitmap.add(qid)
+        self.assertIn(1000, bitmap)
+        self.assertNotIn(999, bitmap)
+        self.assertNotIn(50000, bitmap)
+        self.assertEqual(len(bitmap), 4)
+        self.assertEqual(list(bitmap), [0, 7, 8, 1000])
+        self.assertEqual(len(bitmap.tobytes()), 126)
+
+    def test_union(self):
+        a, b = SeenBitmap(), SeenBitmap()
+        a.add(3)
+        b.add(300)
+        a.update(b)
+        self.assertEqual(list(a), [3, 300])
+
+
+@skipUnless(fakeredis, "fakeredis is not installed")
+class SeenBucketTests(TestCase):
+    """Day buckets live in a throwaway fakeredis server."""
+
+    def setUp(self):
+        server = fakeredis.FakeRedis()
+        patcher = mock.patch('questions.seen._redis', lambda write=False: server)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_mark_and_load_per_user(self):
+        mark_seen(1, [5, 6])
+        mark_seen(1, [42])
+        mark_seen(2, [7])
+        self.assertEqual(list(load_seen(1)), [5, 6, 42])
+        self.assertEqual(list(load_seen(2)), [7])
+
+    def test_bucket_matches_redis_bit_order(self):
+        mark_seen(1, [0, 9])
+        self.assertEqual(load_seen(1).tobytes(), b'\x80\x40')
+        self.assertEqual(list(SeenBitmap(b'\x80\x40')), [0, 9])
+
+    @override_settings(SEEN_QUESTIONS_WINDOW_DAYS=0)
+    def test_window_zero_disables_tracking(self):
+        mark_seen(1, [5])
+        self.assertFalse(load_seen(1))
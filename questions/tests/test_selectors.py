@@ -0,0 +1,87 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from questions.models import Subjects, Streams, Chapters, Topics, Questions, HeroQuestions
+from questions.selectors import select_custom_test_questions, SelectionError
+from questions.pools import question_pools
+from questions.seen import SeenBitmap
+
+
+class CustomTestSelectorTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.stream = Streams.objects.create(stream_name="IOE")
+        other_stream = Streams.objects.create(stream_name="MBBS")
+        cls.physics = Subjects.objects.create(subject_name="Physics")
+        cls.maths = Subjects.objects.create(subject_name="Maths")
+        cls.optics = Chapters.objects.create(sub_id=cls.physics, chapter_name="Optics")
+        cls.heat = Chapters.objects.create(sub_id=cls.physics, chapter_name="Heat")
+        cls.algebra = Chapters.objects.create(sub_id=cls.maths, chapter_name="Algebra")
+        for chapter, count in ((cls.optics, 6), (cls.heat, 2), (cls.algebra, 4)):
+            topic = Topics.objects.create(chapter=chapter, topic_name="T")
+            for i in range(count):
+                question = Questions.objects.create(topic=topic, question=f"Q{i}", options=["a"], answer="a")
+                HeroQuestions.objects.create(topic=topic, question=question, stream=cls.stream, marks=1)
+                HeroQuestions.objects.create(topic=topic, question=question, stream=other_stream, marks=1)
+
+    def setUp(self):
+        cache.clear()
+        question_pools.invalidate()
+
+    def request(self, *subjects):
+        return [{'subject_id': s, 'chapters': [{'chapter_id': c, 'num_questions': n} for c, n in chapters]}
+                for s, chapters in subjects]
+
+    def test_draws_every_chapter_in_two_queries(self):
+        subjects = self.request(
+            (self.physics.id, [(self.optics.id, 3), (self.heat.id, 2)]),
+            (self.maths.id, [(self.algebra.id, 4)]),
+        )
+        with self.assertNumQueries(2):
+            selected, subject_ids = select_custom_test_questions(self.stream.id, subjects)
+
+        self.assertEqual([q.topic.chapter_id for q in selected], [self.optics.id] * 3 + [self.heat.id] * 2 + [self.algebra.id] * 4)
+        self.assertEqual(len({q.id for q in selected}), 9)
+        self.assertTrue(all(q.stream_id == self.stream.id for q in selected))
+        self.assertEqual(subject_ids, [self.physics.id, self.maths.id])
+
+    def test_not_enough_questions(self):
+        with self.assertRaisesMessage(SelectionError, 'Not enough questions available for Physics - Heat. Found 2, requested 3.'):
+            select_custom_test_questions(self.stream.id, self.request((self.physics.id, [(self.heat.id, 3)])))
+
+    def test_chapter_must_belong_to_subject(self):
+        with self.assertRaises(SelectionError) as ctx:
+            select_custom_test_questions(self.stream.id, self.request((self.maths.id, [(self.optics.id, 1)])))
+        self.assertEqual(ctx.exception.status_code, 404)
+
+    def test_unknown_subject(self):
+        with self.assertRaisesMessage(SelectionError, 'Subject with ID 999 not found.'):
+            select_custom_test_questions(self.stream.id, self.request((999, [(self.optics.id, 1)])))
+
+    def test_seen_questions_are_drawn_last(self):
+        optics_ids = list(HeroQuestions.objects.filter(
+            stream=self.stream, topic__chapter=self.optics).values_list('id', flat=True))
+        seen = SeenBitmap()
+        for hero_id in optics_ids[:4]:
+            seen.add(hero_id)
+
+        subjects = self.request((self.physics.id, [(self.optics.id, 3)]))
+        selected, _ = select_custom_test_questions(self.stream.id, subjects, exclude=seen)
+        ids = [q.id for q in selected]
+        self.assertEqual(set(ids[:2]), set(optics_ids[4:])) # Both unseen questions first
+        self.assertIn(ids[2], optics_ids[:4]) # Topped up with a seen one
+
+    def test_seen_questions_outside_the_request_stay_out_of_the_sql(self):
+        seen = SeenBitmap()
+        for hero_id in HeroQuestions.objects.filter(topic__chapter=self.algebra).values_list('id', flat=True):
+            seen.add(hero_id)
+
+        subjects = self.request((self.physics.id, [(self.optics.id, 3)]))
+        question_pools.available(self.stream.id, self.optics.id, 1) # Warm the pool index
+        with CaptureQueriesContext(connection) as ctx:
+            select_custom_test_questions(self.stream.id, subjects, exclude=seen)
+        self.assertNotIn('CASE', ctx.captured_queries[-1]['sql'])
@@ -0,0 +1,157 @@
+import datetime
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from accounts.models import User
+from questions.grading import load_answer_key
+from questions.ingest import enqueue_submission, flush_submissions, save_submission
+from questions.models import (
+    Subjects, Streams, Chapters, Topics, Questions, HeroQuestions, UserStatsRollup, UserTopicStats,
+    UserDailySubjectStats
+)
+from questions.papers import persist_test_paper
+from questions.stats import add_to_counters, performance_levels, performance_tree, performance_trend, rebuild_user_stats
+
+
+class StatsRollupTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='stats@example.com', username='stats', password='password123')
+        cls.stream = Streams.objects.create(stream_name="IOE")
+        cls.subject = Subjects.objects.create(subject_name="Maths")
+        cls.algebra = Chapters.objects.create(sub_id=cls.subject, chapter_name="Algebra")
+        cls.calculus = Chapters.objects.create(sub_id=cls.subject, chapter_name="Calculus")
+        cls.matrices = Topics.objects.create(chapter=cls.algebra, topic_name="Matrices")
+        cls.limits = Topics.objects.create(chapter=cls.calculus, topic_name="Limits")
+        for n, (topic, marks) in enumerate([(cls.matrices, 1), (cls.matrices, 2), (cls.limits, 2)]):
+            question = Questions.objects.create(topic=topic, question=f"Q{n}", options=["a", "b"], answer="a")
+            HeroQuestions.objects.create(topic=topic, question=question, stream=cls.stream, marks=marks)
+
+    def setUp(self):
+        cache.clear()
+        self.heroes = list(HeroQuestions.objects.select_related('question', 'topic__chapter').order_by('id'))
+
+    def submit(self, wrong=1, queued=False):
+        paper, _ = persist_test_paper(self.stream.id, self.user, 'CUSTOM', self.heroes)
+        answer_key = load_answer_key(paper.id)
+        answers = [
+            {'question_id': hero.question_id, 'user_answer': "b" if n < wrong else "a"}
+            for n, hero in enumerate(self.heroes)
+        ]
+        obtained, results = answer_key.grade(answers)
+        submit = enqueue_submission if queued else save_submission
+        return submit(self.user, answer_key, obtained, results, 30)
+
+    def assertRollup(self, tests_taken, attempted, correct, marks_possible, marks_obtained):
+        rollup = UserStatsRollup.objects.get(pk=self.user.id)
+        self.assertEqual(
+            (rollup.tests_taken, rollup.attempted, rollup.correct, rollup.marks_possible, rollup.marks_obtained),
+            (tests_taken, attempted, correct, marks_possible, marks_obtained)
+        )
+
+    def test_submissions_increment_the_rollup(self):
+        self.submit(wrong=1)
+        self.assertRollup(1, 3, 2, 5, 4)
+        self.submit(wrong=0)
+        self.assertRollup(2, 6, 5, 10, 9)
+
+    def test_flushed_submissions_are_counted(self):
+        self.submit(wrong=1, queued=True)
+        self.submit(wrong=2, queued=True)
+        self.assertFalse(UserStatsRollup.objects.exists())
+        flush_submissions()
+        self.assertRollup(2, 6, 3, 10, 6)
+
+    def test_rebuild_matches_history(self):
+        self.submit(wrong=1)
+        self.submit(wrong=3)
+        UserStatsRollup.objects.filter(pk=self.user.id).update(tests_taken=0, correct=0)
+        UserTopicStats.objects.filter(user=self.user).update(correct=0)
+        rebuild_user_stats(self.user.id)
+        self.assertRollup(2, 6, 2, 10, 4)
+        self.assertEqual(UserTopicStats.objects.get(user=self.user, topic=self.limits).correct, 1)
+
+    def test_counters_lock_rows_in_key_order(self):
+        other = User.objects.create_user(email='other@example.com', username='other', password='password123')
+        UserStatsRollup.objects.create(user=self.user, attempted=5)
+
+        with CaptureQueriesContext(connection) as ctx:
+            add_to_counters(UserStatsRollup, ('user_id',), {
+                (other.id,): {'attempted': 2},
+                (self.user.id,): {'attempted': 1},
+            })
+        self.assertIn('ORDER BY', ctx.captured_queries[0]['sql'])
+        self.assertEqual(
+            dict(UserStatsRollup.objects.values_list('user_id', 'attempted')),
+            {self.user.id: 6, other.id: 2}
+        )
+
+    def test_counters_lock_only_the_exact_keys(self):
+        other = User.objects.create_user(email='other@example.com', username='other', password='password123')
+        UserTopicStats.objects.create(user=self.user, topic=self.limits, attempted=5)
+        UserTopicStats.objects.create(user=other, topic=self.matrices, attempted=7)
+
+        with CaptureQueriesContext(connection) as ctx:
+            add_to_counters(UserTopicStats, ('user_id', 'topic_id'), {
+                (self.user.id, self.matrices.id): {'attempted': 1},
+                (other.id, self.limits.id): {'attempted': 2},
+            })
+        lock = ctx.captured_queries[0]['sql']
+        self.assertIn('ORDER BY', lock)
+        self.assertIn(' OR ', lock) # Key pairs, not user_id IN (...) AND topic_id IN (...)
+        self.assertEqual(
+            set(UserTopicStats.objects.values_list('user_id', 'topic_id', 'attempted')),
+            {(self.user.id, self.limits.id, 5), (other.id, self.matrices.id, 7),
+             (self.user.id, self.matrices.id, 1), (other.id, self.limits.id, 2)}
+        )
+
+    def test_performance_tree_rolls_topics_up(self):
+        self.submit(wrong=1)
+        self.submit(wrong=0)
+        with self.assertNumQueries(1): # The taxonomy was cached while recording the submissions
+            tree = performance_tree(self.user.id)
+
+        [subject] = tree
+        self.assertEqual((subject['subject_name'], subject['attempted'], subject['correct']), ("Maths", 6, 5))
+        algebra, calculus = subject['chapters']
+        self.assertEqual((algebra['chapter_id'], algebra['attempted'], algebra['marks_obtained']), (self.algebra.id, 4, 5))
+        self.assertEqual(algebra['accuracy_percentage'], 75.0)
+        self.assertEqual([t['topic_name'] for t in calculus['topics']], ["Limits"])
+
+        levels = performance_levels(tree)
+        self.assertEqual([len(levels[level]) for level in ('subject', 'chapter', 'topic')], [1, 2, 2])
+        self.assertNotIn('chapters', levels['subject'][0])
+
+    def test_renaming_a_topic_refreshes_the_tree(self):
+        self.submit()
+        performance_tree(self.user.id)
+        self.limits.topic_name = "Limits and Continuity"
+        self.limits.save()
+        self.assertEqual(performance_tree(self.user.id)[0]['chapters'][1]['topics'][0]['topic_name'], "Limits and Continuity")
+
+    def test_trend_reads_daily_buckets(self):
+        self.submit(wrong=1)
+        today = timezone.localdate()
+        bucket = UserDailySubjectStats.objects.get(user=self.user, day=today)
+        self.assertEqual((bucket.attempted, bucket.correct, bucket.marks_obtained), (3, 2, 4))
+
+        UserDailySubjectStats.objects.create(
+            user=self.user, subject=self.subject, day=today - datetime.timedelta(days=8),
+            attempted=4, correct=1, marks_possible=4, marks_obtained=1
+        )
+        with self.assertNumQueries(1):
+            daily = performance_trend(self.user.id, 'day', days=10)
+        self.assertEqual(len(daily), 10)
+        self.assertEqual(daily[-1]['period_start'], today)
+        self.assertEqual(daily[-1]['accuracy_percentage'], 66.67)
+        self.assertEqual(daily[1]['attempted'], 4)
+        self.assertEqual(sum(period['attempted'] for period in daily), 7)
+
+        weekly = performance_trend(self.user.id, 'week', days=10)
+        self.assertTrue(all(period['period_start'].weekday() == 0 for period in weekly))
+        self.assertEqual(sum(period['attempted'] for period in weekly), 7)
+        self.assertEqual(performance_trend(self.user.id, subject_id=self.subject.id + 1)[-1]['attempted'], 0)
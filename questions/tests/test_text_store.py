@@ -0,0 +1,48 @@
+import shutil
+import tempfile
+
+from django.test import SimpleTestCase
+from questions.faiss_engine.text_store import TextStore
+
+
+class TextStoreTests(SimpleTestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def check_store(self, compress):
+        store = TextStore(compress=compress)
+        store.update({1: "Snell's law", 2: "Ohm's law — V = IR"})
+        store.update({2: "Ohm's law"})
+        store.remove([1, 99])
+        self.assertEqual(store.ids(), {2})
+        self.assertEqual(store.get(2), "Ohm's law")
+        self.assertIsNone(store.get(1))
+        self.assertEqual(store.get(1, ''), '')
+        self.assertNotIn(1, store)
+        self.assertEqual(len(store), 1)
+
+        store.update({3: "Newton's laws — F = ma"})
+        store.save(self.directory)
+        # The file is the same either way, so a store can be loaded with the other setting
+        for load_compressed in (True, False):
+            loaded = TextStore(compress=load_compressed)
+            self.assertTrue(loaded.load(self.directory))
+            self.assertEqual(loaded.ids(), {2, 3})
+            self.assertEqual(loaded.get(3), "Newton's laws — F = ma")
+
+    def test_uncompressed(self):
+        self.check_store(compress=False)
+
+    def test_compressed(self):
+        self.check_store(compress=True)
+        store = TextStore(compress=True)
+        store.update({1: "x" * 1000})
+        self.assertLess(len(store._texts[1]), 100) # Held compressed
+
+    def test_load_without_a_file_keeps_the_store(self):
+        store = TextStore()
+        store.update({1: "kept"})
+        self.assertFalse(store.load(self.directory))
+        self.assertEqual(store.get(1), "kept")
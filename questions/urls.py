@@ -20,6 +20,7 @@ urlpatterns = [
     path('', include(router.urls)),
     path('ioe/mocktest/', generate_mock_test, name='mock-test'), 
     path('ioe/custom-test/', create_custom_test, name='custom-test'), 
+    path('tests/generated/<int:test_paper_id>/', TestPaperDetailView.as_view(), name='test-paper-detail'),
     path('tests/generated/<int:test_paper_id>/submit/', TestSubmissionView.as_view(), name='test-submit'),
 
 
@@ -29,6 +30,8 @@ urlpatterns = [
     path('stats/by-subject/', SubjectPerformanceStatsView.as_view(), name='subject-stats'),
     path('stats/by-chapter/', ChapterPerformanceStatsView.as_view(), name='chapter-stats'),
     path('stats/by-topic/', TopicPerformanceStatsView.as_view(), name='topic-stats'),
+    path('stats/tree/', PerformanceTreeView.as_view(), name='stats-tree'),
+    path('stats/trend/', PerformanceTrendView.as_view(), name='stats-trend'),
 
     path('questions/similarity/', QuestionSimilarityAPIView.as_view(), name='question-similarity'),
 
@@ -14,10 +14,19 @@ from rest_framework.views import APIView
 from django.db import transaction 
 from django.db.models import Count, Sum, Avg, F, Case, When, IntegerField, FloatField
 from django.db.models.functions import Cast
-import json
 from django.db import IntegrityError
 from .filters import HeroQuestionFilter 
 from django_filters.rest_framework import DjangoFilterBackend
+from .papers import assemble_mock_paper, persist_test_paper
+from .reservoir import claim_mock_paper
+from .seen import load_seen, mark_seen
+from .paper_cache import cache_paper_payload, load_paper_payload, paper_payload_response
+from .blueprints import get_compiled_blueprint
+from .selectors import select_custom_test_questions, SelectionError
+from .grading import load_answer_key
+from .ingest import enqueue_submission, ingest_mode, save_submission
+from .idempotency import abandon_submission, begin_submission, finish_submission, submission_key
+from .stats import performance_levels, performance_tree, performance_trend, rebuild_user_stats
 
 class SubjectsViewSet(viewsets.ModelViewSet):
     queryset = Subjects.objects.all()
@@ -320,122 +329,40 @@ class CombinedHeroQuestionViewSet(viewsets.ModelViewSet):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def generate_mock_test(request):
-    syllabus_data = [
-        {"Subject": "English",
-"Total_marks": 22,
-"Number_of_questions": 18,
-"Chapters":{
-    "Reading Passage":{"mark1":0, "mark2":4},
-    "Grammar":{"mark1":10, "mark2":0},
-    "Vocabulary":{"mark1":2, "mark2":0},
-    "Phonemes and Stress":{"mark1":2, "mark2":0}
-    }
-},
-{
-    "Subject": "Maths",
-    "Total_marks": 50,
-    "Number_of_questions": 25, 
-    "Chapters":{
-        "Set and Function":{"mark1":1, "mark2":1},
-        "Algebra":{"mark1":2, "mark2":4},
-        "Trigonometry":{"mark1":1, "mark2":2},
-        "Coordinate Geometry":{"mark1":2, "mark2":4},
-        "Calculus":{"mark1":3, "mark2":4},
-        "Vectors": {"mark1":1, "mark2":1}
-    }
-},
-{
-    "Subject": "Physics",
-    "Total_marks": 40,
-    "Number_of_questions": 25,
-    "Chapters":{
-        "Mechanics":{"mark1":2, "mark2":4},
-        "Heat and Thermodynamics":{"mark1":2, "mark2":1},
-        "Wave and Optics":{"mark1":2, "mark2":3},
-        "Electricity and Magnetism":{"mark1":2, "mark2":4},
-        "Modern Physics and Electronics":{"mark1":2, "mark2":3}
-    }
-},
-{
-    "Subject": "Chemistry",
-    "Total_marks": 20,
-    "Number_of_questions": 16,
-    "Chapters":{
-        "Physical Chemistry":{"mark1":6, "mark2":3},
-        "Inorganic Chemistry":{"mark1":3, "mark2":1},
-        "Organic Chemistry":{"mark1":3, "mark2":0}
-    }
-}
-    ]
-    
+    # The syllabus comes from the stream's ExamBlueprint, compiled once into ids and cached
+    stream_name = request.query_params.get('stream', 'IOE')
     try:
-        stream = Streams.objects.get(stream_name='IOE')
+        plan = get_compiled_blueprint(stream_name)
     except Streams.DoesNotExist:
-        return JsonResponse({'error': 'IOE stream not found'}, status=404)
-    
-    selected_questions = []
-    
-    for subject_info in syllabus_data:
-        subject_name = subject_info['Subject']
-        try:
-            subject = Subjects.objects.get(subject_name=subject_name)
-        except Subjects.DoesNotExist:
-            continue
-        
-        chapters_info = subject_info['Chapters']
-        for chapter_name, marks_info in chapters_info.items():
-            try:
-                chapter = Chapters.objects.get(sub_id=subject, chapter_name=chapter_name)
-            except Chapters.DoesNotExist:
-                continue
-            
-            topics = Topics.objects.filter(chapter=chapter)
-            
-            # Fetch 1-mark questions
-            num_mark1 = marks_info['mark1']
-            if num_mark1 > 0:
-                questions = HeroQuestions.objects.filter(
-                    topic__in=topics,
-                    marks=1,
-                    stream=stream
-                ).order_by('?')[:num_mark1]
-                selected_questions.extend(questions)
-            
-            # Fetch 2-mark questions
-            num_mark2 = marks_info['mark2']
-            if num_mark2 > 0:
-                questions = HeroQuestions.objects.filter(
-                    topic__in=topics,
-                    marks=2,
-                    stream=stream
-                ).order_by('?')[:num_mark2]
-                selected_questions.extend(questions)
-    generated_test_paper = GeneratedTestPaper.objects.create(
-        stream=stream,
-        total_marks=sum(q.marks for q in selected_questions),
-        total_questions=len(selected_questions),
-        created_by=request.user, 
-        test_type='mock', 
-        subjects_included=[s.id for s in Subjects.objects.all()]
-          )
-    
-    for question in selected_questions:
-        TestQuestionLink.objects.create(
-            test_id=generated_test_paper,
-            question_id=question
+        return JsonResponse({'error': f'{stream_name} stream not found'}, status=404)
+    if not plan.entries:
+        return JsonResponse({'error': f'No exam blueprint configured for {stream_name}'}, status=404)
+
+    # Fast path: claim a paper the refill_mock_reservoir worker has already assembled
+    seen = load_seen(request.user.id) # Questions from recently submitted papers, avoided where possible
+    generated_test_paper, timer = claim_mock_paper(plan, request.user, seen)
+    if generated_test_paper is not None:
+        selected_questions = list(
+            HeroQuestions.objects.filter(testquestionlink__test_id=generated_test_paper)
+            .select_related('question').order_by('testquestionlink__id')
+        )
+    else:
+        # Reservoir empty: draw from the in-memory (stream, chapter, marks) pools right now
+        selected_questions = assemble_mock_paper(plan, exclude=seen)
+        # Paper + links in a single transaction; subjects come from the selected questions
+        generated_test_paper, timer = persist_test_paper(
+            stream_id=plan.stream_id,
+            created_by=request.user,
+            test_type='mock',
+            hero_questions=selected_questions,
+            blueprint_version=plan.version,
         )
-        
-    # generated_test_paper.questions.set(selected_questions)
 
-    question_serializer = HeroQuestionsWithoutAnswerSerializer(selected_questions, many=True)
-    # return Response(serializer.data)
-    
-    test_paper_serializer = GeneratedTestPaperSerializer(generated_test_paper)
-    
-    return Response({
-        'test_details': test_paper_serializer.data,
-        'questions': question_serializer.data
-    })
+    # Rendered once; re-fetches via TestPaperDetailView are served from this cached blob
+    payload = cache_paper_payload(generated_test_paper, selected_questions)
+    response = paper_payload_response(request, payload)
+    response['Server-Timing'] = timer.server_timing()
+    return response
 
 
 
@@ -512,109 +439,65 @@ def create_custom_test(request):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     data = serializer.validated_data
-    selected_questions = []
-    total_marks = 0
-    subject_ids_included = set() # Keep track of subjects actually used
 
-    # --- Get Stream (Consider making this dynamic or configurable if needed) ---
+    # --- Get Stream id from the compiled blueprint (cached, no name lookup on the warm path) ---
     try:
-        # Use filter+first for potentially better performance if multiple 'IOE' streams could exist
-        stream = Streams.objects.get(stream_name='IOE')
+        stream_id = get_compiled_blueprint(data['stream']).stream_id
     except Streams.DoesNotExist:
-        return Response({'error': 'Stream "IOE" not found. Cannot create test.'}, status=status.HTTP_404_NOT_FOUND)
-
-    # --- Question Selection Logic (Similar to before) ---
-    for subject_data in data['subjects']:
-        try:
-            subject = Subjects.objects.get(id=subject_data['subject_id'])
-        except Subjects.DoesNotExist:
-             return Response({'error': f"Subject with ID {subject_data['subject_id']} not found."}, status=status.HTTP_404_NOT_FOUND)
-
-        subject_has_questions = False # Flag to track if any questions were added for this subject
-        for chapter_data in subject_data['chapters']:
-            try:
-                chapter = Chapters.objects.get(id=chapter_data['chapter_id'], sub_id=subject)
-            except Chapters.DoesNotExist:
-                return Response({'error': f"Chapter with ID {chapter_data['chapter_id']} not found for Subject {subject.subject_name}."}, status=status.HTTP_404_NOT_FOUND)
-
-            # Ensure num_questions is positive
-            num_questions_requested = chapter_data['num_questions']
-            if num_questions_requested <= 0:
-                continue # Skip chapters with zero or negative requested questions
-
-            topics = Topics.objects.filter(chapter=chapter)
-            if not topics.exists():
-                 # Optionally warn or error if a selected chapter has no topics
-                 # print(f"Warning: Chapter '{chapter.chapter_name}' has no topics.")
-                 continue # Skip if chapter has no topics
-
-            # Get random questions from HeroQuestions linked to topics in this chapter and the correct stream
-            questions = HeroQuestions.objects.filter(
-                topic__in=topics,
-                stream=stream
-            ).order_by('?')[:num_questions_requested]
-
-            # Check if enough questions were found
-            if len(questions) < num_questions_requested:
-                return Response({
-                    'error': f'Not enough questions available for {subject.subject_name} - {chapter.chapter_name}. Found {len(questions)}, requested {num_questions_requested}.'
-                }, status=status.HTTP_400_BAD_REQUEST)
-
-            selected_questions.extend(questions)
-            total_marks += sum(q.marks for q in questions)
-            subject_has_questions = True # Mark that we added questions for this subject
-
-        # Add subject ID to the set if questions were actually selected from it
-        if subject_has_questions:
-             subject_ids_included.add(subject.id)
+        return Response({'error': f'Stream "{data["stream"]}" not found. Cannot create test.'}, status=status.HTTP_404_NOT_FOUND)
 
+    # --- Question Selection: all ids validated and all chapters sampled in one batch ---
+    try:
+        selected_questions, subject_ids_included = select_custom_test_questions(
+            stream_id, data['subjects'], exclude=load_seen(request.user.id)
+        )
+    except SelectionError as e:
+        return Response({'error': e.message}, status=e.status_code)
 
     # --- Check if any questions were selected overall ---
     if not selected_questions:
          return Response({'error': 'No questions could be selected based on the provided criteria or requested numbers.'}, status=status.HTTP_400_BAD_REQUEST)
 
-    total_questions_count = len(selected_questions)
-
-    # --- Create GeneratedTestPaper instance ---
-    generated_test_paper = GeneratedTestPaper.objects.create(
-        stream=stream,
-        total_marks=total_marks,
-        total_questions=total_questions_count,
+    # --- Create GeneratedTestPaper + TestQuestionLink rows in one batch ---
+    generated_test_paper, persist_timer = persist_test_paper(
+        stream_id=stream_id,
         created_by=request.user,
         test_type='CUSTOM', # Explicitly set type for custom tests
-        subjects_included=list(subject_ids_included) # Store the IDs of subjects with questions
+        hero_questions=selected_questions,
+        subject_ids=subject_ids_included # Store the IDs of subjects with questions
     )
 
-    # --- Create TestQuestionLink instances ---
-    test_links = []
-    for question in selected_questions:
-        test_links.append(
-            TestQuestionLink(
-                test_id=generated_test_paper,
-                question_id=question # question is a HeroQuestions instance here
-            )
-        )
-    TestQuestionLink.objects.bulk_create(test_links) 
-
-    # --- Serialize the results ---
-    test_paper_serializer = GeneratedTestPaperSerializer(generated_test_paper)
-    questions_serializer = HeroQuestionsWithoutAnswerSerializer(selected_questions, many=True)
+    # --- Serialize the results once and cache them for re-fetches ---
+    payload = cache_paper_payload(generated_test_paper, selected_questions)
 
     # --- Return the response ---
-    return Response({
-        'test_details': test_paper_serializer.data, 
-        'questions': questions_serializer.data 
-    }, status=status.HTTP_201_CREATED) 
+    response = paper_payload_response(request, payload, status=status.HTTP_201_CREATED)
+    response['Server-Timing'] = persist_timer.server_timing()
+    return response
 
-def answers_match(user_ans, correct_ans):
+
+class TestPaperDetailView(views.APIView):
     """
-    Return True if two potentially nested JSON-compatible structures
-    are equivalent, regardless of key order or whitespace.
+    Re-fetch a generated test paper (details + questions without answers).
+    Served straight from the cached payload blob on the warm path; the DB is
+    only touched when the blob is missing or the question set has changed.
     """
-    # dumps with sorted keys and no extra spaces
-    u = json.dumps(user_ans,    sort_keys=True, separators=(',', ':'))
-    c = json.dumps(correct_ans, sort_keys=True, separators=(',', ':'))
-    return u == c
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_summary="Get Generated Test Paper",
+        operation_description="Returns the same `test_details` + `questions` body the generate endpoints returned.",
+        tags=["Tests"],
+        responses={
+            200: openapi.Response(description="Test paper details and questions (without answers)."),
+            404: "Not found, or the paper belongs to another user."
+        }
+    )
+    def get(self, request, test_paper_id, *args, **kwargs):
+        payload = load_paper_payload(test_paper_id)
+        if payload is None or payload[0] != request.user.id:
+            return Response({"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND)
+        return paper_payload_response(request, payload[1])
 
 class TestSubmissionView(views.APIView):
     """
@@ -642,6 +525,13 @@ class TestSubmissionView(views.APIView):
                 description='The unique ID of the GeneratedTestPaper being submitted.',
                 required=True,
                 type=openapi.TYPE_INTEGER
+            ),
+            openapi.Parameter(
+                name='Idempotency-Key',
+                in_=openapi.IN_HEADER,
+                description='Optional client-chosen key; retries carrying the same key (or, without one, the same answers) replay the first response.',
+                required=False,
+                type=openapi.TYPE_STRING
             )
         ],
 
@@ -655,6 +545,10 @@ class TestSubmissionView(views.APIView):
                 description="CREATED: Test submitted successfully. Returns the detailed test result including score and breakdown per question.",
                 schema=TestHistoryDetailSerializer # Use serializer for success response schema
             ),
+            202: openapi.Response(
+                description="ACCEPTED (SUBMISSION_INGEST_MODE='queued'): Graded and queued; the Test History entry is written shortly after. A retried submission of the same paper returns the original result with 200.",
+                schema=SubmissionReceiptSerializer
+            ),
             # --- Client Errors ---
             400: openapi.Response(
                 description="BAD REQUEST: Invalid input data provided. This could be due to:\n"
@@ -675,6 +569,9 @@ class TestSubmissionView(views.APIView):
             404: openapi.Response(
                 description="NOT FOUND: The `GeneratedTestPaper` with the specified `test_paper_id` does not exist."
             ),
+            409: openapi.Response(
+                description="CONFLICT: An identical submission (same `Idempotency-Key` header, or same answers) is still being processed. Retry shortly to receive its result."
+            ),
             # --- Server Errors (Implicitly handled, but can be documented) ---
             # 500: openapi.Response(description="INTERNAL SERVER ERROR: An unexpected error occurred on the server.")
         },
@@ -696,115 +593,59 @@ class TestSubmissionView(views.APIView):
         submitted_answers_list = validated_input_data['answers'] # List of {'question_id': int, 'user_answer': json}
         time_taken = validated_input_data.get('time_taken', 0)
 
-        # 2. Get the Generated Test Paper
-        generated_test = get_object_or_404(GeneratedTestPaper, pk=test_paper_id)
-
-        # 3. Get Questions and Marks for this Specific Test
-        test_questions_links = TestQuestionLink.objects.filter(test_id=generated_test).select_related(
-            'question_id__question'
+        # Retries of the same submission replay the first response without regrading
+        idempotency_key = submission_key(
+            request.user.id, test_paper_id, submitted_answers_list, request.headers.get('Idempotency-Key')
         )
-        if not test_questions_links.exists():
+        replay = begin_submission(idempotency_key)
+        if replay is not None:
+            return replay
+        try:
+            response = self.submit(request, test_paper_id, submitted_answers_list, time_taken)
+        except Exception:
+            abandon_submission(idempotency_key)
+            raise
+        finish_submission(idempotency_key, response)
+        return response
+
+    def submit(self, request, test_paper_id, submitted_answers_list, time_taken):
+        # 2. Get the paper's answer key (compiled when the paper was created)
+        answer_key = load_answer_key(test_paper_id)
+        if answer_key is None:
+            return Response({"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND)
+        if not answer_key.questions:
              return Response({"detail": "This test paper has no questions linked."}, status=status.HTTP_400_BAD_REQUEST)
 
-        question_details_map = {}
-        for link in test_questions_links:
-            base_question = link.question_id.question
-            hero_question = link.question_id
-            question_details_map[base_question.id] = {
-                'correct_answer': base_question.answer,
-                'marks': hero_question.marks,
-                'instance': base_question # Store the instance for later use
-            }
-
-        # 4. Process Answers and Calculate Score
-        total_obtained_marks = 0
-        processed_results = [] # To store data needed for ResultQuestionLink creation
-
-        submitted_question_ids = {ans['question_id'] for ans in submitted_answers_list}
-        test_question_ids = set(question_details_map.keys())
-
-        # Check for mismatch
-        if test_question_ids != submitted_question_ids:
-             missing = test_question_ids - submitted_question_ids
-             extra = submitted_question_ids - test_question_ids
-             error_detail = {}
-             if missing: error_detail["missing_answers_for_question_ids"] = sorted(list(missing))
-             if extra: error_detail["extra_answers_for_question_ids"] = sorted(list(extra))
+        # 3. Check for mismatch
+        error_detail = answer_key.mismatch(submitted_answers_list)
+        if error_detail:
              return Response({
                  "detail": "Mismatch between submitted answers and test questions.",
                  **error_detail
                 }, status=status.HTTP_400_BAD_REQUEST)
 
-        # Calculate score and prepare result data
-        for submission in submitted_answers_list:
-            question_id = submission['question_id']
-            user_answer = submission['user_answer'] # This should be parsed JSON (dict/list/etc.)
-
-            details = question_details_map.get(question_id)
-            if not details:
-                 # Should not happen if mismatch check passed, but good for safety
-                 return Response({"detail": f"Invalid question ID {question_id} submitted."}, status=status.HTTP_400_BAD_REQUEST)
-
-            correct_answer = details['correct_answer']
-            # Perform comparison (adjust if complex JSON comparison needed)
-            # is_correct = (user_answer == correct_answer)
-            import pprint
-
-            print("USER_ANSWER  >", type(user_answer), repr(user_answer))
-            print("CORRECT_ANSWER >", type(correct_answer), repr(correct_answer))
-
-            is_correct = answers_match(user_answer, correct_answer)
+        # 4. Calculate score in one pass over the submission
+        total_obtained_marks, graded = answer_key.grade(submitted_answers_list)
 
-            if is_correct:
-                total_obtained_marks += details['marks']
-
-            processed_results.append({
-                'question_instance': details['instance'], # The actual Questions object
-                'user_answer': user_answer,
-                'is_correct': is_correct
-            })
+        # 5. Queued mode: answer with the score now, flush_submissions writes the history
+        if ingest_mode() == 'queued':
+            receipt, created = enqueue_submission(request.user, answer_key, total_obtained_marks, graded, time_taken)
+            mark_seen(request.user.id, answer_key.hero_ids)
+            return Response(
+                SubmissionReceiptSerializer(receipt).data,
+                status=status.HTTP_202_ACCEPTED if created else status.HTTP_200_OK
+            )
 
-        # 5. Create TestHistory and ResultQuestionLink records within a transaction
+        # Sync mode: create TestHistory and ResultQuestionLink records within a transaction
         try:
-            with transaction.atomic():
-                # Create TestHistory instance
-                test_history = TestHistory.objects.create(
-                    user=request.user,
-                    total_marks=generated_test.total_marks,
-                    obtained_marks=total_obtained_marks,
-                    time=time_taken,
-                    test_type=generated_test.test_type,
-                    stream=generated_test.stream, # Pass the stream instance
-                    subjects_included=generated_test.subjects_included
-                )
-
-                result_links_to_create = []
-            for result_data in processed_results:
-                # Get the marks for this question instance from the details map
-                question_marks = question_details_map.get(result_data['question_instance'].id, {}).get('marks', 1) # Default marks to 1 if somehow not found
-
-                result_links_to_create.append(
-                    ResultQuestionLink(
-                        result_id=test_history,
-                        question_id=result_data['question_instance'],
-                        user_answer=result_data['user_answer'],
-                        is_correct=result_data['is_correct'],
-                        # NEW: Save the marks
-                        total_marks=question_marks,
-                        marks_obtained=question_marks if result_data['is_correct'] else 0
-                    )
-                )
-
-            # Use bulk_create for efficiency
-            if result_links_to_create:
-                ResultQuestionLink.objects.bulk_create(result_links_to_create)
-
-
+            test_history = save_submission(request.user, answer_key, total_obtained_marks, graded, time_taken)
         except Exception as e:
             # Log the exception e
             # logger.error(f"Error saving test submission for test {test_paper_id}: {e}")
             return Response({"detail": "An error occurred while saving the test results."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+        # Feed repeat-avoidance for the user's next generated tests
+        mark_seen(request.user.id, answer_key.hero_ids)
 
         # 6. Serialize the created TestHistory for the response
         # Use TestHistorySerializer (ensure it's set up for reading nested results correctly)
@@ -869,26 +710,36 @@ class OverallStatsView(APIView):
 
     @swagger_auto_schema(
         operation_summary="Get Overall User Statistics",
-        responses={200: OverallStatsSerializer()}
+        operation_description=(
+            "Reads the user's running stats rollup. Superusers can pass `recompute=1` "
+            "(optionally with `user_id`) to rebuild a rollup from the full test history."
+        ),
+        manual_parameters=[
+            openapi.Parameter('recompute', openapi.IN_QUERY, type=openapi.TYPE_INTEGER,
+                              description="Superusers only: 1 rebuilds the rollup from TestHistory."),
+            openapi.Parameter('user_id', openapi.IN_QUERY, type=openapi.TYPE_INTEGER,
+                              description="Superusers only, with recompute=1: user to rebuild (default: yourself)."),
+        ],
+        responses={200: OverallStatsSerializer(), 403: "recompute requested by a non-superuser"}
     )
     def get(self, request, *args, **kwargs):
-        user = request.user
-        history_qs = TestHistory.objects.filter(user=user)
-        results_qs = ResultQuestionLink.objects.filter(result_id__user=user)
-
-        # Calculate aggregates
-        total_tests_taken = history_qs.count()
-        overall_aggregates = results_qs.aggregate(
-            total_attempted=Count('id'),
-            total_correct=Sum(Case(When(is_correct=True, then=1), default=0, output_field=IntegerField())),
-            sum_marks_possible=Sum('total_marks'),
-            sum_marks_obtained=Sum('marks_obtained')
-        )
-
-        total_questions_attempted = overall_aggregates.get('total_attempted', 0) or 0
-        total_correct_answers = overall_aggregates.get('total_correct', 0) or 0
-        total_marks_possible = overall_aggregates.get('sum_marks_possible', 0) or 0
-        total_marks_obtained = overall_aggregates.get('sum_marks_obtained', 0) or 0
+        user_id = request.user.id
+        if request.query_params.get('recompute') == '1':
+            if not request.user.is_superuser:
+                return Response({"detail": "Only superusers can recompute stats."}, status=status.HTTP_403_FORBIDDEN)
+            target = request.query_params.get('user_id', user_id)
+            if not str(target).isdigit() or not User.objects.filter(pk=target).exists():
+                return Response({"detail": "User not found."}, status=status.HTTP_404_NOT_FOUND)
+            rollup = rebuild_user_stats(int(target))
+        else:
+            # Single primary-key read; no row just means no submissions yet
+            rollup = UserStatsRollup.objects.filter(pk=user_id).first() or UserStatsRollup(user_id=user_id)
+
+        total_tests_taken = rollup.tests_taken
+        total_questions_attempted = rollup.attempted
+        total_correct_answers = rollup.correct
+        total_marks_possible = rollup.marks_possible
+        total_marks_obtained = rollup.marks_obtained
 
         # Calculate percentages safely
         accuracy = (total_correct_answers * 100.0 / total_questions_attempted) if total_questions_attempted > 0 else 0.0
@@ -911,48 +762,15 @@ class OverallStatsView(APIView):
 class BasePerformanceStatsView(APIView):
     """ Base class for performance stats views (Subject, Chapter, Topic) """
     permission_classes = [IsAuthenticated]
-    grouping_field_id = None      # e.g., 'question_id__topic__chapter__sub_id'
-    grouping_field_name = None    # e.g., 'question_id__topic__chapter__sub_id__subject_name'
+    level = None                  # 'subject', 'chapter' or 'topic'
     serializer_class = None       # e.g., SubjectPerformanceSerializer
 
     def get_stats(self, request):
-        if not self.grouping_field_id or not self.serializer_class:
-             raise NotImplementedError("Subclasses must define grouping fields and serializer_class")
-
-        user = request.user
-        # Base query - IMPORTANT: Assumes Questions.topic FK is populated
-        stats = ResultQuestionLink.objects.filter(
-            result_id__user=user,
-            question_id__topic__isnull=False # Exclude questions without a topic link for reliable grouping
-        ).values(
-            self.grouping_field_id # Group by the ID field
-        ).annotate(
-            group_id=F(self.grouping_field_id), # Use F() to reference the field path
-            group_name=F(self.grouping_field_name) if self.grouping_field_name else None, # Get name if defined
-            attempted=Count('id'),
-            correct=Sum(Case(When(is_correct=True, then=1), default=0, output_field=IntegerField())),
-            total_marks_possible=Sum('total_marks'),
-            marks_obtained=Sum('marks_obtained')
-        ).values( # Select the final fields
-            'group_id', 'group_name', 'attempted', 'correct',
-            'total_marks_possible', 'marks_obtained'
-        )
+        if not self.level or not self.serializer_class:
+             raise NotImplementedError("Subclasses must define level and serializer_class")
 
-        # Calculate percentages in Python for clarity and division safety
-        results = []
-        for item in stats:
-            accuracy = (item['correct'] * 100.0 / item['attempted']) if item['attempted'] > 0 else 0.0
-            score = (item['marks_obtained'] * 100.0 / item['total_marks_possible']) if item['total_marks_possible'] > 0 else 0.0
-            # Renaming group_id/group_name to match specific serializer fields
-            # This could be cleaner using serializer source attribute if structure is consistent
-            item_data = item.copy()
-            item_data[self.serializer_class.Meta.fields[0]] = item_data.pop('group_id') # e.g., subject_id
-            item_data[self.serializer_class.Meta.fields[1]] = item_data.pop('group_name') # e.g., subject_name
-            item_data['accuracy_percentage'] = round(accuracy, 2)
-            item_data['score_percentage'] = round(score, 2)
-            results.append(item_data)
-
-        return results
+        # One read of the user's topic counters, rolled up through the cached taxonomy
+        return performance_levels(performance_tree(request.user.id))[self.level]
 
     def get(self, request, *args, **kwargs):
         stats_data = self.get_stats(request)
@@ -962,8 +780,7 @@ class BasePerformanceStatsView(APIView):
 
 class SubjectPerformanceStatsView(BasePerformanceStatsView):
     """ Performance aggregated by Subject. """
-    grouping_field_id = 'question_id__topic__chapter__sub_id'
-    grouping_field_name = 'question_id__topic__chapter__sub_id__subject_name'
+    level = 'subject'
     serializer_class = SubjectPerformanceSerializer
 
     @swagger_auto_schema(
@@ -977,8 +794,7 @@ class SubjectPerformanceStatsView(BasePerformanceStatsView):
 
 class ChapterPerformanceStatsView(BasePerformanceStatsView):
     """ Performance aggregated by Chapter. """
-    grouping_field_id = 'question_id__topic__chapter_id'
-    grouping_field_name = 'question_id__topic__chapter__chapter_name'
+    level = 'chapter'
     serializer_class = ChapterPerformanceSerializer # Need to define Meta in serializer
 
     @swagger_auto_schema(
@@ -995,8 +811,7 @@ class ChapterPerformanceStatsView(BasePerformanceStatsView):
 
 class TopicPerformanceStatsView(BasePerformanceStatsView):
     """ Performance aggregated by Topic. """
-    grouping_field_id = 'question_id__topic_id'
-    grouping_field_name = 'question_id__topic__topic_name'
+    level = 'topic'
     serializer_class = TopicPerformanceSerializer # Need to define Meta in serializer
 
     @swagger_auto_schema(
@@ -1006,11 +821,44 @@ class TopicPerformanceStatsView(BasePerformanceStatsView):
     def get(self, request, *args, **kwargs):
         # Add Meta class to TopicPerformanceSerializer for field mapping
          return super().get(request, *args, **kwargs)
-    
 
 
+class PerformanceTreeView(APIView):
+    """ Subject > chapter > topic performance in one response. """
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_summary="Get User Performance Tree",
+        operation_description="Subjects with their chapters and topics, each level with its own totals.",
+        responses={200: SubjectPerformanceTreeSerializer(many=True)}
+    )
+    def get(self, request, *args, **kwargs):
+        serializer = SubjectPerformanceTreeSerializer(instance=performance_tree(request.user.id), many=True)
+        return Response(serializer.data)
+
+
+class PerformanceTrendView(APIView):
+    """ Accuracy and score over time, read from the daily per-subject buckets. """
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_summary="Get User Performance Trend",
+        query_serializer=PerformanceTrendQuerySerializer,
+        responses={200: PerformanceTrendSerializer(many=True)}
+    )
+    def get(self, request, *args, **kwargs):
+        query = PerformanceTrendQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        trend = performance_trend(
+            request.user.id,
+            granularity=query.validated_data['granularity'],
+            days=query.validated_data['days'],
+            subject_id=query.validated_data.get('subject'),
+        )
+        return Response(PerformanceTrendSerializer(instance=trend, many=True).data)
+    
+
 
-from questions.faiss_engine.question_vectorizer import _qv
 
 class QuestionSimilarityInputSerializer(serializers.Serializer):
     question = serializers.CharField(help_text="Text to check for similarity")
@@ -1048,21 +896,19 @@ class QuestionSimilarityAPIView(APIView):
 
         question_text = serializer.validated_data['question']
 
-        # Run similarity pipeline
-        raw_results = _qv.query(question_text, filter_k=50, rerank_k=5)
-
-        # Build full response items
-        similar = []
-        for qid, _, score in raw_results:
-            try:
-                question_obj = Questions.objects.get(id=qid)
-                serialized = QuestionsWithoutAnswerSerializer(question_obj)
-                similar.append({
-                    'question': serialized.data,
-                    'score': score
-                })
-            except Questions.DoesNotExist:
-                continue
+        # Run similarity pipeline; imported here so workers that never serve it don't load FAISS
+        from questions.faiss_engine.question_vectorizer import get_vectorizer
+        raw_results = get_vectorizer().query(question_text, filter_k=50, rerank_k=5)
+
+        # Build full response items from one query, keeping the reranked order
+        questions = Questions.objects.in_bulk([qid for qid, _, _ in raw_results])
+        similar = [
+            {
+                'question': QuestionsWithoutAnswerSerializer(questions[qid]).data,
+                'score': score
+            }
+            for qid, _, score in raw_results if qid in questions # Deleted since it was indexed
+        ]
 
         return Response({'similar': similar}, status=status.HTTP_200_OK)
 